@@ -1,5 +1,6 @@
 import os
 import shutil
+import sys
 import datetime
 import platform
 import getpass
@@ -7,8 +8,31 @@ import subprocess
 import time
 import random
 import ast
+import contextlib
+import io
+import glob
+import hashlib
+import json
+import importlib.util
+import marshal
+import pickle
+import builtins
+import functools
+import collections.abc
 import operator
 import re
+import array
+import itertools
+import concurrent.futures
+import asyncio
+import atexit
+import bisect
+import errno
+import fnmatch
+import queue
+import select
+import stat
+import threading
 
 RESET = "\033[0m"
 BOLD = "\033[1m"
@@ -114,549 +138,4120 @@ class Therapist:
             print(f"Therapist: {random.choice(self.generic_negative_responses)}")
         else:
             print(f"Therapist: {random.choice(self.generic_neutral_responses)}")
-class _SafeEval(ast.NodeVisitor):
-    def __init__(self):
-        # Standard operators
-        self.operators = {
-            ast.Add: operator.add,
-            ast.Sub: operator.sub,
-            ast.Mult: operator.mul,
-            ast.Div: operator.truediv,
-            ast.FloorDiv: operator.floordiv,
-            ast.Mod: operator.mod,
-            ast.Pow: operator.pow,
-
-            ast.Eq: operator.eq,
-            ast.NotEq: operator.ne,
-            ast.Lt: operator.lt,
-            ast.LtE: operator.le,
-            ast.Gt: operator.gt,
-            ast.GtE: operator.ge,
-
-            ast.And: lambda a, b: a and b,
-            ast.Or: lambda a, b: a or b,
-            ast.Not: operator.not_,
-
-            ast.BitOr: operator.or_,
-            ast.BitAnd: operator.and_,
-            ast.BitXor: operator.xor,
-            ast.Invert: operator.invert,
-            ast.LShift: operator.lshift,
-            ast.RShift: operator.rshift,
-        }
 
-        # Lumen custom operators
-        self.lumen_ops = {
-            '!|': lambda a, b: not (a or b),  # NOR
-            '!&': lambda a, b: not (a and b),  # NAND
-            '>|<': lambda a, b: (a and not b) or (not a and b),  # XOR
-            '<&>': lambda a, b: (a and b) or (not a and not b)  # XAND
-        }
 
-    def visit(self, node):
-        if isinstance(node, ast.Expression):
-            return self.visit(node.body)
-        elif isinstance(node, ast.BinOp):
-            left = self.visit(node.left)
-            right = self.visit(node.right)
-            op_type = type(node.op)
-            if op_type in self.operators:
-                return self.operators[op_type](left, right)
-            raise ValueError(f"Unsupported binary operator: {op_type}")
-        elif isinstance(node, ast.BoolOp):
-            values = [self.visit(v) for v in node.values]
-            op_type = type(node.op)
-            if op_type == ast.And:
-                return all(values)
-            elif op_type == ast.Or:
-                return any(values)
-            raise ValueError(f"Unsupported boolean operator: {op_type}")
-        elif isinstance(node, ast.UnaryOp):
-            operand = self.visit(node.operand)
-            op_type = type(node.op)
-            if op_type in self.operators:
-                return self.operators[op_type](operand)
-            raise ValueError(f"Unsupported unary operator: {op_type}")
-        elif isinstance(node, ast.Compare):
-            left = self.visit(node.left)
-            for op, right_node in zip(node.ops, node.comparators):
-                right = self.visit(right_node)
-                op_type = type(op)
-                if op_type in self.operators:
-                    if not self.operators[op_type](left, right):
-                        return False
-                    left = right
-                else:
-                    raise ValueError(f"Unsupported comparison operator: {op_type}")
+# Lumen's logic operators. The expression tokenizer below turns each one into
+# a marker inside a Python `or`/`and` chain, so Python's own parser handles
+# everything around them (calls, parentheses, comparisons, not). The chains
+# are then rebuilt with the operators in place. Precedence, loosest first:
+#   or  !|      (NOR, same level as or)
+#   >|<  <&>    (XOR / XAND, between or and and)
+#   and  !&     (NAND, same level as and)
+#   not, comparisons, arithmetic ... as in Python
+LUMEN_OPS = {
+    ">|<": ("or", "xor"),
+    "<&>": ("or", "xand"),
+    "!|": ("or", "nor"),
+    "!&": ("and", "nand"),
+}
+_LUMEN_OP_MARK = "__lumen_op_{}__"
+_LUMEN_OP_MARKS = {_LUMEN_OP_MARK.format(name): name for _, name in LUMEN_OPS.values()}
+# bind tighter than the rest of their or-chain
+_LUMEN_TIGHT_OPS = {"xor", "xand"}
+
+
+def tokenize_lumen_ops(expr: str):
+    """Return expr with every Lumen operator outside string literals swapped
+    for its marker chain, or None when it has none.
+    """
+    out = []
+    i = start = 0
+    n = len(expr)
+    found = False
+    while i < n:
+        c = expr[i]
+        if c in "'\"":
+            # skip the whole literal, triple quotes and escapes included
+            quote = expr[i:i + 3] if expr[i:i + 3] in ('"""', "'''") else c
+            i += len(quote)
+            while i < n and not expr.startswith(quote, i):
+                i += 2 if expr[i] == "\\" else 1
+            i += len(quote)
+            continue
+        if c in "!<>":
+            for op, (chain, name) in LUMEN_OPS.items():
+                if expr.startswith(op, i):
+                    out.append(expr[start:i])
+                    out.append(f" {chain} {_LUMEN_OP_MARK.format(name)} {chain} ")
+                    i = start = i + len(op)
+                    found = True
+                    break
+            else:
+                i += 1
+            continue
+        i += 1
+    if not found:
+        return None
+    out.append(expr[start:])
+    return "".join(out)
+
+
+def lumen_op_node(name, a, b):
+    """Plain Python AST for `a <op> b`; every result is a bool."""
+    if name in ("or", "and"):
+        return ast.BoolOp(ast.Or() if name == "or" else ast.And(), [a, b])
+    if name in ("nor", "nand"):
+        return ast.UnaryOp(ast.Not(), ast.BoolOp(ast.Or() if name == "nor" else ast.And(), [a, b]))
+    # (not a) != (not b) evaluates each side once, unlike the textbook and/or form
+    cmp = ast.NotEq() if name == "xor" else ast.Eq()
+    return ast.Compare(ast.UnaryOp(ast.Not(), a), [cmp], [ast.UnaryOp(ast.Not(), b)])
+
+
+class _LumenOpExpander(ast.NodeTransformer):
+    """Rebuilds or/and chains that carry Lumen operator markers."""
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        default = "or" if isinstance(node.op, ast.Or) else "and"
+        operands, ops = [], []
+        pending = None
+        for value in node.values:
+            if isinstance(value, ast.Name) and value.id in _LUMEN_OP_MARKS:
+                if pending is not None or not operands:
+                    raise SyntaxError("Lumen operator without a left operand")
+                pending = _LUMEN_OP_MARKS[value.id]
+                continue
+            if operands:
+                ops.append(pending or default)
+            operands.append(value)
+            pending = None
+        if pending is not None:
+            raise SyntaxError("Lumen operator without a right operand")
+        if len(operands) == len(node.values):
+            return node
+        # xor/xand first, left to right, then the rest of the chain
+        merged, loose = [operands[0]], []
+        for op, value in zip(ops, operands[1:]):
+            if op in _LUMEN_TIGHT_OPS:
+                merged[-1] = lumen_op_node(op, merged[-1], value)
+            else:
+                loose.append(op)
+                merged.append(value)
+        result = merged[0]
+        for op, value in zip(loose, merged[1:]):
+            result = lumen_op_node(op, result, value)
+        return ast.copy_location(result, node)
+
+
+def parse_lumen_expr(expr: str):
+    """ast.parse(expr, mode="eval") that also understands the Lumen operators.
+
+    They come out as plain Python (`not (a or b)`, `(not a) != (not b)`, ...),
+    so the tree compiles and runs like any other expression.
+    """
+    marked = tokenize_lumen_ops(expr)
+    if marked is None:
+        return ast.parse(expr, mode="eval")
+    tree = _LumenOpExpander().visit(ast.parse(marked.strip(), mode="eval"))
+    return ast.fix_missing_locations(tree)
+
+
+@functools.lru_cache(maxsize=4096)
+def expand_lumen_ops(expr: str):
+    """expr as Python source with the Lumen operators expanded; expr itself
+    when it has none. Raises SyntaxError for a malformed operator expression.
+    """
+    if tokenize_lumen_ops(expr) is None:
+        return expr
+    return ast.unparse(parse_lumen_expr(expr))
+
+
+class _SafeEval:
+    """Safe evaluator for calculator() and eval_condition().
+
+    Only arithmetic, comparisons, boolean logic, the Lumen logic operators
+    and a few numeric functions are allowed. An expression is compiled once
+    (see compile_safe) into a tree of closures with every operator function
+    looked up ahead of time, so evaluating it is just nested calls. Names,
+    when used, are read from the mapping passed to eval().
+    """
+
+    BINARY = {
+        ast.Add: operator.add,
+        ast.Sub: operator.sub,
+        ast.Mult: operator.mul,
+        ast.Div: operator.truediv,
+        ast.FloorDiv: operator.floordiv,
+        ast.Mod: operator.mod,
+        ast.Pow: operator.pow,
+        ast.BitOr: operator.or_,
+        ast.BitAnd: operator.and_,
+        ast.BitXor: operator.xor,
+        ast.LShift: operator.lshift,
+        ast.RShift: operator.rshift,
+    }
+    UNARY = {
+        ast.Not: operator.not_,
+        ast.Invert: operator.invert,
+        ast.USub: operator.neg,
+        ast.UAdd: operator.pos,
+    }
+    COMPARE = {
+        ast.Eq: operator.eq,
+        ast.NotEq: operator.ne,
+        ast.Lt: operator.lt,
+        ast.LtE: operator.le,
+        ast.Gt: operator.gt,
+        ast.GtE: operator.ge,
+    }
+    FUNCTIONS = {"abs": abs, "round": round, "min": min, "max": max}
+
+    @classmethod
+    def compile(cls, expr):
+        """Compile expr to a function of one argument, the names mapping (or None)."""
+        tree = parse_lumen_expr(expr.strip())
+        return cls.build(tree.body)
+
+    @classmethod
+    def eval(cls, expr, names=None):
+        return compile_safe(expr)(names)
+
+    @classmethod
+    def build(cls, node):
+        return cls.closure(node)[0]
+
+    @classmethod
+    def closure(cls, node):
+        """Return (fn, constant) for node; constant subtrees are evaluated right away."""
+        if isinstance(node, ast.Constant):
+            value = node.value
+            if type(value) not in (int, float, complex, bool, str):
+                raise ValueError(f"Unsupported constant: {value!r}")
+            return (lambda names: value), True
+        if isinstance(node, ast.Name):
+            name = node.id
+
+            def load(names):
+                if names is None or name not in names:
+                    raise ValueError(f"Unknown name: {name}")
+                return names[name]
+            return load, False
+        if isinstance(node, ast.BinOp):
+            op = cls.BINARY.get(type(node.op))
+            if op is None:
+                raise ValueError(f"Unsupported binary operator: {type(node.op)}")
+            (left, lconst), (right, rconst) = cls.closure(node.left), cls.closure(node.right)
+            const = lconst and rconst and not cls.too_big(node.op, left(None), right(None))
+            return cls.fold(lambda names: op(left(names), right(names)), const)
+        if isinstance(node, ast.UnaryOp):
+            op = cls.UNARY.get(type(node.op))
+            if op is None:
+                raise ValueError(f"Unsupported unary operator: {type(node.op)}")
+            operand, const = cls.closure(node.operand)
+            return cls.fold(lambda names: op(operand(names)), const)
+        if isinstance(node, ast.BoolOp):
+            built = [cls.closure(v) for v in node.values]
+            values = [fn for fn, _ in built]
+            const = all(c for _, c in built)
+            if isinstance(node.op, ast.And):
+                return cls.fold(lambda names: all(v(names) for v in values), const)
+            return cls.fold(lambda names: any(v(names) for v in values), const)
+        if isinstance(node, ast.Compare):
+            return cls.compare(node)
+        if isinstance(node, ast.Call):
+            return cls.call(node), False
+        raise ValueError(f"Unsupported expression: {type(node)}")
+
+    @classmethod
+    def compare(cls, node):
+        ops = []
+        for op in node.ops:
+            fn = cls.COMPARE.get(type(op))
+            if fn is None:
+                raise ValueError(f"Unsupported comparison operator: {type(op)}")
+            ops.append(fn)
+        built = [cls.closure(n) for n in [node.left, *node.comparators]]
+        const = all(c for _, c in built)
+        left, rights = built[0][0], [fn for fn, _ in built[1:]]
+        if len(ops) == 1:
+            op, right = ops[0], rights[0]
+            return cls.fold(lambda names: bool(op(left(names), right(names))), const)
+        pairs = list(zip(ops, rights))
+
+        def chain(names):
+            a = left(names)
+            for op, right in pairs:
+                b = right(names)
+                if not op(a, b):
+                    return False
+                a = b
             return True
-        elif isinstance(node, ast.Call):
-            # Handle lumen_op calls
-            func_name = node.func.id
-            if func_name == "lumen_op":
-                a = self.visit(node.args[0])
-                b = self.visit(node.args[1])
-                op = node.args[2].s
-                return self.lumen_ops[op](a, b)
+        return cls.fold(chain, const)
+
+    @classmethod
+    def call(cls, node):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise ValueError("Unsupported function call")
+        func_name = node.func.id
+        fn = cls.FUNCTIONS.get(func_name)
+        if fn is None:
             raise ValueError(f"Unsupported function call: {func_name}")
-        elif isinstance(node, ast.Constant):
-            return node.value
-        else:
-            raise ValueError(f"Unsupported expression: {type(node)}")
-
-    def eval(self, expr):
-        # Convert Lumen operators to function calls: a !& b -> lumen_op(a,b,'!&')
-        for op in sorted(self.lumen_ops, key=len, reverse=True):
-            expr = re.sub(
-                rf'(\S+)\s*{re.escape(op)}\s*(\S+)',
-                r'lumen_op(\1,\2,"' + op + '")',
-                expr
-            )
-
-        # Define safe lumen_op
-        def lumen_op(a, b, op):
-            return self.lumen_ops[op](a, b)
-
-        # Parse and evaluate
-        tree = ast.parse(expr, mode='eval')
-        return self.visit(tree)
+        args = [cls.build(a) for a in node.args]
+        return lambda names: fn(*[a(names) for a in args])
+
+    @staticmethod
+    def too_big(op, a, b):
+        """Whether a op b could take long or a lot of memory to work out (9**9**9, "a" * 10**9).
+
+        Same limits as _ConstantFolder: those stay unfolded and are left to evaluation.
+        """
+        if isinstance(op, (ast.Pow, ast.LShift)):
+            return not isinstance(b, (int, float)) or abs(b) > 64
+        if isinstance(op, ast.Mult):
+            if isinstance(b, str):
+                a, b = b, a
+            return isinstance(a, str) and isinstance(b, int) and len(a) * b > _ConstantFolder.MAX_SIZE
+        return False
+
+    @staticmethod
+    def fold(fn, const):
+        """Evaluate a constant subtree now, so it costs nothing per call.
+
+        Anything that fails (1/0, ...) or comes out huge stays a closure, so
+        errors still happen at evaluation and cached forms stay small.
+        """
+        if not const:
+            return fn, False
+        try:
+            value = fn(None)
+        except Exception:
+            return fn, False
+        if isinstance(value, str) and len(value) > 4096 or isinstance(value, int) and value.bit_length() > 4096:
+            return fn, False
+        return (lambda names: value), True
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_safe(expr: str):
+    """_SafeEval.compile, memoized in a bounded LRU keyed by source text."""
+    return _SafeEval.compile(expr)
+
+
 def calculator(expr: str):
     try:
         return _SafeEval.eval(expr)
     except Exception as e:
         return f"Error: {e}"
-def eval_condition(expr: str) -> bool:
+
+
+# decimal int/float literals, as the parser would read them (no 0x, 1_000, 2j, 007)
+_CALC_NUMBER_RE = re.compile(r'((?<![\w.])(?:\d+\.\d*|\.\d+|0|[1-9]\d*)(?:[eE][+-]?\d+)?(?![\w.]))')
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_calc_shape(texts: tuple):
+    """Compile an expression whose number literals were cut out of it.
+
+    texts is the expression split around its numbers; they come back as
+    parameters __0, __1, ... so lines that differ only in their numbers
+    (test vectors, one formula over many inputs) share one compiled form.
+    Returns (fn, parameter names).
+    """
+    names = tuple(f"__{i}" for i in range(len(texts) - 1))
+    src = texts[0] + "".join(name + text for name, text in zip(names, texts[1:]))
+    return _SafeEval.compile(src), names
+
+
+def calculate_lines(lines):
+    """Evaluate one expression per line, yielding calculator()-style results.
+
+    Lazy, so a file or pipe of any size streams through in constant memory.
+    Blank lines and lines starting with '#' are skipped.
+    """
+    split = _CALC_NUMBER_RE.split
+    for line in lines:
+        line = line.strip()
+        if not line or line[0] == "#":
+            continue
+        try:
+            if '"' in line or "'" in line or "__" in line:
+                # numbers inside strings, or names that could clash with the parameters
+                result = _SafeEval.eval(line)
+            else:
+                pieces = split(line)
+                fn, names = compile_calc_shape(tuple(pieces[0::2]))
+                values = [float(n) if "." in n or "e" in n or "E" in n else int(n) for n in pieces[1::2]]
+                result = fn(dict(zip(names, values)))
+        except Exception as e:
+            result = f"Error: {e}"
+        yield result
+def eval_condition(expr: str, names=None) -> bool:
     try:
-        return bool(_SafeEval.eval(expr))
+        return bool(_SafeEval.eval(expr, names))
     except Exception:
         return False
-class LumenInterpreter:
-    """A compact, careful rewrite of the Lumen interpreter.
-
-    - Proper block collection (run_file handles multi-line blocks for func/class/if/cycle)
-    - Scope stack for functions (locals) with globals available for evaluation
-    - eval_expr merges globals + top locals and provides safe builtin helpers
-    - Functions bodies are stored as lists of lines and executed inside a pushed local scope
-    - cycle (while) supports multi-line bodies and inline single-line bodies
-    - print handles parentheses, plain expressions, and manual '+' concatenation without inserting extra spaces
-    - typed declarations (int/str/float/bool) and `scan` supported
-    - increment/decrement supports x++, x ++ 5, x++5, x++(expr), x ++ y
+def split_top_level(s: str, sep: str):
+    """Split s on sep but only at top-level (not inside quotes or parentheses).
+    Returns list of parts (may include whitespace that caller should strip).
     """
+    parts = []
+    buf = []
+    depth = 0
+    in_s = False
+    in_d = False
+    i = 0
+    while i < len(s):
+        ch = s[i]
+        if ch == "'" and not in_d:
+            in_s = not in_s
+            buf.append(ch)
+        elif ch == '"' and not in_s:
+            in_d = not in_d
+            buf.append(ch)
+        elif not in_s and not in_d:
+            if ch in "([{":
+                depth += 1
+                buf.append(ch)
+            elif ch in ")]}":
+                depth -= 1
+                buf.append(ch)
+            elif ch == sep and depth == 0:
+                parts.append(''.join(buf))
+                buf = []
+            else:
+                buf.append(ch)
+        else:
+            buf.append(ch)
+        i += 1
+    if buf:
+        parts.append(''.join(buf))
+    return parts
 
-    def __init__(self):
-        self.globals = {}
-        self.functions = {}
-        #self.classes = {} Scrapped, no OOPLs :(
-        self.scope_stack = []
 
-    #utils
-    def current_locals(self):
-        return self.scope_stack[-1] if self.scope_stack else {}
+def is_quoted(s: str):
+    return len(s) >= 2 and s[0] == s[-1] and s[0] in "\"'"
 
-    def split_top_level(self, s: str, sep: str):
-        """Split s on sep but only at top-level (not inside quotes or parentheses).
-        Returns list of parts (may include whitespace that caller should strip).
-        """
-        parts = []
-        buf = []
-        depth = 0
-        in_s = False
-        in_d = False
-        i = 0
-        while i < len(s):
-            ch = s[i]
-            if ch == "'" and not in_d:
-                in_s = not in_s
+
+# Lumen syntax tree. Expressions stay as source text; only the statement
+# structure is parsed, so every node is built once and walked many times.
+class LumenNode:
+    __slots__ = ("line",)
+
+
+class LumenDecl(LumenNode):
+    __slots__ = ("decl", "name", "expr", "scan", "prompt")
+
+    def __init__(self, line, decl, name, expr=None, scan=False, prompt=""):
+        self.line = line
+        self.decl = decl
+        self.name = name
+        self.expr = expr
+        self.scan = scan
+        self.prompt = prompt
+
+
+class LumenIncDec(LumenNode):
+    __slots__ = ("name", "op", "amount")
+
+    def __init__(self, line, name, op, amount=None):
+        self.line = line
+        self.name = name
+        self.op = op
+        self.amount = amount
+
+
+class LumenPrint(LumenNode):
+    __slots__ = ("expr", "parts")
+
+    def __init__(self, line, expr, parts=None):
+        self.line = line
+        self.expr = expr
+        # parts of a manual '+' concatenation, pre-split at parse time
+        self.parts = parts
+
+
+class LumenAssign(LumenNode):
+    __slots__ = ("name", "expr")
+
+    def __init__(self, line, name, expr):
+        self.line = line
+        self.name = name
+        self.expr = expr
+
+
+class LumenSetItem(LumenNode):
+    """name[index] = expr"""
+    __slots__ = ("name", "index", "expr")
+
+    def __init__(self, line, name, index, expr):
+        self.line = line
+        self.name = name
+        self.index = index
+        self.expr = expr
+
+
+class LumenIf(LumenNode):
+    __slots__ = ("cond", "body", "orelse")
+
+    def __init__(self, line, cond, body, orelse=None):
+        self.line = line
+        self.cond = cond
+        self.body = body
+        self.orelse = orelse
+
+
+class LumenCycle(LumenNode):
+    __slots__ = ("cond", "body", "hoisted", "fallback", "counted")
+
+    def __init__(self, line, cond, body):
+        self.line = line
+        self.cond = cond
+        self.body = body
+        # set by LumenOptimizer: [(temp name, expr, input names)] computed
+        # before the loop, and the unhoisted loop to run if that fails
+        self.hoisted = None
+        self.fallback = None
+        # counted_loop()'s match (False when it isn't one), filled in on the first run
+        self.counted = None
+
+
+class LumenFuncDef(LumenNode):
+    __slots__ = ("name", "params", "body")
+
+    def __init__(self, line, name, params, body):
+        self.line = line
+        self.name = name
+        self.params = params
+        self.body = body
+
+
+class LumenCall(LumenNode):
+    __slots__ = ("name", "args", "codes")
+
+    def __init__(self, line, name, args):
+        self.line = line
+        self.name = name
+        self.args = args
+        # the arguments compiled as one tuple expression, filled in on the first call
+        self.codes = None
+
+
+class LumenSpawn(LumenNode):
+    """`spawn f(args)`: run a call as a cooperative task (see LumenInterpreter.spawn)."""
+    __slots__ = ("call",)
+
+    def __init__(self, line, call):
+        self.line = line
+        self.call = call
+
+
+class LumenYield(LumenNode):
+    __slots__ = ()
+
+    def __init__(self, line):
+        self.line = line
+
+
+class LumenSleep(LumenNode):
+    __slots__ = ("expr",)
+
+    def __init__(self, line, expr):
+        self.line = line
+        self.expr = expr
+
+
+_BLOCK_KEYWORD = re.compile(r'(func|if|cycle|else|class)\b')
+_DECL_RE = re.compile(r'(int|str|float|bool|array)\s+(.*)$', re.S)
+_INCDEC_RE = re.compile(r'([A-Za-z_]\w*)\s*(\+\+|--)\s*(.*)$', re.S)
+_PRINT_RE = re.compile(r'print(?![\w])(.*)$', re.S)
+_CALL_RE = re.compile(r'([A-Za-z_]\w*)\s*\((.*)\)\s*$', re.S)
+_SPAWN_RE = re.compile(r'spawn\s+([A-Za-z_]\w*\s*\(.*\))\s*$', re.S)
+_SLEEP_RE = re.compile(r'sleep\s*\((.*)\)\s*$', re.S)
+_ELSE_RE = re.compile(r'else\b')
+_NAME_RE = re.compile(r'[A-Za-z_]\w*$')
+_SUBSCRIPT_RE = re.compile(r'([A-Za-z_]\w*)\s*\[(.*)\]$', re.S)
+_FUNC_HEADER_RE = re.compile(r'func\s+([A-Za-z_]\w*)\s*\((.*)\)\s*$', re.S)
+_COND_HEADER_RE = re.compile(r'(if|cycle)\s*\((.*)\)\s*$', re.S)
+
+
+def tokenize_lumen(lines):
+    """Turn Lumen source into a stream of (kind, text, line) tokens.
+
+    `lines` is any iterable of source lines (a file object, a list, ...).
+    kind is "stmt" for a statement, or "{" / "}" for block braces. Newlines
+    and ';' end a statement unless they sit inside quotes or brackets, and
+    a '{' only opens a block after func/if/cycle/else (or on its own), so
+    dict/set literals inside expressions are left alone.
+    """
+    buf = []
+    depth = 0
+    quote = None
+    escaped = False
+    line_no = 1
+    start = 1
+    for text in lines:
+        if not text.endswith("\n"):
+            # items from splitlines() or a REPL carry no newline of their own
+            text += "\n"
+        for ch in text:
+            if quote:
+                buf.append(ch)
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == quote:
+                    quote = None
+            elif ch == '"' or ch == "'":
+                if not buf:
+                    start = line_no
+                quote = ch
+                buf.append(ch)
+            elif ch in "([":
+                depth += 1
                 buf.append(ch)
-            elif ch == '"' and not in_s:
-                in_d = not in_d
+            elif ch in ")]":
+                depth -= 1
                 buf.append(ch)
-            elif not in_s and not in_d:
-                if ch in "([{":
+            elif ch == "{":
+                stmt = "".join(buf).strip()
+                if depth == 0 and (not stmt or _BLOCK_KEYWORD.match(stmt)):
+                    if stmt:
+                        yield "stmt", stmt, start
+                    yield "{", "{", line_no
+                    buf = []
+                else:
                     depth += 1
                     buf.append(ch)
-                elif ch in ")]}":
-                    depth -= 1
-                    buf.append(ch)
-                elif ch == sep and depth == 0:
-                    parts.append(''.join(buf))
+            elif ch == "}":
+                if depth == 0:
+                    stmt = "".join(buf).strip()
+                    if stmt:
+                        yield "stmt", stmt, start
+                    yield "}", "}", line_no
                     buf = []
                 else:
+                    depth -= 1
                     buf.append(ch)
-            else:
+            elif (ch == ";" or ch == "\n") and depth == 0:
+                stmt = "".join(buf).strip()
+                if stmt:
+                    yield "stmt", stmt, start
+                buf = []
+            elif buf or not ch.isspace():
+                if not buf:
+                    start = line_no
                 buf.append(ch)
-            i += 1
-        if buf:
-            parts.append(''.join(buf))
-        return parts
+            if ch == "\n":
+                line_no += 1
+    if quote:
+        raise Exception(f"Lumen Error: Unterminated string starting on line {start}")
+    stmt = "".join(buf).strip()
+    if stmt:
+        yield "stmt", stmt, start
 
-    def eval_expr(self, expr: str):
-        """Evaluate an expression using globals + current locals.
 
-        Raises:
-            Exception on syntax/runtime errors
-            NameError if a name is missing (caller may choose to handle it)
+class LumenParser:
+    """Builds LumenNode trees from the token stream of tokenize_lumen."""
+
+    def __init__(self, lines):
+        self.tokens = tokenize_lumen(lines)
+        self._peeked = None
+
+    def _next(self):
+        if self._peeked is not None:
+            tok, self._peeked = self._peeked, None
+            return tok
+        return next(self.tokens, None)
+
+    def _peek(self):
+        if self._peeked is None:
+            self._peeked = next(self.tokens, None)
+        return self._peeked
+
+    def __iter__(self):
+        """Yield complete top-level statements one at a time."""
+        while self._peek() is not None:
+            yield self.parse_statement()
+
+    def parse(self):
+        return list(self)
+
+    @staticmethod
+    def expr(text):
+        """text with the Lumen operators expanded, once, at parse time.
+
+        A malformed one is left as written, so it fails at runtime with the
+        usual expression error, same as any other bad expression.
         """
-        expr = expr.strip()
-        if expr == "":
-            raise Exception("Lumen Error: Empty expression")
+        try:
+            return expand_lumen_ops(text)
+        except SyntaxError:
+            return text
+
+    def parse_block(self, line):
+        tok = self._next()
+        if tok is None or tok[0] != "{":
+            raise Exception(f"Lumen Error: Expected '{{' on line {line}")
+        body = []
+        while True:
+            tok = self._peek()
+            if tok is None:
+                raise Exception(f"Lumen Error: Unclosed block starting on line {line}")
+            if tok[0] == "}":
+                self._next()
+                return body
+            body.append(self.parse_statement())
+
+    def parse_statement(self):
+        kind, text, line = self._next()
+        if kind != "stmt":
+            raise Exception(f"Lumen Error: Unexpected '{text}' on line {line}")
+        keyword = _BLOCK_KEYWORD.match(text)
+        if keyword:
+            return self.parse_compound(keyword.group(1), text, line)
+        return self.parse_simple(text, line)
+
+    def parse_compound(self, keyword, header, line):
+        if keyword == "func":
+            m = _FUNC_HEADER_RE.match(header)
+            if not m:
+                raise Exception(f"Lumen Error: Invalid function header '{header}'")
+            params = []
+            params_raw = m.group(2).strip()
+            if params_raw:
+                for p in split_top_level(params_raw, ","):
+                    p = p.strip()
+                    if not p:
+                        continue
+                    parts = p.split()
+                    if len(parts) != 2:
+                        raise Exception(f"Lumen Error: Invalid parameter '{p}'")
+                    params.append((parts[0], parts[1]))
+            return LumenFuncDef(line, m.group(1), params, self.parse_block(line))
+
+        if keyword in ("if", "cycle"):
+            m = _COND_HEADER_RE.match(header)
+            if not m:
+                raise Exception(f"Lumen Error: Invalid {keyword} condition")
+            cond = self.expr(m.group(2).strip())
+            body = self.parse_block(line)
+            if keyword == "cycle":
+                return LumenCycle(line, cond, body)
+            orelse = None
+            tok = self._peek()
+            if tok is not None and tok[0] == "stmt" and _ELSE_RE.match(tok[1]):
+                _, text, else_line = self._next()
+                rest = text[len("else"):].strip()
+                if not rest:
+                    orelse = self.parse_block(else_line)
+                elif rest.startswith("if"):
+                    orelse = [self.parse_compound("if", rest, else_line)]
+                else:
+                    raise Exception(f"Lumen Error: Invalid else on line {else_line}")
+            return LumenIf(line, cond, body, orelse)
+
+        if keyword == "else":
+            raise Exception(f"Lumen Error: 'else' without 'if' on line {line}")
+        raise Exception(f"Lumen Error: Unknown statement '{header}'")
+
+    def parse_call(self, text, line):
+        m = _CALL_RE.match(text)
+        if not m:
+            return None
+        args_raw = m.group(2).strip()
+        args = []
+        if args_raw:
+            args = [self.expr(p.strip()) for p in split_top_level(args_raw, ",") if p.strip()]
+        return LumenCall(line, m.group(1), args)
+
+    def parse_simple(self, stripped, line):
+        # typed declarations, just how god intended
+        m = _DECL_RE.match(stripped)
+        if m:
+            decl, rest = m.group(1), m.group(2).strip()
+            if "=" not in rest:
+                return LumenDecl(line, decl, rest)
+            varname, rhs = rest.split("=", 1)
+            varname = varname.strip()
+            rhs = rhs.strip()
+            if rhs.startswith("scan"):
+                prompt_expr = rhs[len("scan"):].strip()
+                if prompt_expr.startswith("(") and prompt_expr.endswith(")"):
+                    prompt_expr = prompt_expr[1:-1].strip()
+                return LumenDecl(line, decl, varname, scan=True, prompt=self.expr(prompt_expr))
+            return LumenDecl(line, decl, varname, self.expr(rhs))
+
+        # increment/decrement
+        m = _INCDEC_RE.match(stripped)
+        if m:
+            varname, op, amt_expr = m.groups()
+            return LumenIncDec(line, varname, op, self.expr(amt_expr.strip()) or None)
+
+        # print
+        m = _PRINT_RE.match(stripped)
+        if m:
+            expr = m.group(1).strip()
+            if expr.startswith("(") and expr.endswith(")"):
+                expr = expr[1:-1].strip()
+            parts = None
+            if "+" in expr:
+                parts = []
+                for p in split_top_level(expr, "+"):
+                    p = p.strip()
+                    parts.append(p if is_quoted(p) else self.expr(p))
+            return LumenPrint(line, self.expr(expr), parts)
+
+        # tasks: spawn f(args), yield, sleep(seconds)
+        if stripped == "yield":
+            return LumenYield(line)
+        m = _SLEEP_RE.match(stripped)
+        if m:
+            return LumenSleep(line, self.expr(m.group(1).strip()))
+        m = _SPAWN_RE.match(stripped)
+        if m:
+            return LumenSpawn(line, self.parse_call(m.group(1), line))
+
+        # calling fns
+        call = self.parse_call(stripped, line)
+        if call is not None:
+            return call
+
+        if "=" in stripped:
+            varname, rhs = stripped.split("=", 1)
+            varname = varname.strip()
+            if _NAME_RE.match(varname):
+                return LumenAssign(line, varname, self.expr(rhs.strip()))
+            # element assignment, a[i] = expr
+            m = _SUBSCRIPT_RE.match(varname)
+            if m:
+                return LumenSetItem(line, m.group(1), self.expr(m.group(2).strip()), self.expr(rhs.strip()))
+
+        raise Exception(f"Lumen Error: Unknown statement '{stripped}'")
+
+
+LUMEN_DEFAULTS = {"int": 0, "float": 0.0, "bool": False, "str": "", "array": ()}
 
-        # Build evaluation environment: start with globals, then local overrides
-        env = dict(self.globals)
-        if self.scope_stack:
-            # locals should override globals
-            env.update(self.scope_stack[-1])
 
-        # Provide small safe builtins for convenience (only if not shadowed)
-        for k, v in (("str", str), ("int", int), ("float", float), ("bool", bool), ("len", len)):
-            if k not in env:
-                env[k] = v
+class LumenArray(array.array):
+    """Lumen's `array` type: a compact buffer of int64 ('q') or double ('d') values.
 
+    Indexing, len(), sum(), min() and max() come straight from array.array,
+    and slices stay LumenArrays. + - * / are element-wise, against another
+    array of the same length or a number, and run as one bulk pass (a map
+    over the operator function) rather than one Lumen statement per element.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        if index.__class__ is slice:
+            return LumenArray(self.typecode, array.array.__getitem__(self, index))
+        return array.array.__getitem__(self, index)
+
+    def __str__(self):
+        return str(self.tolist())
+
+    __repr__ = __str__
+
+    def elementwise(self, other, op, reflected=False):
+        n = len(self)
+        if isinstance(other, array.array):
+            if len(other) != n:
+                raise ValueError(f"array lengths differ ({n} and {len(other)})")
+            floats = "d" in (self.typecode, other.typecode)
+        elif isinstance(other, (int, float)):
+            floats = self.typecode == "d" or type(other) is float
+            other = itertools.repeat(other, n)
+        else:
+            return NotImplemented
+        values = map(op, other, self) if reflected else map(op, self, other)
+        return LumenArray("d" if floats or op is operator.truediv else "q", values)
+
+    def __add__(self, other):
+        return self.elementwise(other, operator.add)
+
+    def __radd__(self, other):
+        return self.elementwise(other, operator.add, True)
+
+    def __sub__(self, other):
+        return self.elementwise(other, operator.sub)
+
+    def __rsub__(self, other):
+        return self.elementwise(other, operator.sub, True)
+
+    def __mul__(self, other):
+        return self.elementwise(other, operator.mul)
+
+    def __rmul__(self, other):
+        return self.elementwise(other, operator.mul, True)
+
+    def __truediv__(self, other):
+        return self.elementwise(other, operator.truediv)
+
+    def __rtruediv__(self, other):
+        return self.elementwise(other, operator.truediv, True)
+
+    # array.array's in-place forms append/repeat; Lumen has no +=, but keep them element-wise too
+    __iadd__ = __add__
+    __imul__ = __mul__
+
+
+def lumen_print_parts(values):
+    """Text for print's '+' fallback in compiled code: the parts' values joined.
+
+    Called while handling the error the whole expression raised. Two or
+    more arrays among the parts means that expression was array arithmetic
+    (say, lengths that differ), not a concatenation, so that error is
+    raised again instead.
+    """
+    arrays = 0
+    for value in values:
+        if isinstance(value, LumenArray):
+            arrays += 1
+    if arrays > 1:
+        raise
+    return "".join(map(str, values))
+
+
+def lumen_array(values):
+    """Convert the value of an `array` declaration (a list, range, array, ...) to a LumenArray."""
+    if isinstance(values, LumenArray):
+        return values
+    if isinstance(values, (str, bytes)):
+        raise Exception("Lumen Error: array values must be numbers, got a string")
+    if isinstance(values, array.array):
+        return LumenArray("d" if values.typecode in "fd" else "q", values)
+    if not isinstance(values, (list, tuple, range)):
+        # one pass may be all an iterator gives us, and an int attempt comes first
         try:
-            return eval(expr, {}, env)
-        except NameError:
-            # bubble up NameError so callers can decide fallback behavior
-            raise
-        except SyntaxError as e:
-            raise Exception(f"Lumen Error: invalid syntax in expression '{expr}': {e}")
-        except Exception as e:
-            raise Exception(f"Lumen Error: Error evaluating '{expr}': {e}")
+            values = list(values)
+        except TypeError:
+            raise Exception(f"Lumen Error: array needs a sequence of numbers, got {type(values).__name__}")
+    try:
+        return LumenArray("q", values)
+    except TypeError:
+        pass
+    except OverflowError:
+        raise Exception("Lumen Error: array int values must fit in 64 bits")
+    try:
+        return LumenArray("d", values)
+    except TypeError:
+        raise Exception("Lumen Error: array values must be numbers")
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_expr(expr: str):
+    """Compile a Lumen expression to a code object, memoized by source text.
+
+    The cache is a bounded LRU, so a long session evaluating many distinct
+    expressions cannot grow it without limit.
+    """
+    src = expr.strip()
+    if src == "":
+        raise Exception("Lumen Error: Empty expression")
+    try:
+        return compile(expand_lumen_ops(src), "<lumen>", "eval")
+    except SyntaxError as e:
+        raise Exception(f"Lumen Error: invalid syntax in expression '{src}': {e}")
+
+
+def parse_lumen(source):
+    """Parse Lumen source (a string or an iterable of lines) into a node list."""
+    if isinstance(source, str):
+        source = source.splitlines(keepends=True)
+    return LumenParser(source).parse()
+
+
+_IF_HEADER_RE = re.compile(r'(else\s+)?if\b')
+
+
+def lumen_input_state(source):
+    """Where interactive input stands: "open" while a block or string is
+    still unclosed, "if" when it ends in a complete if (an else may follow
+    on the next line), "" when it can run.
+    """
+    depth = 0
+    last = None
+    try:
+        for kind, text, _ in tokenize_lumen(source.splitlines()):
+            if kind == "{":
+                depth += 1
+            elif kind == "}":
+                depth -= 1
+            elif depth == 0:
+                last = text
+    except Exception:
+        # unterminated string, the rest of it is still to come
+        return "open"
+    if depth > 0:
+        return "open"
+    if depth == 0 and last is not None and source.rstrip().endswith("}") and _IF_HEADER_RE.match(last):
+        return "if"
+    return ""
+
+
+class _ConstantFolder(ast.NodeTransformer):
+    """Folds operator subtrees whose operands are all constants."""
+
+    # results bigger than this stay as code, so folding can't bloat a program
+    MAX_SIZE = 4096
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant):
+            right = node.right.value
+            if isinstance(node.op, (ast.Pow, ast.LShift)) and (not isinstance(right, (int, float)) or abs(right) > 64):
+                return node
+            if isinstance(node.op, ast.Mult) and isinstance(node.left.value, str) and isinstance(right, int) \
+                    and len(node.left.value) * right > self.MAX_SIZE:
+                return node
+            return self.fold(node)
+        return node
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.operand, ast.Constant):
+            return self.fold(node)
+        return node
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        if all(isinstance(v, ast.Constant) for v in node.values):
+            return self.fold(node)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if isinstance(node.left, ast.Constant) and all(isinstance(c, ast.Constant) for c in node.comparators):
+            return self.fold(node)
+        return node
+
+    def fold(self, node):
+        try:
+            value = eval(compile(ast.Expression(node), "<fold>", "eval"), {"__builtins__": {}})
+        except Exception:
+            # leave it for runtime, so the error still happens where it used to
+            return node
+        if type(value) not in (int, float, bool, str, complex):
+            return node
+        if type(value) is str and len(value) > self.MAX_SIZE:
+            return node
+        if type(value) is int and value.bit_length() > self.MAX_SIZE:
+            return node
+        return ast.copy_location(ast.Constant(value), node)
+
+
+# loop-invariant candidates: operators over names and constants only, so
+# evaluating them early can't have side effects
+_PURE_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.Name, ast.Load,
+               ast.Constant, ast.operator, ast.unaryop, ast.boolop, ast.cmpop)
+# hoisted inputs must hold one of these when the loop starts, so nothing in
+# the loop can mutate them behind the hoisted value's back
+LUMEN_SCALARS = (int, float, bool, str, complex, type(None))
+# builtins that can rebind variables from inside an expression
+_REBINDING_CALLS = {"globals", "locals", "vars", "exec", "eval", "setattr", "delattr", "__import__"}
+
+
+class LumenOptimizer:
+    """Optimization pass over parsed Lumen programs.
+
+    - fold_constants: fold constant subexpressions (`10 * 1000` -> `10000`)
+    - fold_print: fold inside each part of a print and merge adjacent string
+      literals, keeping print's concatenation fallback intact
+    - hoist_invariants: compute expressions that a cycle can't change once,
+      before the loop. The cycle keeps its original form as a fallback, used
+      when an input isn't a plain scalar or the hoisted value fails to compute
+    Nodes are rebuilt rather than modified, so parsed (and cached) trees stay
+    untouched.
+    """
+
+    def __init__(self, fold_constants=True, fold_print=True, hoist_invariants=True):
+        self.fold_constants = fold_constants
+        self.fold_print = fold_print
+        self.hoist_invariants = hoist_invariants
+        self._folder = _ConstantFolder()
+        self._temp_counter = 0
+
+    @property
+    def key(self):
+        """Identifies the enabled optimizations (used to key cached programs)."""
+        return (self.fold_constants, self.fold_print, self.hoist_invariants)
+
+    def optimize(self, nodes):
+        return [self.optimize_node(node) for node in nodes]
+
+    def optimize_node(self, node):
+        cls = node.__class__
+        if cls is LumenDecl:
+            if node.expr is None:
+                return node
+            return LumenDecl(node.line, node.decl, node.name, self.fold(node.expr), node.scan, node.prompt)
+        if cls is LumenIncDec:
+            if node.amount is None:
+                return node
+            return LumenIncDec(node.line, node.name, node.op, self.fold(node.amount))
+        if cls is LumenAssign:
+            return LumenAssign(node.line, node.name, self.fold(node.expr))
+        if cls is LumenSetItem:
+            return LumenSetItem(node.line, node.name, self.fold(node.index), self.fold(node.expr))
+        if cls is LumenPrint:
+            return self.optimize_print(node)
+        if cls is LumenCall:
+            return LumenCall(node.line, node.name, [self.fold(a) for a in node.args])
+        if cls is LumenSpawn:
+            return LumenSpawn(node.line, self.optimize_node(node.call))
+        if cls is LumenSleep:
+            return LumenSleep(node.line, self.fold(node.expr))
+        if cls is LumenIf:
+            orelse = self.optimize(node.orelse) if node.orelse else node.orelse
+            return LumenIf(node.line, self.fold(node.cond), self.optimize(node.body), orelse)
+        if cls is LumenFuncDef:
+            return LumenFuncDef(node.line, node.name, node.params, self.optimize(node.body))
+        if cls is LumenCycle:
+            cycle = LumenCycle(node.line, self.fold(node.cond), self.optimize(node.body))
+            if self.hoist_invariants:
+                return self.hoist(cycle)
+            return cycle
+        return node
+
+    # constant folding
+    def fold(self, expr):
+        if not self.fold_constants:
+            return expr
+        return self.fold_expr(expr)
+
+    def fold_expr(self, expr):
+        try:
+            tree = ast.parse(expr.strip(), mode="eval")
+        except SyntaxError:
+            return expr
+        before = ast.dump(tree)
+        tree = self._folder.visit(tree)
+        if ast.dump(tree) == before:
+            return expr
+        return ast.unparse(tree)
+
+    def optimize_print(self, node):
+        if not self.fold_print or not node.expr:
+            return node
+        if node.parts is None:
+            return LumenPrint(node.line, self.fold_expr(node.expr))
+        parts = []
+        for p in node.parts:
+            if not is_quoted(p):
+                p = self.fold_expr(p)
+            literal = self.string_literal(p)
+            prev = self.string_literal(parts[-1]) if parts else None
+            if literal is not None and prev is not None:
+                merged = repr(prev + literal)
+                # only when the merged literal reads back unchanged as raw text,
+                # which is what the concatenation fallback uses
+                if merged[1:-1] == prev + literal:
+                    parts[-1] = merged
+                    continue
+            parts.append(p)
+        if len(parts) == 1 and self.string_literal(parts[0]) is not None:
+            return LumenPrint(node.line, parts[0])
+        return LumenPrint(node.line, " + ".join(parts), parts)
+
+    @staticmethod
+    def string_literal(part):
+        """The value of a plain quoted string part, or None."""
+        if not is_quoted(part):
+            return None
+        try:
+            value = ast.literal_eval(part)
+        except (ValueError, SyntaxError):
+            return None
+        # the interpreter prints the raw text between the quotes when it falls back
+        if type(value) is not str or value != part[1:-1]:
+            return None
+        return value
+
+    # loop-invariant hoisting
+    def hoist(self, cycle):
+        assigned = set()
+        for node in self.walk(cycle.body):
+            # element assignment mutates rather than rebinds, but counts all the same
+            if isinstance(node, (LumenDecl, LumenIncDec, LumenAssign, LumenSetItem)):
+                assigned.add(node.name)
+            elif isinstance(node, LumenCycle) and node.hoisted:
+                assigned.update(name for name, _, _ in node.hoisted)
+        trees = {}
+        for expr in self.loop_exprs(cycle):
+            try:
+                tree = ast.parse(expr.strip(), mode="eval")
+            except SyntaxError:
+                return cycle
+            for sub in ast.walk(tree):
+                if isinstance(sub, ast.NamedExpr):
+                    return cycle
+                if isinstance(sub, ast.Call) and isinstance(sub.func, ast.Name) and sub.func.id in _REBINDING_CALLS:
+                    return cycle
+            trees[expr] = tree
+
+        hoisted = {}
+
+        def rewrite(tree):
+            class Hoister(ast.NodeTransformer):
+                def generic_visit(inner, node):
+                    if isinstance(node, ast.expr) and self.is_invariant(node, assigned):
+                        src = ast.unparse(node)
+                        if src not in hoisted:
+                            self._temp_counter += 1
+                            names = sorted({n.id for n in ast.walk(node) if isinstance(n, ast.Name)})
+                            hoisted[src] = (f"__lumen_inv{self._temp_counter}", src, tuple(names))
+                        return ast.copy_location(ast.Name(hoisted[src][0], ast.Load()), node)
+                    return ast.NodeTransformer.generic_visit(inner, node)
+            return ast.unparse(Hoister().visit(tree))
+
+        rewritten = {expr: rewrite(tree) for expr, tree in trees.items()}
+        if not hoisted:
+            return cycle
+
+        def replace(expr):
+            return rewritten.get(expr, expr)
+
+        optimized = LumenCycle(cycle.line, replace(cycle.cond), self.substitute(cycle.body, replace))
+        optimized.hoisted = list(hoisted.values())
+        optimized.fallback = cycle
+        return optimized
+
+    @staticmethod
+    def is_invariant(node, assigned):
+        """An operator expression over names the loop never assigns."""
+        if not isinstance(node, (ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare)):
+            return False
+        has_name = False
+        for sub in ast.walk(node):
+            if not isinstance(sub, _PURE_NODES):
+                return False
+            if isinstance(sub, ast.Name):
+                if sub.id in assigned:
+                    return False
+                has_name = True
+        return has_name
+
+    def walk(self, nodes):
+        for node in nodes:
+            yield node
+            if isinstance(node, LumenIf):
+                yield from self.walk(node.body)
+                yield from self.walk(node.orelse or [])
+            elif isinstance(node, LumenCycle):
+                yield from self.walk(node.body)
+
+    def loop_exprs(self, cycle):
+        """Every expression evaluated by the loop that hoisting may rewrite."""
+        yield cycle.cond
+        for node in self.walk(cycle.body):
+            cls = node.__class__
+            if cls in (LumenDecl, LumenAssign) and node.expr is not None:
+                yield node.expr
+            elif cls is LumenIncDec and node.amount is not None:
+                yield node.amount
+            elif cls is LumenSetItem:
+                yield node.index
+                yield node.expr
+            elif cls is LumenPrint and node.parts is None and node.expr:
+                yield node.expr
+            elif cls is LumenCall:
+                yield from node.args
+            elif cls in (LumenIf, LumenCycle):
+                yield node.cond
+
+    def substitute(self, nodes, replace):
+        """Copy of nodes with every hoistable expression passed through replace."""
+        out = []
+        for node in nodes:
+            cls = node.__class__
+            if cls is LumenDecl and node.expr is not None:
+                node = LumenDecl(node.line, node.decl, node.name, replace(node.expr), node.scan, node.prompt)
+            elif cls is LumenAssign:
+                node = LumenAssign(node.line, node.name, replace(node.expr))
+            elif cls is LumenIncDec and node.amount is not None:
+                node = LumenIncDec(node.line, node.name, node.op, replace(node.amount))
+            elif cls is LumenSetItem:
+                node = LumenSetItem(node.line, node.name, replace(node.index), replace(node.expr))
+            elif cls is LumenPrint and node.parts is None and node.expr:
+                node = LumenPrint(node.line, replace(node.expr))
+            elif cls is LumenCall:
+                node = LumenCall(node.line, node.name, [replace(a) for a in node.args])
+            elif cls is LumenIf:
+                orelse = self.substitute(node.orelse, replace) if node.orelse else node.orelse
+                node = LumenIf(node.line, replace(node.cond), self.substitute(node.body, replace), orelse)
+            elif cls is LumenCycle:
+                inner = LumenCycle(node.line, replace(node.cond), self.substitute(node.body, replace))
+                # an inner loop's own hoisting stays as it was; its fallback is rewritten too
+                inner.hoisted = node.hoisted
+                if node.fallback is not None:
+                    inner.fallback = self.substitute([node.fallback], replace)[0]
+                node = inner
+            out.append(node)
+        return out
+
+
+_COUNTED_OPS = {ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">="}
+
+
+def counted_loop(cycle):
+    """Match the counted-loop shape `cycle (i <op> bound) { ...; i++ }`.
+
+    The last statement must step the induction variable by an int literal
+    towards the bound, nothing else in the body may assign it, and bound
+    must be an operator expression over names the body never assigns.
+    Returns (name, op, bound, step) or None.
+    """
+    body = cycle.body
+    if not body or body[-1].__class__ is not LumenIncDec:
+        return None
+    try:
+        test = ast.parse(cycle.cond.strip(), mode="eval").body
+    except SyntaxError:
+        return None
+    if not (isinstance(test, ast.Compare) and len(test.ops) == 1 and type(test.ops[0]) in _COUNTED_OPS
+            and isinstance(test.left, ast.Name) and test.left.id == body[-1].name):
+        return None
+    name = test.left.id
+    op = _COUNTED_OPS[type(test.ops[0])]
+
+    last = body[-1]
+    try:
+        step = 1 if last.amount is None else ast.literal_eval(last.amount.strip())
+    except (ValueError, SyntaxError):
+        return None
+    if type(step) is not int or step == 0:
+        return None
+    if last.op == "--":
+        step = -step
+    if (step > 0) != (op in ("<", "<=")):
+        return None
+
+    assigned = set()
+    exprs = []
+
+    def visit(nodes):
+        for node in nodes:
+            cls = node.__class__
+            if cls in (LumenDecl, LumenIncDec, LumenAssign, LumenSetItem):
+                assigned.add(node.name)
+            if cls in (LumenDecl, LumenAssign) and node.expr is not None:
+                exprs.append(node.expr)
+            elif cls is LumenDecl and node.prompt:
+                exprs.append(node.prompt)
+            elif cls is LumenIncDec and node.amount is not None:
+                exprs.append(node.amount)
+            elif cls is LumenSetItem:
+                exprs.extend((node.index, node.expr))
+            elif cls is LumenPrint and node.expr:
+                exprs.append(node.expr)
+            elif cls is LumenCall:
+                exprs.extend(node.args)
+            elif cls is LumenIf:
+                exprs.append(node.cond)
+                visit(node.body)
+                visit(node.orelse or [])
+            elif cls is LumenCycle:
+                exprs.append(node.cond)
+                if node.hoisted:
+                    for temp, expr, _ in node.hoisted:
+                        assigned.add(temp)
+                        exprs.append(expr)
+                    visit([node.fallback])
+                visit(node.body)
+
+    visit(body[:-1])
+    if name in assigned:
+        return None
+    # an expression that can rebind names could move the counter behind our back
+    for expr in exprs:
+        try:
+            tree = ast.parse(expr.strip(), mode="eval")
+        except SyntaxError:
+            continue
+        for sub in ast.walk(tree):
+            if isinstance(sub, ast.NamedExpr):
+                return None
+            if isinstance(sub, ast.Call) and isinstance(sub.func, ast.Name) and sub.func.id in _REBINDING_CALLS:
+                return None
+
+    bound = test.comparators[0]
+    for sub in ast.walk(bound):
+        if not isinstance(sub, _PURE_NODES):
+            return None
+        if isinstance(sub, ast.Name) and (sub.id in assigned or sub.id == name):
+            return None
+    return name, op, ast.unparse(bound), step
+
+
+def counted_range(start, op, bound, step):
+    """The range of counter values a counted loop runs its body for, or None
+    unless the counter and bound are plain ints."""
+    if type(start) is not int or type(bound) is not int:
+        return None
+    if op == "<=":
+        bound += 1
+    elif op == ">=":
+        bound -= 1
+    return range(start, bound, step)
+
+
+class LumenCompileError(Exception):
+    """Raised when a program uses something the Python backend can't translate."""
+
+
+class LumenCompiler:
+    """Translates parsed Lumen programs into Python source.
+
+    Top-level variables become module globals and Lumen functions become
+    plain `def`s, so the program runs in CPython's own bytecode loop.
+    Anything that can't be translated faithfully raises LumenCompileError,
+    and callers fall back to the tree-walking interpreter.
+    """
+
+    FUNC_PREFIX = "__lumen_fn_"
+
+    def __init__(self):
+        self.lines = []
+        self.depth = 0
+        self.in_func = False
+        self.arity = {}
+        # generated line number -> (form, lumen text, ...): what that line
+        # evaluates, so runtime_error can word an error like the interpreter.
+        # Every expression that can fail gets a line of its own.
+        self.origins = {}
+        self._handlers = {
+            LumenDecl: self.emit_decl,
+            LumenIncDec: self.emit_incdec,
+            LumenPrint: self.emit_print,
+            LumenAssign: self.emit_assign,
+            LumenSetItem: self.emit_setitem,
+            LumenIf: self.emit_if,
+            LumenCycle: self.emit_cycle,
+            LumenFuncDef: self.emit_funcdef,
+            LumenCall: self.emit_call,
+        }
+
+    def translate(self, nodes):
+        """Return Python source for a list of LumenNodes."""
+        self.lines = []
+        self.arity = {}
+        self.origins = {}
+        self.collect_functions(nodes)
+        self.emit_block(nodes)
+        return "\n".join(self.lines) + "\n"
+
+    def compile(self, nodes, filename="<lumen>"):
+        source = self.translate(nodes)
+        try:
+            return compile(source, filename, "exec")
+        except SyntaxError as e:
+            raise LumenCompileError(f"generated code does not compile: {e}")
+
+    def collect_functions(self, nodes):
+        for node in nodes:
+            if isinstance(node, LumenFuncDef):
+                n = len(node.params)
+                if self.arity.setdefault(node.name, n) != n:
+                    raise LumenCompileError(f"function '{node.name}' is redefined with a different arity")
+                self.collect_functions(node.body)
+            elif isinstance(node, LumenIf):
+                self.collect_functions(node.body)
+                self.collect_functions(node.orelse or [])
+            elif isinstance(node, LumenCycle):
+                self.collect_functions(node.body)
+
+    def emit(self, text, origin=None):
+        first, *rest = text.split("\n")
+        self.lines.append("    " * self.depth + first)
+        # an expression spanning lines (inside brackets) keeps its own layout
+        self.lines.extend(rest)
+        if origin is not None:
+            for n in range(len(self.lines) - len(rest), len(self.lines) + 1):
+                self.origins[n] = origin
+
+    def emit_block(self, nodes):
+        if not nodes:
+            self.emit("pass")
+        for node in nodes:
+            handler = self._handlers.get(node.__class__)
+            if handler is None:
+                # spawn/yield/sleep need the interpreter's task scheduler
+                raise LumenCompileError(f"no Python form for {node.__class__.__name__}")
+            handler(node)
+
+    def expr(self, expr):
+        expr = expr.strip()
+        if not expr:
+            raise LumenCompileError("empty expression")
+        try:
+            compile_expr(expr)
+        except Exception as e:
+            raise LumenCompileError(str(e))
+        return f"({expr})"
+
+    def emit_decl(self, node):
+        if node.scan:
+            if node.prompt:
+                self.emit(f"{node.name} = __lumen_scan__({node.decl!r}, str(")
+                self.emit(f"    {self.expr(node.prompt)}", ("scan", node.prompt))
+                self.emit("))")
+            else:
+                self.emit(f"{node.name} = __lumen_scan__({node.decl!r}, '')")
+        elif node.expr is not None:
+            value = self.expr(node.expr)
+            if node.decl == "array":
+                self.emit(f"{node.name} = __lumen_array__(")
+                self.emit(f"    {value}", ("eval", node.expr))
+                self.emit(")")
+            else:
+                self.emit(f"{node.name} = {value}", ("eval", node.expr))
+        else:
+            value = repr(LUMEN_DEFAULTS[node.decl])
+            self.emit(f"{node.name} = __lumen_array__({value})" if node.decl == "array" else f"{node.name} = {value}")
+
+    def emit_incdec(self, node):
+        op = "+" if node.op == "++" else "-"
+        if node.amount is None:
+            self.emit(f"{node.name} = {node.name} {op} 1", ("var", node.name))
+            return
+        self.emit(f"{node.name} = {node.name} {op} (", ("var", node.name))
+        self.emit(f"    {self.expr(node.amount)}", ("eval", node.amount))
+        self.emit(")")
+
+    def emit_assign(self, node):
+        self.emit(f"{node.name} = {self.expr(node.expr)}", ("eval", node.expr))
+
+    def emit_setitem(self, node):
+        # Python runs this in the interpreter's order: the value, the target,
+        # the index, then the store (reported on the first line)
+        self.emit(f"{node.name}[", ("setitem", f"{node.name}[{node.index}]", node.name))
+        self.emit(f"    {self.expr(node.index)}", ("eval", node.index))
+        self.emit("] = (")
+        self.emit(f"    {self.expr(node.expr)}", ("eval", node.expr))
+        self.emit(")")
+
+    def emit_print(self, node):
+        if not node.expr:
+            raise LumenCompileError("empty print")
+        if node.parts is None:
+            self.emit("__lumen_print__(")
+            self.emit(f"    {self.expr(node.expr)}", ("eval", node.expr))
+            self.emit(")")
+            return
+        # same semantics as the interpreter: the whole expression first,
+        # then a literal concatenation of the '+' parts
+        self.emit("try:")
+        self.emit(f"    __lumen_print__({self.expr(node.expr)})", ("eval", node.expr))
+        self.emit("except Exception:")
+        self.emit("    __lumen_print__(__lumen_print_parts__((")
+        for p in node.parts:
+            if is_quoted(p):
+                self.emit(f"        {p[1:-1]!r},")
+            else:
+                self.emit(f"        {self.expr(p)},", ("print", p))
+        self.emit("    )))")
+
+    def emit_if(self, node):
+        self.emit(f"if {self.expr(node.cond)}:", ("eval", node.cond))
+        self.depth += 1
+        self.emit_block(node.body)
+        self.depth -= 1
+        if node.orelse:
+            self.emit("else:")
+            self.depth += 1
+            self.emit_block(node.orelse)
+            self.depth -= 1
+
+    def emit_cycle(self, node):
+        if node.hoisted:
+            ok = node.hoisted[0][0] + "_ok"
+            self.emit("try:")
+            self.depth += 1
+            for temp, expr, inputs in node.hoisted:
+                checks = " or ".join(f"type({name}) not in __lumen_scalars__" for name in inputs)
+                self.emit(f"if {checks}: raise TypeError")
+                self.emit(f"{temp} = {self.expr(expr)}")
+            self.emit(f"{ok} = True")
+            self.depth -= 1
+            self.emit("except Exception:")
+            self.emit(f"    {ok} = False")
+            self.emit(f"if {ok}:")
+            self.depth += 1
+        self.emit(f"while {self.expr(node.cond)}:", ("eval", node.cond))
+        self.depth += 1
+        self.emit_block(node.body)
+        self.depth -= 1
+        if node.hoisted:
+            self.depth -= 1
+            self.emit("else:")
+            self.depth += 1
+            self.emit_cycle(node.fallback)
+            self.depth -= 1
+
+    def emit_funcdef(self, node):
+        if self.in_func:
+            raise LumenCompileError("functions defined inside functions")
+        params = [pname for _, pname in node.params]
+        # every call passes its depth along, so the interpreter's max_depth,
+        # not Python's recursion limit, is what bounds recursion (the limit
+        # is a default argument only to make it a fast local)
+        self.emit(f"def {self.FUNC_PREFIX}{node.name}({''.join(p + ', ' for p in params)}__lumen_depth__, "
+                  "__lumen_max_depth__=__lumen_max_depth__):")
+        self.depth += 1
+        self.emit("if __lumen_depth__ > __lumen_max_depth__: raise RecursionError", ("enter", node.name))
+        # Lumen reads fall back to globals until a name is assigned locally,
+        # and function bodies can never change globals, so a snapshot of the
+        # global value at entry keeps that behaviour for Python locals
+        for name in sorted(self.assigned_names(node.body) - set(params)):
+            self.emit(f"if {name!r} in __lumen_globals__: {name} = __lumen_globals__[{name!r}]")
+        self.in_func = True
+        try:
+            self.emit_block(node.body)
+        finally:
+            self.in_func = False
+        self.depth -= 1
+
+    def emit_call(self, node):
+        expected = self.arity.get(node.name)
+        if expected is not None and expected != len(node.args):
+            raise LumenCompileError(f"call to '{node.name}' with {len(node.args)} argument(s), expected {expected}")
+        self.emit(f"{self.FUNC_PREFIX}{node.name}(", ("call", node.name, node.line))
+        for a in node.args:
+            self.emit(f"    {self.expr(a)},", ("arg", a))
+        self.emit("    __lumen_depth__ + 1,")
+        self.emit(")")
+
+    @staticmethod
+    def frames(filename, e):
+        """[(function name, line)] of the generated code in e's traceback, outermost first."""
+        frames = []
+        tb = e.__traceback__
+        while tb is not None:
+            code = tb.tb_frame.f_code
+            if code.co_filename == filename:
+                frames.append((code.co_name, tb.tb_lineno))
+            tb = tb.tb_next
+        return frames
+
+    @classmethod
+    def runtime_error(cls, origins, filename, e):
+        """The exception the interpreter would have raised instead of e.
+
+        origins (from translate) says what the innermost generated line in
+        e's traceback evaluates. Returns e itself for lines whose errors the
+        interpreter doesn't reword either.
+        """
+        frames = cls.frames(filename, e)
+        origin = origins.get(frames[-1][1]) if frames else None
+        if origin is None:
+            return e
+        form, text = origin[0], origin[1]
+        if form == "eval":
+            return lumen_eval_error(text, e)
+        if form == "var":
+            return Exception(f"Lumen Error: Variable '{text}' not defined") if isinstance(e, NameError) else e
+        if form == "setitem":
+            if isinstance(e, NameError):
+                return Exception(f"Lumen Error: Variable '{origin[2]}' not defined")
+            return Exception(f"Lumen Error: Cannot assign to '{text}': {e}")
+        if form == "print":
+            if isinstance(e, NameError):
+                return Exception(f"Lumen Error: Variable '{text}' not defined")
+            return Exception(f"Lumen Error: Cannot evaluate '{text}' in print: {lumen_eval_error(text, e)}")
+        if form == "arg":
+            if isinstance(e, NameError):
+                return Exception(f"Lumen Error: Cannot resolve function argument '{text}'")
+            return lumen_eval_error(text, e)
+        if form == "scan":
+            return Exception(f"Lumen Error: Invalid scan prompt '{text}': {lumen_eval_error(text, e)}")
+        return e
+
+    @classmethod
+    def stack_overflow(cls, origins, filename, e, max_depth):
+        """The interpreter's stack overflow error for a RecursionError a function's entry check raised.
+
+        None if e came from anywhere else (Python's own recursion limit).
+        """
+        frames = cls.frames(filename, e)
+        if len(frames) < 2 or origins.get(frames[-1][1], ("",))[0] != "enter":
+            return None
+        call = origins.get(frames[-2][1])
+        if call is None or call[0] != "call":
+            return None
+        # the innermost frame is the call that would have gone too deep
+        recent = [name[len(cls.FUNC_PREFIX):] for name, _ in frames[-5:-1] if name.startswith(cls.FUNC_PREFIX)]
+        return Exception(f"Lumen Error: Stack overflow: call to '{call[1]}' on line {call[2]} would exceed the call "
+                         f"depth limit of {max_depth} (innermost calls: {' <- '.join(reversed(recent))} <- ...)")
+
+    def assigned_names(self, nodes):
+        names = set()
+        for node in nodes:
+            if isinstance(node, (LumenDecl, LumenIncDec, LumenAssign)):
+                names.add(node.name)
+            elif isinstance(node, LumenIf):
+                names |= self.assigned_names(node.body)
+                names |= self.assigned_names(node.orelse or [])
+            elif isinstance(node, LumenCycle):
+                names |= self.assigned_names(node.body)
+        return names
+
+
+class LumenCache:
+    """On-disk cache of parsed (and optionally compiled) Lumen programs.
+
+    Works like __pycache__: one entry per source path, validated by mtime and
+    size first and by a content hash when those changed, so an unchanged file
+    is loaded without being read or parsed again.
+    """
+
+    VERSION = 7
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = os.environ.get("LUMEN_CACHE_DIR")
+        if directory is None:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            directory = os.path.join(base, "lumen")
+        self.directory = directory
+        # the tag ties entries to this cache layout, the node classes' slots
+        # and this Python's bytecode
+        self.tag = (self.VERSION, self.node_layout(), importlib.util.MAGIC_NUMBER)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def node_layout():
+        """Hash of every LumenNode class's slots.
+
+        Cached trees are pickled nodes; one written before a slot was added
+        would load without it and fail mid-run, so a changed layout has to be
+        a miss even if VERSION wasn't bumped with it.
+        """
+        classes, todo = [], [LumenNode]
+        while todo:
+            cls = todo.pop()
+            classes.append(f"{cls.__name__}:{','.join(cls.__dict__.get('__slots__', ()))}")
+            todo.extend(cls.__subclasses__())
+        return hashlib.sha1(";".join(sorted(classes)).encode("utf-8")).hexdigest()[:12]
+
+    def entry_path(self, path):
+        key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key + ".lumc")
+
+    def read_entry(self, entry_path):
+        try:
+            with open(entry_path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError, TypeError):
+            return None
+        if not isinstance(entry, dict) or entry.get("tag") != self.tag:
+            return None
+        return entry
+
+    def get(self, path, opts=None):
+        """Return the cached entry for path, or None if missing or stale.
+
+        opts identifies the optimizations applied to the stored program
+        (LumenOptimizer.key); an entry built with other options is a miss.
+        """
+        entry_path = self.entry_path(path)
+        entry = self.read_entry(entry_path)
+        if entry is None or entry["opts"] != opts:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return entry
+        # touched but maybe not changed: fall back to the content hash
+        try:
+            with open(path, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+        if digest != entry["hash"]:
+            return None
+        entry["mtime_ns"] = st.st_mtime_ns
+        entry["size"] = st.st_size
+        self.write_entry(entry_path, entry)
+        return entry
+
+    def put(self, path, data: bytes, nodes, code=None, compile_failed=False, opts=None):
+        """Store a parsed program; data is the exact source the nodes came from."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        entry = {
+            "tag": self.tag,
+            "path": os.path.abspath(path),
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "hash": hashlib.sha256(data).hexdigest(),
+            "nodes": nodes,
+            "code": marshal.dumps(code) if code is not None else None,
+            "compile_failed": compile_failed,
+            "opts": opts,
+        }
+        self.write_entry(self.entry_path(path), entry)
+
+    def write_entry(self, entry_path, entry):
+        # write-then-rename so a crashed or concurrent run never leaves a torn entry
+        tmp = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, entry_path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def entries(self):
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            return []
+        return [os.path.join(self.directory, n) for n in names if n.endswith(".lumc")]
+
+    def clear(self):
+        removed = 0
+        for entry_path in self.entries():
+            try:
+                os.remove(entry_path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self):
+        """Summarise the cache: entry count, size on disk, compiled and stale entries."""
+        stats = {"directory": self.directory, "entries": 0, "bytes": 0, "compiled": 0, "stale": 0, "files": []}
+        for entry_path in self.entries():
+            try:
+                size = os.path.getsize(entry_path)
+            except OSError:
+                continue
+            entry = self.read_entry(entry_path)
+            stats["entries"] += 1
+            stats["bytes"] += size
+            if entry is None:
+                stats["stale"] += 1
+                continue
+            try:
+                st = os.stat(entry["path"])
+                stale = st.st_mtime_ns != entry["mtime_ns"] or st.st_size != entry["size"]
+            except OSError:
+                stale = True
+            stats["stale"] += stale
+            stats["compiled"] += entry["code"] is not None
+            stats["files"].append((entry["path"], size, entry["code"] is not None, stale))
+        return stats
+
+
+class LumenOutput:
+    """Buffered output channel behind Lumen's print.
+
+    Lines are collected and written to the stream in one call once the
+    buffer holds `buffer_size` characters or `flush_interval` seconds have
+    passed since the last flush, and on flush()/close(). With no stream
+    the current sys.stdout is used at flush time, so redirect_stdout and
+    shell redirection both work.
+    """
+
+    def __init__(self, stream=None, buffer_size=64 * 1024, flush_interval=0.1, close_stream=False):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.close_stream = close_stream
+        self._lines = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+
+    def write(self, value):
+        """Print one value, like print(value)."""
+        text = value if type(value) is str else str(value)
+        self._lines.append(text)
+        self._size += len(text) + 1
+        if self._size >= self.buffer_size:
+            self.flush()
+        else:
+            self.maybe_flush()
+
+    def maybe_flush(self):
+        if self._lines and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._lines:
+            return
+        stream = self.stream if self.stream is not None else sys.stdout
+        self._lines.append("")
+        stream.write("\n".join(self._lines))
+        self._lines = []
+        self._size = 0
+        stream.flush()
+
+    def close(self):
+        self.flush()
+        if self.close_stream and self.stream is not None:
+            self.stream.close()
+
+
+class LumenFunction:
+    """A Lumen function, bound once when its `func` statement runs.
+
+    bind_slots() adds the slot form of the body (see LumenSlotCompiler);
+    without it, or when a call can't use it, the body runs on a dict frame.
+    """
+    __slots__ = ("name", "params", "types", "body", "slot_index", "slot_body", "unsafe", "blank")
+
+    def __init__(self, name, params, body):
+        self.name = name
+        self.params = tuple(pname for _, pname in params)
+        self.types = tuple(typ for typ, _ in params)
+        self.body = body
+        self.slot_index = None
+        self.slot_body = None
+        self.unsafe = ()
+        self.blank = ()
+
+    def bind_slots(self, globals):
+        try:
+            names, body, unsafe = LumenSlotCompiler(globals).compile(self.params, self.body)
+        except LumenCompileError:
+            return False
+        self.slot_index = {name: i for i, name in enumerate(names)}
+        self.slot_body = body
+        self.unsafe = tuple((self.slot_index[name], name) for name in sorted(unsafe))
+        # the non-parameter slots a call starts with
+        self.blank = (LUMEN_UNBOUND,) * (len(names) - len(self.params))
+        return True
+
+
+class LumenFrame:
+    """One activation on LumenInterpreter.scope_stack.
+
+    slots is the frame's variable list when its function runs in slot form
+    (locals is then a LumenSlotView over it), else None.
+    """
+    __slots__ = ("function", "locals", "slots")
+
+    def __init__(self, function, locals, slots=None):
+        self.function = function
+        self.locals = locals
+        self.slots = slots
+
+
+class _LumenUnbound:
+    __slots__ = ()
+
+    def __repr__(self):
+        return "<unbound>"
+
+
+# marks a slot that hasn't been assigned yet
+LUMEN_UNBOUND = _LumenUnbound()
+
+
+class LumenSlotView(collections.abc.MutableMapping):
+    """Dict-like view of a slot frame, for code that wants a frame's locals by name."""
+    __slots__ = ("index", "slots", "extra")
+
+    def __init__(self, index, slots):
+        self.index = index
+        self.slots = slots
+        self.extra = None
+
+    def __getitem__(self, name):
+        i = self.index.get(name)
+        if i is None:
+            if self.extra is None:
+                raise KeyError(name)
+            return self.extra[name]
+        value = self.slots[i]
+        if value is LUMEN_UNBOUND:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        i = self.index.get(name)
+        if i is not None:
+            self.slots[i] = value
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[name] = value
+
+    def __delitem__(self, name):
+        self[name]
+        i = self.index.get(name)
+        if i is not None:
+            self.slots[i] = LUMEN_UNBOUND
+        else:
+            del self.extra[name]
+
+    def __iter__(self):
+        for name, i in self.index.items():
+            if self.slots[i] is not LUMEN_UNBOUND:
+                yield name
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+# function bodies in slot form; each mirrors the plain node it came from and
+# keeps its line, so the profiler and error messages see the same program
+class LumenSlotStore(LumenNode):
+    """Decl without scan, or assignment: slots[index] = fn(*slots), or the constant value when fn is None."""
+    __slots__ = ("index", "expr", "fn", "value")
+
+    def __init__(self, line, index, expr, fn, value=None):
+        self.line = line
+        self.index = index
+        self.expr = expr
+        self.fn = fn
+        self.value = value
+
+
+class LumenSlotSetItem(LumenNode):
+    """name[index] = expr; fn returns (value, target, index)."""
+    __slots__ = ("name", "index", "expr", "fn")
+
+    def __init__(self, line, name, index, expr, fn):
+        self.line = line
+        self.name = name
+        self.index = index
+        self.expr = expr
+        self.fn = fn
+
+
+class LumenSlotIncDec(LumenNode):
+    """x++ / x -- amt on a slot; amount is a constant unless fn is set."""
+    __slots__ = ("index", "op", "expr", "fn", "amount")
+
+    def __init__(self, line, index, op, expr, fn, amount=1):
+        self.line = line
+        self.index = index
+        self.op = op
+        self.expr = expr
+        self.fn = fn
+        self.amount = amount
+
+
+class LumenSlotScan(LumenNode):
+    __slots__ = ("index", "decl", "prompt", "fn")
+
+    def __init__(self, line, index, decl, prompt, fn):
+        self.line = line
+        self.index = index
+        self.decl = decl
+        self.prompt = prompt
+        self.fn = fn
+
+
+class LumenSlotPrint(LumenNode):
+    """parts, when present, is [(text, fn)], fn being None for quoted literals."""
+    __slots__ = ("expr", "fn", "parts")
+
+    def __init__(self, line, expr, fn, parts=None):
+        self.line = line
+        self.expr = expr
+        self.fn = fn
+        self.parts = parts
+
+
+class LumenSlotIf(LumenNode):
+    __slots__ = ("cond", "fn", "body", "orelse")
+
+    def __init__(self, line, cond, fn, body, orelse=None):
+        self.line = line
+        self.cond = cond
+        self.fn = fn
+        self.body = body
+        self.orelse = orelse
+
+
+class LumenSlotCycle(LumenNode):
+    """hoisted, when present, is [(index, expr, fn, inputs)] with inputs as (slot index or None, name);
+    counted is (counter index, op, bound fn, step) for counted loops."""
+    __slots__ = ("cond", "fn", "body", "hoisted", "fallback", "counted")
+
+    def __init__(self, line, cond, fn, body, hoisted=None, fallback=None, counted=None):
+        self.line = line
+        self.cond = cond
+        self.fn = fn
+        self.body = body
+        self.hoisted = hoisted
+        self.fallback = fallback
+        self.counted = counted
+
+
+class LumenSlotCall(LumenNode):
+    """fn returns the argument tuple (None when there are no arguments)."""
+    __slots__ = ("name", "args", "fn")
+
+    def __init__(self, line, name, args, fn):
+        self.line = line
+        self.name = name
+        self.args = args
+        self.fn = fn
+
+
+def lumen_reaches(nodes, kinds):
+    """Whether running nodes could execute a statement whose class is in kinds."""
+    for node in nodes:
+        cls = node.__class__
+        if cls in kinds:
+            return True
+        if (cls is LumenIf or cls is LumenSlotIf) and (lumen_reaches(node.body, kinds)
+                                                      or lumen_reaches(node.orelse or (), kinds)):
+            return True
+        if (cls is LumenCycle or cls is LumenSlotCycle) and lumen_reaches(node.body, kinds):
+            return True
+    return False
+
+
+# what a task's machine runs itself: yield and sleep, and any call, since
+# which function a name is bound to is only known when it runs (and calls
+# on the machine's stack keep a task's recursion off the Python stack)
+LUMEN_SUSPENDING = (LumenYield, LumenSleep, LumenCall)
+LUMEN_CALLS = (LumenCall, LumenSlotCall)
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_slot_expr(expr: str, names: tuple):
+    """Code for `lambda <names>: (<expr>)`, memoized like compile_expr.
+
+    Evaluated against the interpreter's globals it gives a function that is
+    called with a frame's slots as its arguments, so inside the expression
+    every Lumen variable is a fast local.
+    """
+    return compile(f"lambda {', '.join(names)}: ({expr})", "<lumen>", "eval")
+
+
+def lumen_eval_error(expr, e):
+    """The exception eval_expr would have raised for e."""
+    if isinstance(e, NameError):
+        return e
+    return Exception(f"Lumen Error: Error evaluating '{expr.strip()}': {e}")
+
+
+class LumenSlotCompiler:
+    """Resolves a Lumen function's variables to fixed slots in a list.
+
+    Parameters take the first slots, then every other name the body assigns,
+    in order of appearance. Expressions become functions of all the slots,
+    statements become LumenSlot* nodes that read and write slots[index]
+    directly, so a call never hashes a variable name.
+
+    Lumen reads fall back to globals until a name is assigned locally. The
+    compiler tracks which names are definitely assigned at each read; the
+    others end up in `unsafe`, and a call copies their global values into
+    their slots on entry (globals can't change while a function runs).
+    Raises LumenCompileError for anything the slot form can't express; the
+    function then runs on dict frames as before.
+    """
+
+    def __init__(self, globals):
+        self.globals = globals
+        self.names = ()
+        self.index = {}
+        self.unsafe = set()
+
+    def compile(self, params, body):
+        """Return (names, slot body, unsafe names) for a function."""
+        names = list(params)
+        for name in self.assigned_names(body):
+            if name not in names:
+                names.append(name)
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(names)}
+        self.unsafe = set()
+        slot_body, _ = self.compile_block(body, set(params))
+        return self.names, slot_body, self.unsafe
+
+    def assigned_names(self, nodes):
+        for node in nodes:
+            cls = node.__class__
+            if cls in (LumenDecl, LumenIncDec, LumenAssign):
+                yield node.name
+            elif cls is LumenIf:
+                yield from self.assigned_names(node.body)
+                yield from self.assigned_names(node.orelse or [])
+            elif cls is LumenCycle:
+                if node.hoisted:
+                    for temp, _, _ in node.hoisted:
+                        yield temp
+                    yield from self.assigned_names([node.fallback])
+                yield from self.assigned_names(node.body)
+
+    def function(self, expr, assigned):
+        """Compile expr over the slots, noting reads of names that may be unassigned."""
+        expr = expr.strip()
+        if not expr:
+            raise LumenCompileError("empty expression")
+        try:
+            tree = ast.parse(expr, mode="eval")
+            code = compile_slot_expr(expr, self.names)
+        except SyntaxError as e:
+            raise LumenCompileError(str(e))
+        for sub in ast.walk(tree):
+            if isinstance(sub, ast.NamedExpr):
+                raise LumenCompileError("assignment expressions write the frame by name")
+            if isinstance(sub, ast.Call) and isinstance(sub.func, ast.Name) and sub.func.id in _REBINDING_CALLS:
+                raise LumenCompileError(f"'{sub.func.id}' needs the frame by name")
+            if isinstance(sub, ast.Name) and sub.id in self.index and sub.id not in assigned:
+                self.unsafe.add(sub.id)
+        return eval(code, self.globals)
+
+    @staticmethod
+    def to_array(fn):
+        return lambda *slots: lumen_array(fn(*slots))
+
+    def compile_block(self, nodes, assigned):
+        """Return (slot nodes, names definitely assigned after the block)."""
+        out = []
+        for node in nodes:
+            out.append(self.compile_node(node, assigned))
+        return out, assigned
+
+    def compile_node(self, node, assigned):
+        cls = node.__class__
+        if cls is LumenDecl:
+            i = self.index[node.name]
+            if node.scan:
+                fn = self.function(node.prompt, assigned) if node.prompt else None
+                out = LumenSlotScan(node.line, i, node.decl, node.prompt, fn)
+            elif node.expr is not None:
+                fn = self.function(node.expr, assigned)
+                if node.decl == "array":
+                    fn = self.to_array(fn)
+                out = LumenSlotStore(node.line, i, node.expr, fn)
+            elif node.decl == "array":
+                # a fresh array per run, never a shared constant
+                out = LumenSlotStore(node.line, i, "()", self.to_array(lambda *slots: ()))
+            else:
+                out = LumenSlotStore(node.line, i, None, None, LUMEN_DEFAULTS[node.decl])
+            assigned.add(node.name)
+            return out
+        if cls is LumenSetItem:
+            fn = self.function(f"({node.expr}), {node.name}, ({node.index})", assigned)
+            return LumenSlotSetItem(node.line, node.name, node.index, node.expr, fn)
+        if cls is LumenAssign:
+            out = LumenSlotStore(node.line, self.index[node.name], node.expr, self.function(node.expr, assigned))
+            assigned.add(node.name)
+            return out
+        if cls is LumenIncDec:
+            if node.name not in assigned:
+                self.unsafe.add(node.name)
+            i = self.index[node.name]
+            if node.amount is None:
+                out = LumenSlotIncDec(node.line, i, node.op, None, None)
+            else:
+                fn = self.function(node.amount, assigned)
+                try:
+                    # a literal step is applied without evaluating anything
+                    out = LumenSlotIncDec(node.line, i, node.op, node.amount, None, ast.literal_eval(node.amount.strip()))
+                except (ValueError, SyntaxError):
+                    out = LumenSlotIncDec(node.line, i, node.op, node.amount, fn)
+            assigned.add(node.name)
+            return out
+        if cls is LumenPrint:
+            fn = self.function(node.expr, assigned)
+            parts = None
+            if node.parts is not None:
+                parts = [(p[1:-1], None) if is_quoted(p) else (p, self.function(p, assigned)) for p in node.parts]
+            return LumenSlotPrint(node.line, node.expr, fn, parts)
+        if cls is LumenCall:
+            fn = self.function(f"({', '.join(node.args)},)", assigned) if node.args else None
+            return LumenSlotCall(node.line, node.name, node.args, fn)
+        if cls is LumenIf:
+            fn = self.function(node.cond, assigned)
+            body, in_body = self.compile_block(node.body, set(assigned))
+            if node.orelse:
+                orelse, in_else = self.compile_block(node.orelse, set(assigned))
+                # assigned afterwards only if both branches assign it
+                assigned |= in_body & in_else
+            else:
+                orelse = node.orelse
+            return LumenSlotIf(node.line, node.cond, fn, body, orelse)
+        if cls is LumenCycle:
+            hoisted = fallback = None
+            inner = set(assigned)
+            if node.hoisted:
+                fallback = self.compile_node(node.fallback, assigned)
+                hoisted = []
+                for temp, expr, inputs in node.hoisted:
+                    hoisted.append((self.index[temp], expr, self.function(expr, assigned),
+                                    tuple((self.index.get(name), name) for name in inputs)))
+                    inner.add(temp)
+            fn = self.function(node.cond, inner)
+            counted = counted_loop(node)
+            if counted is not None:
+                name, op, bound, step = counted
+                counted = (self.index[name], op, self.function(bound, inner), step)
+            # the body may not run at all, so nothing it assigns counts afterwards
+            body, _ = self.compile_block(node.body, inner)
+            return LumenSlotCycle(node.line, node.cond, fn, body, hoisted, fallback, counted)
+        if cls is LumenFuncDef:
+            return node
+        raise LumenCompileError(f"no slot form for {cls.__name__}")
+
+
+class LumenInterpreter:
+    """A compact, careful rewrite of the Lumen interpreter.
+
+    - Source is tokenized and parsed once into LumenNode trees (see LumenParser);
+      execution walks the tree, so loop and function bodies are never re-parsed
+    - Nested {} blocks, `else if` chains and blocks spanning several lines are handled by the parser
+    - Scope stack of LumenFrames for function calls (locals) with globals available for evaluation;
+      function bodies are compiled to slot form, so their variables live in a list, not a dict
+    - eval_expr runs cached code objects against the live locals/globals (nothing is copied per call)
+    - cycle (while) supports multi-line bodies and inline single-line bodies; counted loops
+      (`cycle (i < N) { ...; i++ }`) run on a native int counter instead of evaluating the condition
+    - print handles parentheses, plain expressions, and manual '+' concatenation without inserting extra spaces;
+      it writes to a buffered, replaceable LumenOutput sink
+    - `spawn f(args)` runs a call as a cooperative task on an asyncio loop; tasks switch at
+      `yield` and `sleep(seconds)`, and the program ends when all of them have
+    - typed declarations (int/str/float/bool) and `scan` supported
+    - increment/decrement supports x++, x ++ 5, x++5, x++(expr), x ++ y
+    """
+
+    # files above this size are streamed rather than parsed whole and cached
+    STREAM_THRESHOLD = 1 << 20
+
+    # calls nested deeper than this leave the Python stack for the stack machine
+    MACHINE_DEPTH = 32
+    # default Lumen call-depth limit
+    MAX_DEPTH = 10000
+
+    def __init__(self, cache=None, output=None, optimizer=None, max_depth=None):
+        # globals doubles as the eval() globals dict, so expressions see
+        # locals -> globals -> builtins through CPython's own name lookup
+        self.globals = {"__builtins__": builtins}
+        self.functions = {}
+        #self.classes = {} Scrapped, no OOPLs :(
+        self.scope_stack = []
+        self._locals = self.globals
+        # the active frame's slot list, None outside slot-form functions
+        self._slots = None
+        # optional LumenCache used by run_file
+        self.cache = cache
+        # where print goes; flushed at the end of run_file/exec_line and before scan
+        self.output = output if output is not None else LumenOutput()
+        # optional LumenOptimizer applied to everything parsed
+        self.optimizer = optimizer
+        # LumenProfiler while profiling is enabled; it hooks _handlers, so
+        # nothing is paid for it otherwise
+        self.profiler = None
+        # spawned tasks and the event loop they run on, made on the first spawn
+        self._loop = None
+        self._tasks = []
+        # node or LumenFunction -> whether running it could reach a yield/sleep
+        self._suspends = {}
+        # Lumen call-depth limit; calls past it fail with a stack overflow error
+        self.max_depth = max_depth if max_depth is not None else self.MAX_DEPTH
+        self.machine_depth = min(self.MACHINE_DEPTH, self.max_depth)
+        # node -> whether running it could reach a call (see run_machine)
+        self._reaches_call = {}
+        self._handlers = {
+            LumenDecl: self.exec_decl,
+            LumenIncDec: self.exec_incdec,
+            LumenPrint: self.exec_print,
+            LumenAssign: self.exec_assign,
+            LumenSetItem: self.exec_setitem,
+            LumenIf: self.exec_if,
+            LumenCycle: self.exec_cycle,
+            LumenFuncDef: self.exec_funcdef,
+            LumenCall: self.exec_call,
+            LumenSpawn: self.exec_spawn,
+            LumenYield: self.exec_yield,
+            LumenSleep: self.exec_sleep,
+            LumenSlotStore: self.exec_slot_store,
+            LumenSlotSetItem: self.exec_slot_setitem,
+            LumenSlotIncDec: self.exec_slot_incdec,
+            LumenSlotScan: self.exec_slot_scan,
+            LumenSlotPrint: self.exec_slot_print,
+            LumenSlotIf: self.exec_slot_if,
+            LumenSlotCycle: self.exec_slot_cycle,
+            LumenSlotCall: self.exec_slot_call,
+        }
+        # what run_machine runs itself, when the node can reach a call
+        self._machine_ops = {
+            LumenIf: self.machine_if,
+            LumenCycle: self.machine_cycle,
+            LumenCall: self.machine_call,
+            LumenSlotIf: self.machine_slot_if,
+            LumenSlotCycle: self.machine_slot_cycle,
+            LumenSlotCall: self.machine_slot_call,
+        }
+        # what task_steps runs itself, when the node can suspend
+        self._task_ops = {
+            LumenIf: self.task_if,
+            LumenCycle: self.task_cycle,
+            LumenCall: self.task_call,
+            LumenYield: self.task_yield,
+            LumenSleep: self.task_sleep,
+        }
+
+    #utils
+    def current_locals(self):
+        return self.scope_stack[-1].locals if self.scope_stack else {}
+
+    def split_top_level(self, s: str, sep: str):
+        return split_top_level(s, sep)
+
+    def eval_expr(self, expr: str):
+        """Evaluate an expression using globals + current locals.
+
+        The expression is compiled once (see compile_expr) and evaluated
+        against the live scopes; nothing is copied per call.
+
+        Raises:
+            Exception on syntax/runtime errors
+            NameError if a name is missing (caller may choose to handle it)
+        """
+        code = compile_expr(expr)
+        try:
+            return eval(code, self.globals, self._locals)
+        except NameError:
+            # bubble up NameError so callers can decide fallback behavior
+            raise
+        except Exception as e:
+            raise Exception(f"Lumen Error: Error evaluating '{expr.strip()}': {e}")
+
+    def push_scope(self, scope, function=None):
+        self.scope_stack.append(LumenFrame(function, scope))
+        self._locals = scope
+        self._slots = None
+
+    def pop_scope(self):
+        frame = self.scope_stack.pop()
+        if self.scope_stack:
+            self._locals = self.scope_stack[-1].locals
+            self._slots = self.scope_stack[-1].slots
+        else:
+            self._locals = self.globals
+            self._slots = None
+        return frame.locals
+
+    def resolve_var(self, name: str):
+        # at top level _locals is globals itself
+        scope = self._locals
+        if name in scope:
+            return scope[name]
+        if name in self.globals:
+            return self.globals[name]
+        raise Exception(f"Lumen Error: Variable '{name}' not defined")
+
+    def assign_var(self, name: str, value):
+        self._locals[name] = value
+
+    def enable_profiling(self):
+        """Start collecting per-line/function/cycle timings; returns the LumenProfiler."""
+        if self.profiler is None:
+            self.profiler = LumenProfiler().attach(self)
+        return self.profiler
+
+    def disable_profiling(self):
+        profiler, self.profiler = self.profiler, None
+        if profiler is not None:
+            profiler.detach(self)
+        return profiler
+
+    # parsing
+    def parse(self, source):
+        nodes = parse_lumen(source)
+        if self.optimizer is not None:
+            nodes = self.optimizer.optimize(nodes)
+        return nodes
+
+    # exececutiuon
+    def execute(self, nodes):
+        handlers = self._handlers
+        for node in nodes:
+            handlers[node.__class__](node)
+
+    def exec_line(self, line: str):
+        """Parse and run a piece of Lumen source (a line, several statements or whole blocks)."""
+        if line is None:
+            return
+        try:
+            self.execute(self.parse(line))
+            self.finish_tasks()
+        finally:
+            self.cancel_tasks()
+            self.output.flush()
+
+    def time_source(self, source, number=1):
+        """Parse source once and run it `number` times in this interpreter.
+
+        Returns (parse seconds, total run seconds). State carries over
+        between runs, exactly as if the statements were entered again.
+        """
+        start = time.perf_counter()
+        nodes = self.parse(source)
+        parsed = time.perf_counter()
+        try:
+            execute = self.execute
+            for _ in range(number):
+                execute(nodes)
+            self.finish_tasks()
+        finally:
+            self.cancel_tasks()
+            self.output.flush()
+        return parsed - start, time.perf_counter() - parsed
+
+    def scan(self, decl, prompt=""):
+        """Read a value of Lumen type `decl` from the user (the `scan` builtin)."""
+        self.output.flush()
+        user_in = input(f"{prompt}: " if prompt else "")
+        try:
+            if decl == "int":
+                return int(user_in)
+            elif decl == "float":
+                return float(user_in)
+            elif decl == "bool":
+                return user_in.lower() in ("true", "1", "yes")
+            elif decl == "array":
+                # numbers separated by commas and/or spaces
+                values = [float(tok) if any(c in tok for c in ".eEn") else int(tok)
+                          for tok in re.split(r"[\s,]+", user_in.strip()) if tok]
+                return lumen_array(values)
+            return user_in
+        except ValueError:
+            raise Exception(f"Lumen Error: Cannot convert input '{user_in}' to {decl}")
+
+    def exec_decl(self, node):
+        if node.scan:
+            prompt = ""
+            if node.prompt:
+                try:
+                    prompt = str(self.eval_expr(node.prompt))
+                except Exception as e:
+                    raise Exception(f"Lumen Error: Invalid scan prompt '{node.prompt}': {e}")
+            self.assign_var(node.name, self.scan(node.decl, prompt))
+            return
+        value = self.eval_expr(node.expr) if node.expr is not None else LUMEN_DEFAULTS[node.decl]
+        if node.decl == "array":
+            value = lumen_array(value)
+        self.assign_var(node.name, value)
+
+    def exec_incdec(self, node):
+        try:
+            current = self.resolve_var(node.name)
+        except Exception:
+            raise Exception(f"Lumen Error: Variable '{node.name}' not defined")
+        amt = 1 if node.amount is None else self.eval_expr(node.amount)
+        if node.op == "++":
+            self.assign_var(node.name, current + amt)
+        else:
+            self.assign_var(node.name, current - amt)
+
+    def exec_print(self, node):
+        expr = node.expr
+        write = self.output.write
+        # try to eval whole expression first (works for arithmetic / clean expressions)
+        try:
+            value = self.eval_expr(expr)
+        except Exception:
+            if node.parts is not None:
+                out_parts = []
+                arrays = 0
+                for p in node.parts:
+                    if is_quoted(p):
+                        out_parts.append(p[1:-1])
+                        continue
+                    try:
+                        value = self.eval_expr(p)
+                    except NameError:
+                        raise Exception(f"Lumen Error: Variable '{p}' not defined")
+                    except Exception as e:
+                        raise Exception(f"Lumen Error: Cannot evaluate '{p}' in print: {e}")
+                    if isinstance(value, LumenArray):
+                        arrays += 1
+                    out_parts.append(str(value))
+                if arrays > 1:
+                    # array arithmetic that failed, not a concatenation (see lumen_print_parts)
+                    raise
+                # do literal concatenation (no automatic spaces)
+                write("".join(out_parts))
+                return
+        else:
+            write(value)
+            return
+
+        # no plus, try string literal or eval
+        if is_quoted(expr):
+            write(expr[1:-1])
+            return
+        try:
+            write(self.eval_expr(expr))
+        except Exception as e:
+            raise Exception(str(e))
+
+    def exec_assign(self, node):
+        self.assign_var(node.name, self.eval_expr(node.expr))
+
+    def exec_setitem(self, node):
+        # Python's order: the value, then the target and index
+        value = self.eval_expr(node.expr)
+        target = self.resolve_var(node.name)
+        index = self.eval_expr(node.index)
+        try:
+            target[index] = value
+        except Exception as e:
+            raise Exception(f"Lumen Error: Cannot assign to '{node.name}[{node.index}]': {e}")
+
+    def exec_if(self, node):
+        if self.eval_expr(node.cond):
+            self.execute(node.body)
+        elif node.orelse:
+            self.execute(node.orelse)
+
+    def exec_cycle(self, node):
+        if node.hoisted is not None and not self.bind_invariants(node.hoisted):
+            node = node.fallback
+        # the profiler wants every statement to go through its handler
+        if self.profiler is None and self.run_counted(node):
+            return
+        cond = node.cond
+        body = node.body
+        while self.eval_expr(cond):
+            self.execute(body)
+
+    def run_counted(self, node):
+        """Run a counted loop (see counted_loop) with a native int counter.
+
+        The condition is never evaluated and the final step never executed:
+        the counter comes from a range() and is stored before each pass, so
+        the body sees exactly the values the general path would give it.
+        Returns False, having run nothing, when the loop must take the
+        general path (not counted, or counter/bound aren't plain ints).
+        """
+        counted = node.counted
+        if counted is None:
+            counted = node.counted = counted_loop(node) or False
+        if not counted:
+            return False
+        name, op, bound, step = counted
+        scope = self._locals
+        g = self.globals
+        try:
+            start = scope[name] if name in scope else g[name]
+            limit = eval(compile_expr(bound), g, scope)
+        except Exception:
+            return False
+        values = counted_range(start, op, limit, step)
+        if values is None:
+            return False
+        if not values:
+            return True
+        handlers = self._handlers
+        steps = [(handlers[stmt.__class__], stmt) for stmt in node.body[:-1]]
+        if steps:
+            for value in values:
+                scope[name] = value
+                for handler, stmt in steps:
+                    handler(stmt)
+        scope[name] = values[-1] + step
+        return True
+
+    def bind_invariants(self, hoisted):
+        """Compute a cycle's hoisted expressions into their temporaries.
+
+        Returns False (and the caller runs the unhoisted loop) unless every
+        input is a plain scalar and every expression evaluates cleanly.
+        """
+        scope = self._locals
+        g = self.globals
+        for temp, expr, inputs in hoisted:
+            for name in inputs:
+                value = scope[name] if name in scope else g.get(name, scope)
+                if type(value) not in LUMEN_SCALARS:
+                    return False
+            try:
+                scope[temp] = eval(compile_expr(expr), g, scope)
+            except Exception:
+                return False
+        return True
+
+    def exec_funcdef(self, node):
+        func = LumenFunction(node.name, node.params, node.body)
+        func.bind_slots(self.globals)
+        self.functions[node.name] = func
+
+    def exec_call(self, node):
+        func = self.functions.get(node.name)
+        if func is None:
+            raise Exception(f"Lumen Error: Function '{node.name}' not defined")
+        self.invoke(func, self.call_args(node))
+
+    def call_args(self, node):
+        """A LumenCall's arguments, evaluated, as a tuple."""
+        codes = node.codes
+        if codes is None:
+            # all arguments as one tuple expression: a single eval per call
+            codes = node.codes = compile_expr(f"({', '.join(node.args)},)") if node.args else ()
+        if not codes:
+            return ()
+        try:
+            return eval(codes, self.globals, self._locals)
+        except Exception:
+            # slow path, only to report which argument failed
+            for a in node.args:
+                try:
+                    self.eval_expr(a)
+                except NameError:
+                    raise Exception(f"Lumen Error: Cannot resolve function argument '{a}'")
+            raise
+
+    def invoke(self, func, args):
+        """Run func's body in a new frame with args bound to its parameters."""
+        if len(self.scope_stack) >= self.machine_depth:
+            # deep recursion carries on in the stack machine, off the Python stack
+            self.run_machine(func, args)
+            return
+        frame, body = self.new_frame(func, args)
+        caller, caller_slots = self._locals, self._slots
+        self.scope_stack.append(frame)
+        self._locals = frame.locals
+        self._slots = frame.slots
+        handlers = self._handlers
+        try:
+            for stmt in body:
+                handlers[stmt.__class__](stmt)
+        finally:
+            self.scope_stack.pop()
+            self._locals = caller
+            self._slots = caller_slots
+
+    def new_frame(self, func, args):
+        """The LumenFrame for a call of func, and the body to run in it."""
+        body = func.slot_body
+        nparams = len(func.params)
+        if body is not None and len(args) >= nparams:
+            slots = [*args[:nparams], *func.blank] if func.blank or len(args) > nparams else list(args)
+            g = self.globals
+            for i, name in func.unsafe:
+                if name not in g:
+                    # a read that would miss both scopes: let the dict frame report it
+                    body = None
+                    break
+                slots[i] = g[name]
+        else:
+            body = None
+        if body is not None:
+            frame = LumenFrame(func, LumenSlotView(func.slot_index, slots), slots)
+        else:
+            # the frame's locals only hold the parameters (locals override globals via eval_expr);
+            # extra arguments are dropped, missing ones stay unbound
+            frame = LumenFrame(func, dict(zip(func.params, args)))
+            body = func.body
+        return frame, body
+
+    # the stack machine. Calls deeper than machine_depth run here: frames,
+    # blocks and loops are entries on a list instead of Python frames, so
+    # recursion is only limited by max_depth. Blocks are iterators over
+    # their statements, loops are (test, body) and a LumenFrame marks where
+    # a call returns. Statements that can't reach a call run on their
+    # normal handlers, at full speed. While profiling, a LumenProfileMark
+    # goes under each statement the machine runs itself.
+    def run_machine(self, func, args, line=None):
+        stack = []
+        base = len(self.scope_stack)
+        caller, caller_slots = self._locals, self._slots
+        handlers = self._handlers
+        ops = self._machine_ops
+        reaches_call = self.reaches_call
+        scope_stack = self.scope_stack
+        profiler = self.profiler
+        try:
+            self.machine_enter(stack, func, args, line)
+            while stack:
+                top = stack[-1]
+                cls = top.__class__
+                if cls is tuple:
+                    if top[0]():
+                        stack.append(iter(top[1]))
+                    else:
+                        stack.pop()
+                elif cls is LumenFrame:
+                    stack.pop()
+                    scope_stack.pop()
+                    if len(scope_stack) > base:
+                        self._locals = scope_stack[-1].locals
+                        self._slots = scope_stack[-1].slots
+                elif cls is LumenProfileMark:
+                    stack.pop()
+                    profiler.finish(top)
+                else:
+                    for node in top:
+                        op = ops.get(node.__class__)
+                        if op is not None and reaches_call(node):
+                            if profiler is not None:
+                                stack.append(profiler.mark(node))
+                            op(stack, node)
+                            break
+                        handlers[node.__class__](node)
+                    else:
+                        stack.pop()
+        finally:
+            # an error leaves the machine's frames behind
+            del scope_stack[base:]
+            self._locals = caller
+            self._slots = caller_slots
+            if profiler is not None:
+                # statements cut short by an error still count, like the wrappers' finally
+                for entry in reversed(stack):
+                    if entry.__class__ is LumenProfileMark:
+                        profiler.finish(entry)
+
+    def reaches_call(self, node):
+        known = self._reaches_call.get(node)
+        if known is None:
+            known = self._reaches_call[node] = lumen_reaches((node,), LUMEN_CALLS)
+        return known
+
+    def machine_enter(self, stack, func, args, line=None):
+        if len(self.scope_stack) >= self.max_depth:
+            raise self.stack_overflow(func, line)
+        frame, body = self.new_frame(func, args)
+        self.scope_stack.append(frame)
+        self._locals = frame.locals
+        self._slots = frame.slots
+        stack.append(frame)
+        stack.append(iter(body))
+
+    def stack_overflow(self, func, line=None):
+        recent = [frame.function.name for frame in reversed(self.scope_stack[-4:]) if frame.function is not None]
+        where = f" on line {line}" if line is not None else ""
+        return Exception(f"Lumen Error: Stack overflow: call to '{func.name}'{where} would exceed the call depth "
+                         f"limit of {self.max_depth} (innermost calls: {' <- '.join(recent)} <- ...)")
+
+    def machine_if(self, stack, node):
+        if self.eval_expr(node.cond):
+            stack.append(iter(node.body))
+        elif node.orelse:
+            stack.append(iter(node.orelse))
+
+    def machine_slot_if(self, stack, node):
+        try:
+            taken = node.fn(*self._slots)
+        except Exception as e:
+            raise lumen_eval_error(node.cond, e)
+        if taken:
+            stack.append(iter(node.body))
+        elif node.orelse:
+            stack.append(iter(node.orelse))
+
+    def machine_cycle(self, stack, node):
+        if node.hoisted is not None and not self.bind_invariants(node.hoisted):
+            node = node.fallback
+        cond = node.cond
+        eval_expr = self.eval_expr
+        stack.append((lambda: eval_expr(cond), node.body))
+
+    def machine_slot_cycle(self, stack, node):
+        if node.hoisted is not None and not self.bind_slot_invariants(node.hoisted):
+            node = node.fallback
+        fn = node.fn
+        cond = node.cond
+        slots = self._slots
+
+        def test():
+            try:
+                return fn(*slots)
+            except Exception as e:
+                raise lumen_eval_error(cond, e)
+        stack.append((test, node.body))
+
+    def machine_call(self, stack, node):
+        func = self.functions.get(node.name)
+        if func is None:
+            raise Exception(f"Lumen Error: Function '{node.name}' not defined")
+        self.machine_enter(stack, func, self.call_args(node), node.line)
+
+    def machine_slot_call(self, stack, node):
+        func = self.functions.get(node.name)
+        if func is None:
+            raise Exception(f"Lumen Error: Function '{node.name}' not defined")
+        self.machine_enter(stack, func, self.slot_call_args(node), node.line)
+
+    # cooperative tasks. spawn schedules a call as an asyncio task on the
+    # interpreter's loop; the loop runs while the main program is in sleep()
+    # or yield, and at the end of the program (finish_tasks). A task runs
+    # through task_steps, a stack machine like run_machine that can stop at
+    # a yield or sleep; anything that can't reach one runs on the normal
+    # handlers at full speed. Each task has its own scope_stack, swapped in
+    # around every step.
+    def exec_spawn(self, node):
+        call = node.call
+        func = self.functions.get(call.name)
+        if func is None:
+            raise Exception(f"Lumen Error: Function '{call.name}' not defined")
+        args = self.call_args(call)
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        task = self.run_task(self.task_steps(func, args), ([], self.globals, None))
+        self._tasks.append(self._loop.create_task(task))
+
+    def exec_yield(self, node):
+        if self._tasks and not self._loop.is_running():
+            # one turn of the loop: every ready task takes a step
+            self._loop.run_until_complete(asyncio.sleep(0))
+
+    def exec_sleep(self, node):
+        seconds = self.sleep_seconds(node)
+        self.output.flush()
+        if self._tasks and not self._loop.is_running():
+            # the spawned tasks run while the program waits
+            self._loop.run_until_complete(asyncio.sleep(seconds))
+        else:
+            time.sleep(seconds)
+
+    def sleep_seconds(self, node):
+        seconds = self.eval_expr(node.expr)
+        if type(seconds) not in (int, float) or seconds < 0:
+            raise Exception(f"Lumen Error: sleep needs a number of seconds >= 0, got {seconds!r}")
+        return seconds
+
+    def switch_context(self, context):
+        """Make context (scope_stack, locals, slots) current; returns the one it replaced."""
+        previous = (self.scope_stack, self._locals, self._slots)
+        self.scope_stack, self._locals, self._slots = context
+        return previous
+
+    async def run_task(self, steps, context):
+        """Drive a task's generator, one step (up to a yield or sleep) at a time."""
+        try:
+            while True:
+                outer = self.switch_context(context)
+                try:
+                    delay = next(steps)
+                except StopIteration:
+                    return
+                finally:
+                    context = self.switch_context(outer)
+                await asyncio.sleep(delay)
+        finally:
+            if steps.gi_frame is not None:
+                # cancelled while suspended: unwind its frames in its own context
+                outer = self.switch_context(context)
+                try:
+                    steps.close()
+                finally:
+                    self.switch_context(outer)
+
+    def finish_tasks(self):
+        """Run spawned tasks (and any they spawn) to completion; raises the first error."""
+        while self._tasks:
+            tasks, self._tasks = self._tasks, []
+            try:
+                self._loop.run_until_complete(asyncio.gather(*tasks))
+            except BaseException:
+                self._tasks.extend(tasks)
+                raise
+
+    def cancel_tasks(self):
+        """Cancel whatever spawned tasks are still running (the program stopped with an error)."""
+        if not self._tasks:
+            return
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        # let them unwind; this also collects the errors of the ones that failed
+        self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+
+    def suspends(self, key, nodes):
+        known = self._suspends.get(key)
+        if known is None:
+            known = self._suspends[key] = lumen_reaches(nodes, LUMEN_SUSPENDING)
+        return known
+
+    def task_steps(self, func, args):
+        """A spawned call as a generator that stops at each yield or sleep.
+
+        run_machine's loop, with yield and sleep among the statements it runs
+        itself, so frames, blocks and loops live on its own list: calls and
+        recursion inside a task never grow the Python stack, and going past
+        max_depth is a Lumen stack overflow like anywhere else.
+        """
+        stack = []
+        scope_stack = self.scope_stack
+        handlers = self._handlers
+        ops = self._task_ops
+        suspends = self.suspends
+        try:
+            self.task_enter(stack, func, args)
+            while stack:
+                top = stack[-1]
+                cls = top.__class__
+                if cls is tuple:
+                    if top[0]():
+                        stack.append(iter(top[1]))
+                    else:
+                        stack.pop()
+                elif cls is LumenFrame:
+                    stack.pop()
+                    scope_stack.pop()
+                    self._locals = scope_stack[-1].locals if scope_stack else self.globals
+                else:
+                    for node in top:
+                        op = ops.get(node.__class__)
+                        if op is not None and suspends(node, (node,)):
+                            delay = op(stack, node)
+                            if delay is not None:
+                                yield delay
+                            break
+                        handlers[node.__class__](node)
+                    else:
+                        stack.pop()
+        finally:
+            del scope_stack[:]
+            self._locals = self.globals
+            self._slots = None
+
+    def task_enter(self, stack, func, args, line=None):
+        # dict frames: the task runs func.body, not the slot form
+        if len(self.scope_stack) >= self.max_depth:
+            raise self.stack_overflow(func, line)
+        frame = LumenFrame(func, dict(zip(func.params, args)))
+        self.scope_stack.append(frame)
+        self._locals = frame.locals
+        self._slots = None
+        stack.append(frame)
+        stack.append(iter(func.body))
+
+    def task_if(self, stack, node):
+        if self.eval_expr(node.cond):
+            stack.append(iter(node.body))
+        elif node.orelse:
+            stack.append(iter(node.orelse))
+
+    def task_cycle(self, stack, node):
+        # no hoisting: while the task is suspended the main program can
+        # change the globals an "invariant" reads (a poller's flag, say)
+        if node.hoisted is not None:
+            node = node.fallback
+        cond = node.cond
+        eval_expr = self.eval_expr
+        stack.append((lambda: eval_expr(cond), node.body))
+
+    def task_call(self, stack, node):
+        func = self.functions.get(node.name)
+        if func is None:
+            raise Exception(f"Lumen Error: Function '{node.name}' not defined")
+        args = self.call_args(node)
+        if self.suspends(func, func.body):
+            self.task_enter(stack, func, args, node.line)
+        else:
+            self.invoke(func, args)
+
+    def task_yield(self, stack, node):
+        return 0
+
+    def task_sleep(self, stack, node):
+        seconds = self.sleep_seconds(node)
+        self.output.flush()
+        return seconds
+
+    # slot-form statements (function bodies, see LumenSlotCompiler)
+    def exec_slot_store(self, node):
+        fn = node.fn
+        slots = self._slots
+        if fn is None:
+            slots[node.index] = node.value
+            return
+        try:
+            slots[node.index] = fn(*slots)
+        except Exception as e:
+            raise lumen_eval_error(node.expr, e)
+
+    def exec_slot_setitem(self, node):
+        try:
+            value, target, index = node.fn(*self._slots)
+        except Exception as e:
+            raise lumen_eval_error(node.expr, e)
+        try:
+            target[index] = value
+        except Exception as e:
+            raise Exception(f"Lumen Error: Cannot assign to '{node.name}[{node.index}]': {e}")
+
+    def exec_slot_incdec(self, node):
+        slots = self._slots
+        amt = node.amount
+        if node.fn is not None:
+            try:
+                amt = node.fn(*slots)
+            except Exception as e:
+                raise lumen_eval_error(node.expr, e)
+        i = node.index
+        if node.op == "++":
+            slots[i] = slots[i] + amt
+        else:
+            slots[i] = slots[i] - amt
+
+    def exec_slot_scan(self, node):
+        prompt = ""
+        if node.fn is not None:
+            try:
+                prompt = str(node.fn(*self._slots))
+            except Exception as e:
+                raise Exception(f"Lumen Error: Invalid scan prompt '{node.prompt}': {lumen_eval_error(node.prompt, e)}")
+        self._slots[node.index] = self.scan(node.decl, prompt)
+
+    def exec_slot_print(self, node):
+        # same fallbacks as exec_print
+        slots = self._slots
+        write = self.output.write
+        try:
+            value = node.fn(*slots)
+        except Exception as error:
+            if node.parts is not None:
+                out_parts = []
+                arrays = 0
+                for text, fn in node.parts:
+                    if fn is None:
+                        out_parts.append(text)
+                        continue
+                    try:
+                        value = fn(*slots)
+                    except NameError:
+                        raise Exception(f"Lumen Error: Variable '{text}' not defined")
+                    except Exception as e:
+                        raise Exception(f"Lumen Error: Cannot evaluate '{text}' in print: {lumen_eval_error(text, e)}")
+                    if isinstance(value, LumenArray):
+                        arrays += 1
+                    out_parts.append(str(value))
+                if arrays > 1:
+                    raise lumen_eval_error(node.expr, error)
+                write("".join(out_parts))
+                return
+        else:
+            write(value)
+            return
+
+        if is_quoted(node.expr):
+            write(node.expr[1:-1])
+            return
+        try:
+            write(node.fn(*slots))
+        except Exception as e:
+            raise Exception(str(lumen_eval_error(node.expr, e)))
+
+    def exec_slot_if(self, node):
+        try:
+            taken = node.fn(*self._slots)
+        except Exception as e:
+            raise lumen_eval_error(node.cond, e)
+        if taken:
+            self.execute(node.body)
+        elif node.orelse:
+            self.execute(node.orelse)
+
+    def exec_slot_cycle(self, node):
+        if node.hoisted is not None and not self.bind_slot_invariants(node.hoisted):
+            node = node.fallback
+        if node.counted is not None and self.profiler is None and self.run_slot_counted(node):
+            return
+        slots = self._slots
+        fn = node.fn
+        body = node.body
+        handlers = self._handlers
+        while True:
+            try:
+                if not fn(*slots):
+                    break
+            except Exception as e:
+                raise lumen_eval_error(node.cond, e)
+            for stmt in body:
+                handlers[stmt.__class__](stmt)
+
+    def run_slot_counted(self, node):
+        """run_counted for a slot frame."""
+        index, op, bound, step = node.counted
+        slots = self._slots
+        try:
+            limit = bound(*slots)
+        except Exception:
+            return False
+        values = counted_range(slots[index], op, limit, step)
+        if values is None:
+            return False
+        if not values:
+            return True
+        handlers = self._handlers
+        steps = [(handlers[stmt.__class__], stmt) for stmt in node.body[:-1]]
+        if steps:
+            for value in values:
+                slots[index] = value
+                for handler, stmt in steps:
+                    handler(stmt)
+        slots[index] = values[-1] + step
+        return True
+
+    def bind_slot_invariants(self, hoisted):
+        """bind_invariants for a slot frame."""
+        slots = self._slots
+        g = self.globals
+        for index, _, fn, inputs in hoisted:
+            for i, name in inputs:
+                value = g.get(name, slots) if i is None else slots[i]
+                if type(value) not in LUMEN_SCALARS:
+                    return False
+            try:
+                slots[index] = fn(*slots)
+            except Exception:
+                return False
+        return True
+
+    def exec_slot_call(self, node):
+        func = self.functions.get(node.name)
+        if func is None:
+            raise Exception(f"Lumen Error: Function '{node.name}' not defined")
+        self.invoke(func, self.slot_call_args(node))
+
+    def slot_call_args(self, node):
+        """call_args for a LumenSlotCall."""
+        if node.fn is None:
+            return ()
+        try:
+            return node.fn(*self._slots)
+        except Exception:
+            for a in node.args:
+                try:
+                    self.eval_expr(a)
+                except NameError:
+                    raise Exception(f"Lumen Error: Cannot resolve function argument '{a}'")
+            raise
+
+    def load_file(self, path: str, compiled=False):
+        """Return (nodes, code) for a .lum file.
+
+        code is the compiled backend's code object, or None when it wasn't
+        requested or the program can't be translated. Uses self.cache when
+        set, so unchanged files are neither re-read nor re-parsed.
+        """
+        opts = self.optimizer.key if self.optimizer is not None else None
+        entry = self.cache.get(path, opts) if self.cache is not None else None
+        if entry is not None and (not compiled or entry["code"] is not None or entry["compile_failed"]):
+            code = marshal.loads(entry["code"]) if compiled and entry["code"] is not None else None
+            return entry["nodes"], code
+
+        if entry is not None:
+            nodes = entry["nodes"]
+            with open(path, "rb") as f:
+                data = f.read()
+        else:
+            with open(path, "rb") as f:
+                data = f.read()
+            nodes = self.parse(data.decode("utf-8"))
+        code = None
+        compile_failed = False
+        if compiled:
+            try:
+                code = LumenCompiler().compile(nodes, path)
+            except LumenCompileError:
+                compile_failed = True
+        if self.cache is not None:
+            self.cache.put(path, data, nodes, code, compile_failed, opts)
+        return nodes, code
+
+    def run_compiled(self, nodes, filename="<lumen>"):
+        """Run nodes through the Python backend (LumenCompiler).
+
+        Falls back to the tree-walking interpreter when the program uses
+        something the compiler can't translate. Returns True if the compiled
+        path was used.
+        """
+        try:
+            code = LumenCompiler().compile(nodes, filename)
+        except LumenCompileError:
+            self.execute(nodes)
+            return False
+        self.exec_compiled(code, nodes)
+        return True
+
+    def exec_compiled(self, code, nodes):
+        g = self.globals
+        g["__lumen_print__"] = self.output.write
+        g["__lumen_scan__"] = self.scan
+        g["__lumen_print_parts__"] = lumen_print_parts
+        g["__lumen_array__"] = lumen_array
+        g["__lumen_scalars__"] = LUMEN_SCALARS
+        g["__lumen_globals__"] = g
+        g["__lumen_depth__"] = len(self.scope_stack)
+        g["__lumen_max_depth__"] = self.max_depth
+        # compiled functions check max_depth themselves; Python's own limit
+        # just has to leave room for that many calls, plus whatever the
+        # innermost one calls in turn
+        frame, python_depth = sys._getframe(), 0
+        while frame is not None:
+            frame, python_depth = frame.f_back, python_depth + 1
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(limit, python_depth + self.max_depth + 100))
+        try:
+            exec(code, g)
+        except Exception as e:
+            if isinstance(e, NameError) and e.name and e.name.startswith(LumenCompiler.FUNC_PREFIX):
+                fname = e.name[len(LumenCompiler.FUNC_PREFIX):]
+                raise Exception(f"Lumen Error: Function '{fname}' not defined")
+            # only the failing path pays for the line table: translate again
+            compiler = LumenCompiler()
+            compiler.translate(nodes)
+            if isinstance(e, RecursionError):
+                error = LumenCompiler.stack_overflow(compiler.origins, code.co_filename, e, self.max_depth)
+                if error is None:
+                    raise Exception("Lumen Error: Stack overflow: the compiled program recursed deeper than Python "
+                                    "allows (run it without --compile)")
+                raise error
+            error = LumenCompiler.runtime_error(compiler.origins, code.co_filename, e)
+            if error is e:
+                raise
+            raise error
+        finally:
+            sys.setrecursionlimit(limit)
+
+    def run_stream(self, lines):
+        """Execute Lumen source incrementally from an iterable of lines.
+
+        Each complete top-level statement runs as soon as its last line has
+        been read, and nothing but the statement being parsed is kept, so a
+        pipe of generated code runs in constant memory. (A top-level `if`
+        runs once the next statement arrives, since that may be its `else`.)
+        """
+        handlers = self._handlers
+        maybe_flush = self.output.maybe_flush
+        optimizer = self.optimizer
+        if self.may_block(lines):
+            lines = self.flush_before_wait(lines)
+        for node in LumenParser(lines):
+            if optimizer is not None:
+                node = optimizer.optimize_node(node)
+            handlers[node.__class__](node)
+            # keep a slow producer's output flowing, not just at size thresholds
+            maybe_flush()
+
+    @staticmethod
+    def may_block(lines):
+        """Whether reading lines can wait on a producer (a pipe or terminal, not a regular file)."""
+        try:
+            return not stat.S_ISREG(os.fstat(lines.fileno()).st_mode)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            return False
+
+    def flush_before_wait(self, lines):
+        """Pass lines through, flushing the output whenever the next one isn't there yet.
+
+        Otherwise a statement's output sits in the buffer for as long as the
+        producer takes to send the next line.
+        """
+        output = self.output
+        fd = lines.fileno()
+        for line in lines:
+            yield line
+            if output._lines:
+                try:
+                    ready = select.select([fd], [], [], 0)[0]
+                except (OSError, ValueError):
+                    # no select() on this kind of handle (Windows pipes): always flush
+                    ready = False
+                if not ready:
+                    output.flush()
+
+    def run_file(self, path: str, type_check=False, compiled=False):
+        """Run a .lum file, or standard input when path is '-'.
+
+        Without the compiled backend, files that bypass the cache (no cache,
+        or larger than STREAM_THRESHOLD) are streamed through run_stream.
+        """
+        try:
+            if path == "-":
+                if compiled:
+                    self.run_compiled(self.parse(sys.stdin), "<stdin>")
+                else:
+                    self.run_stream(sys.stdin)
+            elif not compiled and (self.cache is None or os.path.getsize(path) > self.STREAM_THRESHOLD):
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.run_stream(f)
+            else:
+                nodes, code = self.load_file(path, compiled)
+                if code is not None:
+                    self.exec_compiled(code, nodes)
+                else:
+                    self.execute(nodes)
+            # the program ends when its spawned tasks do
+            self.finish_tasks()
+        finally:
+            self.cancel_tasks()
+            self.output.flush()
+
+class LumenProfiler:
+    """Per-line, per-function and per-cycle timing for a LumenInterpreter.
+
+    attach() swaps the interpreter's statement handlers for timed wrappers
+    and detach() puts the originals back, so an interpreter that isn't being
+    profiled runs exactly the same code as before. Times are wall-clock;
+    "total" includes nested statements and calls, "self" does not. A line or
+    function that is running already when it starts again (recursion) only
+    adds to "total" once its outermost run finishes, so nested runs aren't
+    counted twice.
+    """
+
+    def __init__(self):
+        # key -> [count, total seconds, self seconds]
+        self.lines = {}
+        self.functions = {}
+        self.cycles = {}
+        # (id(table), key) -> how many runs of that key are in progress
+        self._active = {}
+        self._child_time = [0.0]
+        self._saved = None
+
+    def attach(self, interp):
+        self._saved = dict(interp._handlers)
+        for cls, handler in self._saved.items():
+            interp._handlers[cls] = self.wrap(handler, cls)
+        # fast paths that bypass handlers check this
+        interp.profiler = self
+        return self
+
+    def detach(self, interp):
+        if self._saved is not None:
+            interp._handlers.update(self._saved)
+            self._saved = None
+        if interp.profiler is self:
+            interp.profiler = None
+
+    def extra_table(self, cls):
+        """Where a statement of class cls is tallied besides its line, and whether by name."""
+        # calls are also tallied per function name, cycles per cycle
+        if cls in (LumenCall, LumenSlotCall):
+            return self.functions, True
+        if cls in (LumenCycle, LumenSlotCycle):
+            return self.cycles, False
+        return None, False
+
+    def mark(self, node):
+        """Start timing a statement the stack machine runs itself; see LumenProfileMark."""
+        self.enter(node)
+        self._child_time.append(0.0)
+        return LumenProfileMark(self, node, time.perf_counter())
+
+    def enter(self, node):
+        active = self._active
+        key = (id(self.lines), node.line)
+        active[key] = active.get(key, 0) + 1
+        extra, by_name = self.extra_table(node.__class__)
+        if extra is not None:
+            key = (id(extra), node.name if by_name else node.line)
+            active[key] = active.get(key, 0) + 1
+
+    def finish(self, mark):
+        elapsed = time.perf_counter() - mark.start
+        own = elapsed - self._child_time.pop()
+        self._child_time[-1] += elapsed
+        node = mark.node
+        self._add(self.lines, node.line, elapsed, own)
+        extra, by_name = self.extra_table(node.__class__)
+        if extra is not None:
+            self._add(extra, node.name if by_name else node.line, elapsed, own)
+
+    def wrap(self, handler, cls):
+        lines = self.lines
+        extra, by_name = self.extra_table(cls)
+        child_time = self._child_time
+        clock = time.perf_counter
+        enter = self.enter
+
+        def timed(node):
+            enter(node)
+            child_time.append(0.0)
+            start = clock()
+            try:
+                handler(node)
+            finally:
+                elapsed = clock() - start
+                own = elapsed - child_time.pop()
+                child_time[-1] += elapsed
+                self._add(lines, node.line, elapsed, own)
+                if extra is not None:
+                    self._add(extra, node.name if by_name else node.line, elapsed, own)
+        return timed
+
+    def _add(self, table, key, elapsed, own):
+        stats = table.get(key)
+        if stats is None:
+            stats = table[key] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[2] += own
+        active = (id(table), key)
+        depth = self._active[active] - 1
+        self._active[active] = depth
+        if not depth:
+            # the outermost run's time already covers the nested ones
+            stats[1] += elapsed
+
+    def report(self, source_lines=None, limit=20):
+        """Return the report as text, hottest (by self time) first."""
+        def rows(table):
+            return sorted(table.items(), key=lambda kv: kv[1][2], reverse=True)[:limit]
+
+        def text_for(line):
+            if source_lines and 0 < line <= len(source_lines):
+                return source_lines[line - 1].strip()
+            return ""
+
+        out = [f"{'line':>6} {'count':>10} {'total ms':>10} {'self ms':>10}  source"]
+        for line, (count, total, own) in rows(self.lines):
+            out.append(f"{line:>6} {count:>10} {total * 1000:>10.2f} {own * 1000:>10.2f}  {text_for(line)}")
+        if self.functions:
+            out.append("")
+            out.append(f"{'func':>17} {'calls':>10} {'total ms':>10} {'self ms':>10}")
+            for name, (count, total, own) in rows(self.functions):
+                out.append(f"{name:>17} {count:>10} {total * 1000:>10.2f} {own * 1000:>10.2f}")
+        if self.cycles:
+            out.append("")
+            out.append(f"{'cycle':>6} {'runs':>10} {'total ms':>10} {'self ms':>10}  source")
+            for line, (count, total, own) in rows(self.cycles):
+                out.append(f"{line:>6} {count:>10} {total * 1000:>10.2f} {own * 1000:>10.2f}  {text_for(line)}")
+        return "\n".join(out)
+
+    def to_json(self):
+        def dump(table):
+            return [{"key": key, "count": c, "total": t, "self": s} for key, (c, t, s) in table.items()]
+        return {"lines": dump(self.lines), "functions": dump(self.functions), "cycles": dump(self.cycles)}
+
+
+class LumenProfileMark:
+    """Stands on the stack machine's stack under a statement being profiled.
+
+    The machine runs ifs, cycles and calls by pushing their blocks rather than
+    through the handlers LumenProfiler wraps; popping the mark, once those
+    blocks are done, records the statement like the wrapper would have.
+    """
+
+    __slots__ = ("profiler", "node", "start")
+
+    def __init__(self, profiler, node, start):
+        self.profiler = profiler
+        self.node = node
+        self.start = start
+
+
+def check_conformance(path):
+    """Run a Lumen script through every execution path and compare them.
+
+    The plain interpreter is the reference; the optimized interpreter and the
+    optimized compiled backend must match it. Returns (ok, detail): ok is True
+    when all produce the same output and end with the same error message (or
+    none); detail describes the first difference.
+    """
+    configs = (("interpreter", False, None), ("optimized", False, LumenOptimizer()), ("compiled", True, LumenOptimizer()))
+    results = []
+    for label, compiled, optimizer in configs:
+        out = io.StringIO()
+        error = None
+        with contextlib.redirect_stdout(out):
+            try:
+                LumenInterpreter(optimizer=optimizer).run_file(path, compiled=compiled)
+            except Exception as e:
+                error = str(e)
+        results.append((label, out.getvalue(), error))
+    ref_label, ref_out, ref_err = results[0]
+    for label, out, err in results[1:]:
+        if ref_err != err:
+            return False, f"{ref_label} error: {ref_err}; {label} error: {err}"
+        if ref_out != out:
+            for n, (a, b) in enumerate(zip(ref_out.splitlines(), out.splitlines()), 1):
+                if a != b:
+                    return False, f"output line {n}: {ref_label} {a!r}, {label} {b!r}"
+            return False, f"{label} output differs in length"
+    return True, ""
+
+
+def _lumen_worker_init():
+    # pool workers share the terminal; a script that scans gets EOF rather
+    # than racing the shell for keyboard input
+    sys.stdin = open(os.devnull, "r")
+
+
+def run_lumen_job(path, compiled=False, cache=None, optimizer=None):
+    """Run one script in a fresh LumenInterpreter, capturing everything it prints.
+
+    Used by `lumen run-all`, in process pool workers. Returns
+    (output, error or None, wall seconds).
+    """
+    out = io.StringIO()
+    error = None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out):
+        interpreter = LumenInterpreter(cache=cache, output=LumenOutput(buffer_size=1 << 20, flush_interval=1.0),
+                                       optimizer=optimizer)
+        try:
+            interpreter.run_file(path, type_check=True, compiled=compiled)
+        except Exception as e:
+            error = str(e)
+        finally:
+            interpreter.output.close()
+    return out.getvalue(), error, time.perf_counter() - start
+
+
+class FileIndex:
+    """Persistent index of every file and directory name under one root.
+
+    Keeps each directory's entries next to its mtime. A directory's mtime moves
+    whenever an entry is added, removed or renamed in it, so refresh() stats
+    every directory but only lists the ones that changed - a lot cheaper than
+    walking the whole tree again. Lookups run str.find over all names joined
+    into one string, which gets through millions of names in milliseconds.
+    """
+
+    VERSION = 1
+    # names can't contain NUL on any platform we run on
+    SEP = "\0"
+    # an mtime this close to the scan can still move within the same clock
+    # tick, so that directory gets listed again next time
+    RACY_NS = 2 * 10**9
+    # a busy tree changes between most searches; don't rewrite a big index
+    # every time (whatever is left over gets saved at exit)
+    SAVE_INTERVAL = 30
+
+    def __init__(self, root, directory=None):
+        if directory is None:
+            directory = os.environ.get("DAVIS_INDEX_DIR")
+        if directory is None:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            directory = os.path.join(base, "daviskernel", "index")
+        self.root = os.path.abspath(root)
+        self.directory = directory
+        self.path = os.path.join(directory, hashlib.sha1(self.root.encode("utf-8")).hexdigest() + ".idx")
+        self.tag = (self.VERSION, self.root)
+        # relative dir -> (mtime_ns, names joined with SEP, subdirs, subdirs to descend into)
+        self.dirs = {}
+        self.dirty = False
+        self.saved_at = None
+        self._joined = None
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError, TypeError):
+            return
+        if isinstance(data, dict) and data.get("tag") == self.tag:
+            self.dirs = data["dirs"]
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump({"tag": self.tag, "dirs": self.dirs}, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.path)
+            self.dirty = False
+            self.saved_at = time.monotonic()
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def clear(self):
+        self.dirs = {}
+        self._joined = None
+        self.dirty = True
+
+    def scan(self, path, mtime):
+        names, subdirs, descend = [], [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    names.append(entry.name)
+                    try:
+                        if entry.is_dir():
+                            subdirs.append(entry.name)
+                            # like os.walk: symlinked dirs are listed but not followed
+                            if not entry.is_symlink():
+                                descend.append(entry.name)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return (mtime, "".join(n + self.SEP for n in names), tuple(subdirs), tuple(descend))
+
+    def refresh(self):
+        """Bring the index up to date with the tree; returns how many dirs were listed."""
+        listed = 0
+        seen = set()
+        now = time.time_ns()
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            path = os.path.join(self.root, rel)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(rel)
+            entry = self.dirs.get(rel)
+            if entry is None or entry[0] != mtime:
+                entry = self.dirs[rel] = self.scan(path, mtime if now - mtime > self.RACY_NS else -1)
+                listed += 1
+            stack.extend(os.path.join(rel, d) for d in entry[3])
+        gone = self.dirs.keys() - seen
+        for rel in gone:
+            del self.dirs[rel]
+        if listed or gone:
+            self.dirty = True
+            self._joined = None
+            if self.saved_at is None or time.monotonic() - self.saved_at >= self.SAVE_INTERVAL:
+                self.save()
+        return listed
+
+    def joined(self):
+        if self._joined is None:
+            rels = list(self.dirs)
+            chunks = [self.dirs[r][1] for r in rels]
+            # starts[i] is where dir i's names begin in the joined string
+            starts = array.array("q", itertools.accumulate(map(len, chunks), initial=0))
+            self._joined = ("".join(chunks), starts, rels)
+        return self._joined
+
+    def search(self, text, want=None, max_depth=None, match=None):
+        """Paths of every indexed entry whose name contains text.
+
+        want ("file" or "dir"), max_depth (1 = only entries right under the
+        root) and match (a test on the name) narrow the results down. With no
+        text every name goes through match, which is slower but still never
+        touches the disk.
+        """
+        names, starts, rels = self.joined()
+        matches = []
+        for rel, name in self.candidates(text, names, starts, rels):
+            if max_depth is not None and rel and rel.count(os.sep) + 1 >= max_depth:
+                continue
+            if want is not None and (want == "dir") != (name in self.dirs[rel][2]):
+                continue
+            if match is None or match(name):
+                matches.append(os.path.join(self.root, rel, name))
+        return matches
+
+    def candidates(self, text, names, starts, rels):
+        sep = self.SEP
+        if text is None:
+            for rel in rels:
+                for name in self.dirs[rel][1].split(sep)[:-1]:
+                    yield rel, name
+            return
+        text = text.replace(sep, "")
+        if not text:
+            return
+        pos = names.find(text)
+        while pos != -1:
+            start = names.rfind(sep, 0, pos) + 1
+            end = names.find(sep, pos)
+            # empty dirs share a start with the next one, so take the last
+            yield rels[bisect.bisect_right(starts, start) - 1], names[start:end]
+            pos = names.find(text, end)
+
+
+class TreeSearch:
+    """Walks a tree with os.scandir over a thread pool, streaming matches.
+
+    Workers pull directories off one shared stack, so a single huge subtree
+    still gets spread across every thread. scandir hands back each entry's
+    type from the directory listing itself (no stat per entry, unlike
+    os.walk), and the listing runs without the GIL. Iterating yields matching
+    paths as each directory is read; closing the iterator early (--limit)
+    stops the workers.
+    """
+
+    def __init__(self, root, match, want=None, max_depth=None, workers=None):
+        self.root = root
+        self.match = match
+        self.want = want
+        self.max_depth = max_depth
+        # listing is I/O bound, so more threads than cores (same sizing as ThreadPoolExecutor's)
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+
+    def __iter__(self):
+        todo = queue.LifoQueue()
+        found = queue.SimpleQueue()
+        stop = threading.Event()
+        lock = threading.Lock()
+        pending = [1]
+        todo.put((self.root, 1))
+
+        def worker():
+            while True:
+                item = todo.get()
+                if item is None or stop.is_set():
+                    return
+                path, depth = item
+                hits = []
+                try:
+                    hits, subdirs = self.scan(path, depth)
+                    with lock:
+                        pending[0] += len(subdirs)
+                    for d in subdirs:
+                        todo.put((d, depth + 1))
+                finally:
+                    found.put(hits)
+                    with lock:
+                        pending[0] -= 1
+                        done = pending[0] == 0
+                    if done:
+                        found.put(None)
+
+        pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="search")
+        try:
+            for _ in range(self.workers):
+                pool.submit(worker)
+            while True:
+                hits = found.get()
+                if hits is None:
+                    return
+                yield from hits
+        finally:
+            stop.set()
+            for _ in range(self.workers):
+                todo.put(None)
+            pool.shutdown(wait=True)
+
+    def scan(self, path, depth):
+        hits, subdirs = [], []
+        descend = self.max_depth is None or depth < self.max_depth
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    # like os.walk: symlinked dirs are listed but not followed
+                    if is_dir and descend and not entry.is_symlink():
+                        subdirs.append(entry.path)
+                    if self.want is not None and (self.want == "dir") != is_dir:
+                        continue
+                    if self.match(entry.name):
+                        hits.append(entry.path)
+        except OSError:
+            pass
+        return hits, subdirs
+
+
+class ListingCache:
+    """Directory listings reused until the directory's mtime moves.
+
+    Each listing is (name, is_dir) pairs sorted by name, built from
+    os.scandir's DirEntry types so no entry needs its own stat call. Sizes
+    and mtimes aren't kept: writing to a file doesn't touch its directory's
+    mtime, so those would go stale without anything noticing.
+    """
+
+    MAX_DIRS = 64
+
+    def __init__(self):
+        self.listings = {}
 
-    def resolve_var(self, name: str):
-        if self.scope_stack and name in self.scope_stack[-1]:
-            return self.scope_stack[-1][name]
-        if name in self.globals:
-            return self.globals[name]
-        raise Exception(f"Lumen Error: Variable '{name}' not defined")
+    def get(self, path):
+        """Sorted (name, is_dir) entries of path; raises OSError like os.scandir."""
+        mtime = os.stat(path).st_mtime_ns
+        hit = self.listings.pop(path, None)
+        if hit is not None and hit[0] == mtime:
+            # re-inserted, so the oldest listing is always first in line to go
+            self.listings[path] = hit
+            return hit[1]
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append((entry.name, is_dir))
+        entries.sort(key=lambda e: (e[0].lower(), e[0]))
+        # same racy-mtime rule as FileIndex
+        if time.time_ns() - mtime > FileIndex.RACY_NS:
+            self.listings[path] = (mtime, entries)
+            if len(self.listings) > self.MAX_DIRS:
+                del self.listings[next(iter(self.listings))]
+        return entries
 
-    def assign_var(self, name: str, value):
-        if self.scope_stack:
-            self.scope_stack[-1][name] = value
-        else:
-            self.globals[name] = value
 
-    # exececutiuon
-    def exec_line(self, line: str):
-        if line is None:
-            return
-        # strip only trailing newline; preserve leading/trailing spaces for top-level splitting
-        line = line.rstrip()
-        if not line:
-            return
+def format_bytes(n):
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if n < 1024 or unit == "TiB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
 
-        # If the line is not a block text (with braces), split top-level semicolons
-        if not ("{" in line and "}" in line and (line.strip().startswith("func ") or line.strip().startswith("class ") or line.strip().startswith("if ") or line.strip().startswith("cycle "))):
-            parts = self.split_top_level(line, ";")
-            if len(parts) > 1:
-                for p in parts:
-                    self.exec_line(p.strip())
-                return
 
-        stripped = line.strip()
+class CopyEngine:
+    """Copies files and whole trees with a thread pool.
 
-        # funcs
-        if stripped.startswith("func ") and "{" in line:
-            header, rest = line.split("{", 1)
-            body_text = rest.rsplit("}", 1)[0]
-            body_lines = [ln.rstrip() for ln in body_text.splitlines() if ln.strip()]
-            m = re.match(r'func\s+([A-Za-z_]\w*)\s*\((.*)\)\s*$', header.strip())
-            if not m:
-                raise Exception(f"Lumen Error: Invalid function header '{header.strip()}'")
-            fname = m.group(1)
-            params_raw = m.group(2).strip()
-            params = []
-            if params_raw:
-                for p in self.split_top_level(params_raw, ","):
-                    p = p.strip()
-                    if not p:
-                        continue
-                    parts = p.split()
-                    if len(parts) != 2:
-                        raise Exception(f"Lumen Error: Invalid parameter '{p}'")
-                    params.append((parts[0], parts[1]))
-            self.functions[fname] = {"params": params, "body": body_lines}
-            return
+    Data moves kernel-side wherever the OS allows it: os.copy_file_range
+    (which can also reflink, or copy server-side on network filesystems),
+    then os.sendfile, then a plain read/write loop with a big buffer.
+    Counters are updated as each chunk lands, so the caller can show progress
+    while the copy runs. With resume, a destination file that already has
+    the source's size and mtime is skipped - the mtime is only copied over
+    once a file is complete, so a half-written file never looks done.
+    With verify (used by move), data is streamed through userspace and
+    hashed on the way, and each file is read back from disk and checked.
+    """
 
-        # # ---------- class block (minimal) ----------
-        # if stripped.startswith("class ") and "{" in line:
-        #     header, rest = line.split("{", 1)
-        #     body_text = rest.rsplit("}", 1)[0]
-        #     body_lines = [ln.rstrip() for ln in body_text.splitlines() if ln.strip()]
-        #     cname = header.split()[1]
-        #     fields = []
-        #     methods = {}
-        #     for stmt in body_lines:
-        #         if stmt.startswith(("int ", "str ", "float ", "bool ")):
-        #             fields.append(stmt)
-        #         elif stmt.startswith("func "):
-        #             # try simple inline parse for method; handle more complex later if desired
-        #             h, r = stmt.split("{", 1)
-        #             b = r.rsplit("}", 1)[0]
-        #             hm = re.match(r'func\s+([A-Za-z_]\w*)\s*\((.*)\)\s*$', h.strip())
-        #             if hm:
-        #                 mname = hm.group(1)
-        #                 params_raw = hm.group(2)
-        #                 mparams = []
-        #                 if params_raw:
-        #                     for pr in self.split_top_level(params_raw, ","):
-        #                         pr = pr.strip()
-        #                         if not pr:
-        #                             continue
-        #                         parts = pr.split()
-        #                         if len(parts) != 2:
-        #                             raise Exception(f"Lumen Error: Invalid parameter '{pr}' in method")
-        #                         mparams.append((parts[0], parts[1]))
-        #                 methods[mname] = {"params": mparams, "body": [ln.rstrip() for ln in b.splitlines() if ln.strip()]}
-        #     self.classes[cname] = {"fields": fields, "methods": methods}
-        #     return
+    CHUNK = 8 * 1024 * 1024
+    # errors meaning "this pair of files can't do that", not "the copy failed"
+    UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF}
 
-        # typed declarations, just how god intended
-        for decl in ("int", "str", "float", "bool"):
-            if stripped.startswith(decl + " "):
-                rest = stripped[len(decl):].strip()
-                if "=" in rest:
-                    varname, rhs = rest.split("=", 1)
-                    varname = varname.strip()
-                    rhs = rhs.strip()
-                    if rhs.startswith("scan"):
-                        prompt_expr = rhs[len("scan"):].strip()
-                        if prompt_expr.startswith("(") and prompt_expr.endswith(")"):
-                            prompt_expr = prompt_expr[1:-1].strip()
-                        prompt = ""
-                        if prompt_expr:
-                            try:
-                                prompt = str(self.eval_expr(prompt_expr))
-                            except Exception as e:
-                                raise Exception(f"Lumen Error: Invalid scan prompt '{prompt_expr}': {e}")
-                        user_in = input(f"{prompt}: " if prompt else "")
-                        try:
-                            if decl == "int":
-                                val = int(user_in)
-                            elif decl == "float":
-                                val = float(user_in)
-                            elif decl == "bool":
-                                val = user_in.lower() in ("true", "1", "yes")
-                            else:
-                                val = user_in
-                        except ValueError:
-                            raise Exception(f"Lumen Error: Cannot convert input '{user_in}' to {decl}")
-                        self.assign_var(varname, val)
+    def __init__(self, workers=None, resume=False, verify=False):
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.resume = resume
+        self.verify = verify
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.files_total = self.files_done = self.files_skipped = 0
+        self.bytes_total = self.bytes_done = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.use_copy_file_range = hasattr(os, "copy_file_range")
+        # only Linux sendfile takes a regular file as the destination
+        self.use_sendfile = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+    def plan(self, src, dst):
+        """Walk src: (dirs, symlinks, files) to recreate under dst."""
+        if not os.path.isdir(src):
+            return [], [], [(src, dst, os.stat(src))]
+        dirs, links, files = [(src, dst)], [], []
+        stack = [(src, dst)]
+        while stack:
+            src_dir, dst_dir = stack.pop()
+            with os.scandir(src_dir) as it:
+                for entry in it:
+                    target = os.path.join(dst_dir, entry.name)
+                    # links are recreated as links: a link back up the tree can't loop the copy
+                    if entry.is_symlink():
+                        links.append((entry.path, target))
+                    elif entry.is_dir():
+                        dirs.append((entry.path, target))
+                        stack.append((entry.path, target))
+                    elif entry.is_file():
+                        files.append((entry.path, target, entry.stat()))
                     else:
-                        val = self.eval_expr(rhs)
-                        self.assign_var(varname, val)
-                else:
-                    varname = rest.strip()
-                    defaults = {"int": 0, "float": 0.0, "bool": False, "str": ""}
-                    self.assign_var(varname, defaults[decl])
-                return
+                        self.errors.append(f"{entry.path}: skipped (not a regular file)")
+        return dirs, links, files
 
-        # increment/decrement
-        m_inc = re.match(r"^([A-Za-z_]\w*)\s*(\+\+|--)\s*(.*)$", stripped)
-        if m_inc:
-            varname, op, amt_expr = m_inc.groups()
-            amt_expr = (amt_expr or "").strip()
+    def run(self, src, dst, report=None):
+        """Copy src (a file or a tree) to dst, calling report(self) a few times a second."""
+        dirs, links, files = self.plan(src, dst)
+        for _, d in dirs:
+            os.makedirs(d, exist_ok=True)
+        for s, d in links:
             try:
-                current = self.resolve_var(varname)
-            except Exception:
-                raise Exception(f"Lumen Error: Variable '{varname}' not defined")
-            if amt_expr == "":
-                amt = 1
-            else:
-                amt = self.eval_expr(amt_expr)
-            if op == "++":
-                self.assign_var(varname, current + amt)
-            else:
-                self.assign_var(varname, current - amt)
-            return
-
-        # print
-        if stripped.startswith("print"):
-            expr = stripped[5:].strip()
-            if expr.startswith("(") and expr.endswith(")"):
-                expr = expr[1:-1].strip()
-
-            # try to eval whole expression first (works for arithmetic / clean expressions)
+                if os.path.lexists(d):
+                    if self.resume and os.path.islink(d) and os.readlink(d) == os.readlink(s):
+                        continue
+                    os.remove(d)
+                os.symlink(os.readlink(s), d)
+            except OSError as e:
+                self.errors.append(f"{s}: {e.strerror or e}")
+        self.files_total = len(files)
+        self.bytes_total = sum(st.st_size for _, _, st in files)
+        # biggest first, so one large file doesn't end up copying alone at the end
+        files.sort(key=lambda f: f[2].st_size, reverse=True)
+        pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="copy")
+        try:
+            pending = {pool.submit(self.copy_file, *job): job[0] for job in files}
+            while pending:
+                done, _ = concurrent.futures.wait(pending, timeout=0.25)
+                for future in done:
+                    src_path = pending.pop(future)
+                    # copy_file records OSErrors itself; anything else ends up here
+                    error = future.exception()
+                    if error is not None:
+                        self.errors.append(f"{src_path}: {error!r}")
+                if report is not None:
+                    report(self)
+        except BaseException:
+            # Ctrl-C: workers stop at their next chunk
+            self.cancelled.set()
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        # directory times last, after every file inside has been written
+        for s, d in reversed(dirs):
             try:
-                val = self.eval_expr(expr)
-                print(val)
-                return
-            except NameError:
-                pass
-            except Exception:
+                shutil.copystat(s, d)
+            except OSError:
                 pass
 
-            if "+" in expr:
-                parts = [p.strip() for p in self.split_top_level(expr, "+")]
-                out_parts = []
-                for p in parts:
-                    if (p.startswith('"') and p.endswith('"')) or (p.startswith("'") and p.endswith("'")):
-                        out_parts.append(p[1:-1])
-                    else:
-                        try:
-                            v = self.eval_expr(p)
-                            out_parts.append(str(v))
-                        except NameError:
-                            # check local/global variables explicitly
-                            if self.scope_stack and p in self.scope_stack[-1]:
-                                out_parts.append(str(self.scope_stack[-1][p]))
-                                continue
-                            if p in self.globals:
-                                out_parts.append(str(self.globals[p]))
-                                continue
-                            raise Exception(f"Lumen Error: Variable '{p}' not defined")
-                        except Exception as e:
-                            raise Exception(f"Lumen Error: Cannot evaluate '{p}' in print: {e}")
-                # do literal concatenation (no automatic spaces)
-                print("".join(out_parts))
-                return
+    def complete(self, dst, st):
+        try:
+            done = os.stat(dst)
+        except OSError:
+            return False
+        return done.st_size == st.st_size and done.st_mtime_ns == st.st_mtime_ns
 
-            # no plus, try string literal or eval
-            if (expr.startswith('"') and expr.endswith('"')) or (expr.startswith("'") and expr.endswith("'")):
-                print(expr[1:-1])
+    def copy_file(self, src, dst, st):
+        if self.cancelled.is_set():
+            return
+        try:
+            if self.resume and self.complete(dst, st):
+                with self.lock:
+                    self.files_skipped += 1
+                    self.bytes_done += st.st_size
                 return
+            # opening dst for writing would truncate src before a byte is read
             try:
-                val = self.eval_expr(expr)
-                print(val)
-                return
-            except NameError as e:
-                raise Exception(str(e))
-            except Exception as e:
-                raise Exception(str(e))
-
-        # if/else inline
-        if stripped.startswith("if ") and "{" in line:
-            header_body = line
-            cm = re.search(r"\((.*)\)", header_body)
-            if not cm:
-                raise Exception("Lumen Error: Invalid if condition")
-            cond_expr = cm.group(1).strip()
-            cond_val = self.eval_expr(cond_expr)
-
-            # extract first {...} as then, optional second {...} as else
-            first_start = header_body.find("{")
-            first_end = header_body.find("}", first_start)
-            then_part = header_body[first_start+1:first_end].strip()
-            else_part = None
-            after = header_body[first_end+1:]
-            if "else" in after and "{" in after and "}" in after:
-                s = after.find("{")
-                e = after.find("}", s)
-                else_part = after[s+1:e].strip()
-
-            if cond_val:
-                for stmt in [s.strip() for s in self.split_top_level(then_part, ";") if s.strip()]:
-                    self.exec_line(stmt)
+                done = os.stat(dst)
+            except FileNotFoundError:
+                pass
             else:
-                if else_part:
-                    for stmt in [s.strip() for s in self.split_top_level(else_part, ";") if s.strip()]:
-                        self.exec_line(stmt)
-            return
+                if (done.st_dev, done.st_ino) == (st.st_dev, st.st_ino):
+                    raise shutil.SameFileError(f"'{src}' and '{dst}' are the same file")
+            with open(src, "rb") as fin, open(dst, "wb") as fout:
+                if self.verify:
+                    hasher = hashlib.blake2b()
+                    copied = self.stream(fin, fout, st.st_size, hasher)
+                    digest = hasher.digest()
+                    fout.flush()
+                    os.fsync(fout.fileno())
+                else:
+                    copied = self.transfer(fin, fout, st.st_size)
+            if copied != st.st_size:
+                raise OSError(errno.EIO, f"copied {copied:,} of {st.st_size:,} bytes (did the file change?)")
+            if self.verify:
+                self.check(dst, st.st_size, digest)
+            shutil.copystat(src, dst)
+            with self.lock:
+                self.files_done += 1
+        except OSError as e:
+            if not self.cancelled.is_set():
+                with self.lock:
+                    self.errors.append(f"{src}: {e.strerror or e}")
 
-        # cycle loops
-        if stripped.startswith("cycle ") and "{" in line:
-            cm = re.search(r"\((.*)\)", stripped)
-            if not cm:
-                raise Exception("Lumen Error: Invalid cycle condition")
-            cond_expr = cm.group(1).strip()
-            body_text = line[line.find("{")+1:line.rfind("}")].strip()
-            body_lines = [ln.rstrip() for ln in body_text.splitlines() if ln.strip()]
-            # while loop
-            while True:
-                cond_val = self.eval_expr(cond_expr)
-                if not cond_val:
-                    break
-                for stmt in body_lines:
-                    for s in [ss.strip() for ss in self.split_top_level(stmt, ";") if ss.strip()]:
-                        self.exec_line(s)
-            return
+    def advance(self, n):
+        with self.lock:
+            self.bytes_done += n
+        if self.cancelled.is_set():
+            raise InterruptedError("copy cancelled")
+        return n
 
-        # calling fns
-        call_m = re.match(r"^([A-Za-z_]\w*)\s*\((.*)\)\s*$", stripped)
-        if call_m:
-            fname = call_m.group(1)
-            args_raw = call_m.group(2).strip()
-            if fname not in self.functions:
-                raise Exception(f"Lumen Error: Function '{fname}' not defined")
-            func = self.functions[fname]
-            args = []
-            if args_raw:
-                for part in self.split_top_level(args_raw, ","):
-                    if part.strip():
-                        args.append(part.strip())
-
-            arg_values = []
-            for a in args:
-                # attempt to eval argument using current evaluation environment
+    def transfer(self, fin, fout, size):
+        """Copy fin to fout, kernel-side where possible; returns the bytes copied."""
+        src, dst = fin.fileno(), fout.fileno()
+        copied = 0
+        if self.use_copy_file_range:
+            try:
+                while n := os.copy_file_range(src, dst, self.CHUNK):
+                    copied += self.advance(n)
+            except OSError as e:
+                if copied or e.errno not in self.UNSUPPORTED:
+                    raise
+                if e.errno == errno.ENOSYS:
+                    self.use_copy_file_range = False
+        # some filesystems report EOF early (procfs, some FUSE mounts): carry
+        # on from where it stopped, both file positions have moved along
+        if self.use_sendfile and copied < size:
+            sent = 0
+            try:
+                while n := os.sendfile(dst, src, None, self.CHUNK):
+                    sent += self.advance(n)
+            except OSError as e:
+                if sent or e.errno not in self.UNSUPPORTED:
+                    raise
+                if e.errno == errno.ENOSYS:
+                    self.use_sendfile = False
+            copied += sent
+        if copied < size:
+            copied += self.stream(fin, fout, size - copied)
+        return copied
+
+    def stream(self, fin, fout, size, hasher=None):
+        """Read/write copy in big chunks, feeding hasher; returns the bytes copied."""
+        buf = bytearray(max(min(self.CHUNK, size), 64 * 1024))
+        view = memoryview(buf)
+        copied = 0
+        while n := fin.readinto(buf):
+            if hasher is not None:
+                hasher.update(view[:n])
+            fout.write(view[:n])
+            copied += self.advance(n)
+        return copied
+
+    def check(self, dst, size, digest):
+        hasher = hashlib.blake2b()
+        buf = bytearray(max(min(self.CHUNK, size), 64 * 1024))
+        view = memoryview(buf)
+        with open(dst, "rb") as f:
+            if hasattr(os, "posix_fadvise"):
+                # drop the cached pages, so this reads back what actually reached the disk
                 try:
-                    val = self.eval_expr(a)
-                except NameError:
-                    # if it's a global var name, use that
-                    if a in self.globals:
-                        val = self.globals[a]
-                    else:
-                        # maybe it's a literal like "hello"
-                        if (a.startswith('"') and a.endswith('"')) or (a.startswith("'") and a.endswith("'")):
-                            val = a[1:-1]
-                        else:
-                            raise Exception(f"Lumen Error: Cannot resolve function argument '{a}'")
-                arg_values.append(val)
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+                except OSError:
+                    pass
+            while n := f.readinto(buf):
+                hasher.update(view[:n])
+                if self.cancelled.is_set():
+                    raise InterruptedError("copy cancelled")
+        if hasher.digest() != digest:
+            raise OSError(errno.EIO, "checksum mismatch after copy")
 
-            # create local scope only containing parameters (locals override globals via eval_expr)
-            local_scope = {}
-            for (typ, pname), aval in zip(func['params'], arg_values):
-                local_scope[pname] = aval
+    def progress(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (f"{self.files_done + self.files_skipped}/{self.files_total} files  "
+                f"{format_bytes(self.bytes_done)}/{format_bytes(self.bytes_total)}  "
+                f"{format_bytes(self.bytes_done / elapsed)}/s")
 
-            # push local scope
-            self.scope_stack.append(local_scope)
-            try:
-                for stmt in func['body']:
-                    for s in [ss.strip() for ss in self.split_top_level(stmt, ";") if ss.strip()]:
-                        self.exec_line(s)
-            finally:
-                self.scope_stack.pop()
-            return
 
-        if "=" in stripped:
-            varname, rhs = stripped.split("=", 1)
-            varname = varname.strip()
-            rhs = rhs.strip()
-            val = self.eval_expr(rhs)
-            self.assign_var(varname, val)
-            return
+class BackgroundTask:
+    """A shell job that runs on a thread instead of a process.
 
-        raise Exception(f"Lumen Error: Unknown statement '{line}'")
+    Looks enough like the subprocess.Popen objects in Shell.jobs (pid, poll,
+    terminate) that jobs and kill handle both the same way.
+    """
 
-    def run_file(self, path: str, type_check=False):
-        with open(path, 'r', encoding='utf-8') as f:
-            lines = f.read().splitlines()
-        i = 0
-        n = len(lines)
-        while i < n:
-            raw = lines[i]
-            stripped = raw.strip()
-            if not stripped:
-                i += 1
-                continue
+    def __init__(self, label, target, cancel=None, status=None):
+        self.label = label
+        self.target = target
+        self.cancel = cancel
+        self.status = status
+        self.returncode = None
+        self.thread = threading.Thread(target=self.main, name=label, daemon=True)
+        self.thread.start()
+        self.pid = self.thread.native_id
+
+    def main(self):
+        try:
+            self.returncode = 0 if self.target() else 1
+        except BaseException:
+            self.returncode = 1
+            raise
+
+    def poll(self):
+        return None if self.thread.is_alive() else self.returncode
+
+    def terminate(self):
+        if self.cancel is not None:
+            self.cancel()
+
+    def describe(self):
+        detail = self.status() if self.status is not None and self.poll() is None else ""
+        return f"{self.label}  {detail}".rstrip()
 
-            # detect block starting lines (func/class/if/cycle/else) with '{'
-            if (stripped.startswith('func ') or stripped.startswith('class ') or stripped.startswith('if ') or stripped.startswith('cycle ') or stripped.startswith('else')) and '{' in stripped:
-                block_lines = [raw]
-                brace_count = raw.count('{') - raw.count('}')
-                i += 1
-                while brace_count > 0 and i < n:
-                    ln = lines[i]
-                    block_lines.append(ln)
-                    brace_count += ln.count('{') - ln.count('}')
-                    i += 1
-                block_text = "\n".join(block_lines)
-                self.exec_line(block_text)
-                continue
 
-            # non-block line: may contain several top-level semicolon-separated statements
-            parts = self.split_top_level(raw, ';')
-            for p in parts:
-                if p.strip():
-                    self.exec_line(p.strip())
-            i += 1
 class Shell:
     def __init__(self):
         self.current_dir = os.getcwd()
@@ -666,6 +4261,9 @@ class Shell:
         self.jobs = {}
         self.job_counter = 1
         self.DEFAULT_EXT = ".txt"
+        self.lumen_cache = LumenCache()
+        self.search_indexes = {}
+        self.listing_cache = ListingCache()
         self.aliases ={
             "del": "delete",
             "co": "copy",
@@ -684,14 +4282,14 @@ class Shell:
 
         self.help_text = {
             "File Commands": {
-                "calc": "Calculator (interactive or single expression)",
-                "copy file": "Copy a file to another directory",
+                "calc": "Calculator (interactive, single expression, or calc --file <path> / calc - for one expression per line)",
+                "copy file": "Copy a file (or copy dir a directory) to another directory; --resume finishes an interrupted copy, -j N parallel files",
                 "delete file": "Delete a file",
                 "make file": "Create a new file",
-                "move file": "Move a file to another directory",
+                "move file": "Move a file to another directory (checksum-verified across filesystems; --bg runs it as a job)",
                 "open file": "Open an existing file",
                 "rename file": "Rename a file",
-                "search": "Search for files/directories containing a name",
+                "search": "Search for files/directories containing a name (uses a saved index; --reindex rebuilds it, --no-index streams a parallel walk; --glob, --regex, --type file|dir, --max-depth N, --limit N filter)",
                 "view file": "View a file's contents",
                 "info": "Show info about a file or directory"
             },
@@ -699,7 +4297,7 @@ class Shell:
                 "delete dir": "Delete a directory",
                 "goto": "Change directory",
                 "here": "Show current directory",
-                "list": "List contents of current directory",
+                "list": "List contents of current (or given) directory (-l sizes/mtimes, --sort name|type|size|mtime, -r, --limit N, -p pages)",
                 "make dir": "Create a new directory",
                 "move dir": "Move a directory"
             },
@@ -715,7 +4313,7 @@ class Shell:
                 "run": "Run an external command"
             },
             "Miscellaneous": {
-                "lumen": "Start Lumen REPL or run a Lumen script (lumen run <file>)",
+                "lumen": "Start Lumen REPL (:time <stmt>, :timeit <stmt> N, :save, :run) or run a Lumen script (lumen run [--compile] <file>, lumen run-all <glob> [-j N] [--prefix], lumen conform, lumen cache clear|stats, lumen profile <file>)",
                 #"echo": "Print text",#Why did I ever think that i should've made lumen in python???
                 "history": "Show command history",
                 "quit": "Exit the shell",
@@ -814,9 +4412,14 @@ class Shell:
             f.write("\n".join(new_lines))
         print(f"{GREEN}Saved {filename}{RESET}")
 
-    def move(self, item_type, name, dest_dir_name):
+    def move(self, item_type, name, dest_dir_name, *options):
         """Move a file, Lumen file, or directory to another directory.
-           Special keyword ':back' moves it to the parent directory."""
+           Special keyword ':back' moves it to the parent directory.
+           Across filesystems the data is copied and verified before the
+           source is removed; --bg runs that copy as a job."""
+        if set(options) - {"--bg"}:
+            print(f"{YELLOW}Usage: move <type> <name> <dest> [--bg]{RESET}")
+            return
 
         # Handle Lumen extension
         if item_type == "lum" and not name.endswith(".lum"):
@@ -835,7 +4438,7 @@ class Shell:
         dest = os.path.join(dest_dir, name)
 
         # Validate source
-        if not os.path.exists(src):
+        if not os.path.lexists(src):
             print(f"{RED}{item_type.capitalize()} '{name}' does not exist.{RESET}")
             return
 
@@ -844,13 +4447,103 @@ class Shell:
             print(f"{RED}Destination directory '{dest_dir_name}' does not exist.{RESET}")
             return
 
-        # Move the item
-        shutil.move(src, dest)
-        print(f"{GREEN}Moved {item_type} '{name}' to '{dest_dir}'{RESET}")
+        if os.path.isdir(dest) and not os.path.islink(dest):
+            print(f"{RED}'{name}' already exists in '{dest_dir}'.{RESET}")
+            return
+
+        # Same filesystem: just a rename, however big the item is
+        try:
+            if os.lstat(src).st_dev == os.stat(dest_dir).st_dev:
+                os.replace(src, dest)
+                print(f"{GREEN}Moved {item_type} '{name}' to '{dest_dir}'{RESET}")
+                return
+        except OSError as e:
+            # bind mounts can share st_dev but still refuse to rename across
+            if e.errno != errno.EXDEV:
+                print(f"{RED}Error: {e}{RESET}")
+                return
+
+        done = f"Moved {item_type} '{name}' to '{dest_dir}'"
+        engine = CopyEngine(verify=True)
+        if "--bg" in options:
+            job_id = str(self.job_counter)
+            self.job_counter += 1
+            task = BackgroundTask(f"move {name} -> {dest_dir}",
+                                  lambda: self.moveAcross(src, dest, engine, done, prefix=f"[{job_id}] "),
+                                  cancel=engine.cancelled.set, status=engine.progress)
+            self.jobs[job_id] = task
+            print(f"{CYAN}Started job [{job_id}] {task.label}{RESET}")
+            return
+        self.moveAcross(src, dest, engine, done, report=self.copyProgress if sys.stdout.isatty() else None)
+
+    def moveAcross(self, src, dest, engine, done, report=None, prefix=""):
+        """Copy src to dest on another filesystem, verify it, then drop src.
+
+        The copy goes to a temporary name next to dest and only replaces dest
+        once it's verified. If anything fails (or gets interrupted) just that
+        temporary copy goes; the source and whatever was at dest stay. Returns
+        True when the move went through.
+        """
+        tmp = os.path.join(os.path.dirname(dest), f".{os.path.basename(dest)}.{os.getpid()}.moving")
+        try:
+            if os.path.islink(src):
+                os.symlink(os.readlink(src), tmp)
+            else:
+                engine.run(src, tmp, report=report)
+            if not engine.errors and not engine.cancelled.is_set():
+                os.replace(tmp, dest)
+        except KeyboardInterrupt:
+            engine.cancelled.set()
+        except OSError as e:
+            engine.errors.append(str(e))
+        if report is not None:
+            sys.stdout.write("\r\033[K")
+        if engine.errors or engine.cancelled.is_set():
+            self.removeQuietly(tmp)
+            what = "Move cancelled" if engine.cancelled.is_set() else "Move failed"
+            print(f"{RED}{prefix}{what}; '{os.path.basename(src)}' is still where it was.{RESET}")
+            for err in engine.errors[:10]:
+                print(f"{RED}  {err}{RESET}")
+            return False
+        try:
+            if os.path.isdir(src) and not os.path.islink(src):
+                shutil.rmtree(src)
+            else:
+                os.remove(src)
+        except OSError as e:
+            print(f"{RED}{prefix}Copied and verified, but couldn't remove the source: {e}{RESET}")
+            return False
+        self.copySummary(engine, prefix + done)
+        return True
+
+    @staticmethod
+    def removeQuietly(path):
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            elif os.path.lexists(path):
+                os.remove(path)
+        except OSError:
+            pass
 
-    def copy(self, item_type, name, dest_dir_name):
+    def copy(self, item_type, name, dest_dir_name, *options):
         """Copy a file, Lumen file, or directory to another directory.
-           Special keywords ':back' and ':home' are supported."""
+           Special keywords ':back' and ':home' are supported.
+           --resume skips files an earlier (interrupted) copy already finished,
+           -j N sets how many files copy at once."""
+        options = list(options)
+        workers = None
+        if "-j" in options:
+            i = options.index("-j")
+            if i + 1 >= len(options) or not options[i + 1].isdigit() or int(options[i + 1]) < 1:
+                print(f"{YELLOW}Usage: copy <type> <name> <dest> [--resume] [-j N]{RESET}")
+                return
+            workers = int(options[i + 1])
+            del options[i:i + 2]
+        if set(options) - {"--resume"}:
+            print(f"{YELLOW}Usage: copy <type> <name> <dest> [--resume] [-j N]{RESET}")
+            return
+        resume = "--resume" in options
 
         # Handle Lumen extension
         if item_type == "lum" and not name.endswith(".lum"):
@@ -878,35 +4571,43 @@ class Shell:
             print(f"{RED}Destination directory '{dest_dir_name}' does not exist.{RESET}")
             return
 
-        # Copy the item
-        if os.path.isdir(src):
-            shutil.copytree(src, dest)
-        else:
-            shutil.copy(src, dest)
-
-        print(f"{GREEN}Copied {item_type} '{name}' to '{dest_dir}'{RESET}")
-
-        src = os.path.join(self.current_dir, name)
-        dest_dir = os.path.join(self.current_dir, dest_dir_name)
-        dest = os.path.join(dest_dir, name)
-
-        # Validate source
-        if not os.path.exists(src):
-            print(f"{RED}{item_type.capitalize()} '{name}' does not exist.{RESET}")
+        if os.path.exists(dest) and os.path.samefile(src, dest):
+            print(f"{RED}'{name}' is already in '{dest_dir}' (source and destination are the same).{RESET}")
             return
 
-        # Validate destination directory
-        if not os.path.exists(dest_dir):
-            print(f"{RED}Destination directory '{dest_dir_name}' does not exist.{RESET}")
+        if os.path.isdir(src) and os.path.exists(dest) and not resume:
+            print(f"{RED}'{name}' already exists in '{dest_dir}' (--resume finishes an earlier copy).{RESET}")
             return
 
         # Copy the item
-        if os.path.isdir(src):
-            shutil.copytree(src, dest)
-        else:
-            shutil.copy(src, dest)
+        engine = CopyEngine(workers=workers, resume=resume)
+        try:
+            engine.run(src, dest, report=self.copyProgress if sys.stdout.isatty() else None)
+        except KeyboardInterrupt:
+            print(f"\n{YELLOW}Copy interrupted; run it again with --resume to pick up where it stopped.{RESET}")
+            return
+        except OSError as e:
+            print(f"{RED}Error: {e}{RESET}")
+            return
+        if sys.stdout.isatty():
+            sys.stdout.write("\r\033[K")
+        self.copySummary(engine, f"Copied {item_type} '{name}' to '{dest_dir}'",
+                         f"Copy of {item_type} '{name}' to '{dest_dir}' failed")
 
-        print(f"{GREEN}Copied {item_type} '{name}' to '{dest_dir_name}'{RESET}")
+    def copyProgress(self, engine):
+        sys.stdout.write(f"\r\033[K{CYAN}{engine.progress()}{RESET}")
+        sys.stdout.flush()
+
+    def copySummary(self, engine, done, failed=None):
+        skipped = f", {engine.files_skipped} already there" if engine.files_skipped else ""
+        if engine.errors:
+            print(f"{RED}{failed or done} ({engine.progress()}{skipped}, {len(engine.errors)} failed){RESET}")
+        else:
+            print(f"{GREEN}{done} ({engine.progress()}{skipped}){RESET}")
+        for err in engine.errors[:10]:
+            print(f"{RED}  {err}{RESET}")
+        if len(engine.errors) > 10:
+            print(f"{RED}  ...and {len(engine.errors) - 10} more errors{RESET}")
 
     def delete(self, item_type, *names):
         """Delete files, Lumen files, or directories."""
@@ -942,14 +4643,91 @@ class Shell:
             except Exception as e:
                 print(f"{RED}Error deleting '{os.path.basename(path)}': {e}{RESET}")
 
-    def listDir(self):
-        print(f"{CYAN}Contents of {self.current_dir}:{RESET}")
-        for item in os.listdir(self.current_dir):
-            path = os.path.join(self.current_dir, item)
-            if os.path.isdir(path):
-                print(f"{BLUE}[DIR]{RESET} {item}")
-            else:
-                print(f"{WHITE}      {item}{RESET}")
+    def listDir(self, *args):
+        usage = "Usage: list [dir] [-l] [--sort name|type|size|mtime] [-r] [--limit N | -p]"
+        args = list(args)
+        sort_key, limit = "name", None
+        for opt in ("--sort", "--limit"):
+            if opt in args:
+                i = args.index(opt)
+                if i + 1 >= len(args):
+                    print(f"{YELLOW}{usage}{RESET}")
+                    return
+                if opt == "--sort":
+                    sort_key = args[i + 1]
+                elif not args[i + 1].isdigit() or int(args[i + 1]) < 1:
+                    print(f"{YELLOW}--limit needs a positive number{RESET}")
+                    return
+                else:
+                    limit = int(args[i + 1])
+                del args[i:i + 2]
+        flags = {a for a in args if a.startswith("-")}
+        paths = [a for a in args if a not in flags]
+        if (len(paths) > 1 or flags - {"-l", "-r", "-p"} or sort_key not in ("name", "type", "size", "mtime")
+                or (limit is not None and "-p" in flags)):
+            print(f"{YELLOW}{usage}{RESET}")
+            return
+        target = os.path.join(self.current_dir, paths[0]) if paths else self.current_dir
+        try:
+            entries = self.listing_cache.get(target)
+        except OSError as e:
+            print(f"{RED}Cannot list '{target}': {e.strerror}{RESET}")
+            return
+
+        stats = {}
+
+        def stat(name):
+            # only for -l and size/mtime sorts, and each entry at most once
+            if name not in stats:
+                path = os.path.join(target, name)
+                try:
+                    stats[name] = os.stat(path)
+                except OSError:
+                    try:
+                        stats[name] = os.lstat(path)
+                    except OSError:
+                        stats[name] = None
+            return stats[name]
+
+        if sort_key == "type":
+            entries = sorted(entries, key=lambda e: not e[1])
+        elif sort_key in ("size", "mtime"):
+            field = "st_size" if sort_key == "size" else "st_mtime_ns"
+            # biggest / newest first, like ls -S / ls -t
+            def by_field(entry):
+                st = stat(entry[0])
+                return -getattr(st, field) if st is not None else 0
+            entries = sorted(entries, key=by_field)
+        if "-r" in flags:
+            entries = entries[::-1]
+
+        long = "-l" in flags
+
+        def row(name, is_dir):
+            if not long:
+                return f"{BLUE}[DIR]{RESET} {name}" if is_dir else f"{WHITE}      {name}{RESET}"
+            tag = f"{BLUE}[DIR]{RESET}{WHITE} " if is_dir else f"{WHITE}      "
+            st = stat(name)
+            size = "-" if is_dir or st is None else f"{st.st_size:,}"
+            when = "?" if st is None else datetime.datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m-%d %H:%M")
+            return f"{tag}{size:>14}  {when}  {name}{RESET}"
+
+        total = len(entries)
+        shown = entries if limit is None else entries[:limit]
+        print(f"{CYAN}Contents of {target}:{RESET}")
+        step = max(5, shutil.get_terminal_size().lines - 2) if "-p" in flags else len(shown) or 1
+        for start in range(0, len(shown), step):
+            # one write per page; a print per row is what makes huge dirs crawl
+            sys.stdout.write("\n".join(row(n, d) for n, d in shown[start:start + step]) + "\n")
+            if start + step < len(shown):
+                try:
+                    answer = input(f"{CYAN}-- {start + step}/{total} (Enter for more, q to stop) --{RESET}")
+                except EOFError:
+                    break
+                if answer.strip().lower() == "q":
+                    break
+        if limit is not None and total > limit:
+            print(f"{CYAN}Showing {limit} of {total} entries.{RESET}")
     def changeDir(self, name):
         if name == "..":
             parent = os.path.dirname(self.current_dir)
@@ -1000,21 +4778,98 @@ class Shell:
         modified = datetime.datetime.fromtimestamp(stats.st_mtime)
         type_file = "Directory" if os.path.isdir(path_file) else "File"
         print(f"{CYAN}Name: {name}\nType: {type_file}\nSize: {size} bytes\nCreated: {created}\nModified: {modified}{RESET}")
-    def searchFiles(self, name):
-        matches = []
-        for root, dirs, files in os.walk(self.current_dir):
-            for file in files:
-                if name in file:
-                    matches.append(os.path.join(root, file))
-            for d in dirs:
-                if name in d:
-                    matches.append(os.path.join(root, d))
-        if matches:
-            for m in matches:
-                print(f"{GREEN}{m}{RESET}")
+    def searchFiles(self, *args):
+        usage = ("Usage: search [name] [--glob PATTERN] [--regex EXPR] [--type file|dir] [--max-depth N] "
+                 "[--limit N] [--reindex | --no-index]")
+        opts = {"--glob": None, "--regex": None, "--type": None, "--max-depth": None, "--limit": None}
+        flags, names = set(), []
+        i = 0
+        while i < len(args):
+            a = args[i]
+            if a in opts:
+                if i + 1 >= len(args):
+                    print(f"{YELLOW}{usage}{RESET}")
+                    return
+                opts[a] = args[i + 1]
+                i += 2
+                continue
+            if a.startswith("--"):
+                flags.add(a)
+            else:
+                names.append(a)
+            i += 1
+        if (len(names) > 1 or not (names or opts["--glob"] or opts["--regex"])
+                or flags - {"--reindex", "--no-index"} or len(flags) > 1
+                or opts["--type"] not in (None, "file", "dir")):
+            print(f"{YELLOW}{usage}{RESET}")
+            return
+        numbers = {}
+        for opt in ("--max-depth", "--limit"):
+            value = opts[opt]
+            if value is not None and (not value.isdigit() or int(value) < 1):
+                print(f"{YELLOW}{opt} needs a positive number{RESET}")
+                return
+            numbers[opt] = None if value is None else int(value)
+        name = names[0] if names else None
+        tests = []
+        if opts["--glob"]:
+            # fnmatch's translation, compiled once instead of per name
+            case = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+            tests.append(re.compile(fnmatch.translate(opts["--glob"]), case).match)
+        if opts["--regex"]:
+            try:
+                tests.append(re.compile(opts["--regex"]).search)
+            except re.error as e:
+                print(f"{RED}Bad regex '{opts['--regex']}': {e}{RESET}")
+                return
+        want, max_depth, limit = opts["--type"], numbers["--max-depth"], numbers["--limit"]
+
+        count = 0
+        if "--no-index" in flags:
+            if name is not None:
+                tests.insert(0, lambda n: name in n)
+            results = iter(TreeSearch(self.current_dir, self.allOf(tests), want, max_depth))
+            try:
+                # streamed: each directory's matches print as soon as it's read
+                for m in results:
+                    print(f"{GREEN}{m}{RESET}")
+                    count += 1
+                    if count == limit:
+                        print(f"{CYAN}Stopped after {limit} matches.{RESET}")
+                        break
+            finally:
+                results.close()
         else:
+            index = self.searchIndex(self.current_dir)
+            if "--reindex" in flags:
+                index.clear()
+            if not index.dirs:
+                print(f"{CYAN}Indexing {index.root} (later searches only re-read what changed)...{RESET}")
+            index.refresh()
+            matches = sorted(index.search(name, want, max_depth, self.allOf(tests) if tests else None))
+            for m in matches[:limit]:
+                print(f"{GREEN}{m}{RESET}")
+            count = len(matches)
+            if limit is not None and count > limit:
+                print(f"{CYAN}Showing {limit} of {count} matches.{RESET}")
+        if not count:
             print(f"{YELLOW}No matches found.{RESET}")
 
+    @staticmethod
+    def allOf(tests):
+        if len(tests) == 1:
+            return tests[0]
+        return lambda n: all(t(n) for t in tests)
+
+    def searchIndex(self, root):
+        root = os.path.abspath(root)
+        index = self.search_indexes.get(root)
+        if index is None:
+            index = self.search_indexes[root] = FileIndex(root)
+            # refresh() saves at most every SAVE_INTERVAL; keep the rest too
+            atexit.register(index.save)
+        return index
+
     def setEnv(self, var, value):
         self.env_vars[var] = value
         print(f"{GREEN}Set {var}={value}{RESET}")
@@ -1057,6 +4912,10 @@ class Shell:
     def listJobs(self):
         for job_id, proc in self.jobs.items():
             status = "Running" if proc.poll() is None else "Completed"
+            if isinstance(proc, BackgroundTask):
+                if proc.poll():
+                    status = "Failed"
+                status = f"{status} ({proc.describe()})"
             print(f"{GREEN}[{job_id}] PID {proc.pid}: {status}{RESET}")
     def killJob(self, job_id):
         proc = self.jobs.get(job_id)
@@ -1065,34 +4924,321 @@ class Shell:
             return
         proc.terminate()
         print(f"{GREEN}Terminated job {job_id} (PID {proc.pid}){RESET}")
-    def calculator(self):
+    def calculator(self, args=()):
+        # Options:
+        #   calc                              -> interactive
+        #   calc <expr>                       -> evaluate one expression
+        #   calc --file <path> [> out | >> out] -> one expression per line, results in order
+        #   calc - [> out | >> out]           -> same, reading stdin
+        args = list(args)
+        if args and (args[0] in ("--file", "-f") or args[0] == "-"):
+            out_path, append = None, False
+            for op in (">>", ">"):
+                if op in args:
+                    i = args.index(op)
+                    if i + 1 >= len(args):
+                        args = []
+                        break
+                    out_path, append = args[i + 1], op == ">>"
+                    del args[i:i + 2]
+                    break
+            if args == ["-"] or (len(args) == 2 and args[0] != "-"):
+                self.calc_batch(args[-1], out_path, append)
+            else:
+                print(f"{YELLOW}Usage: calc --file <path> | calc - [> out | >> out]{RESET}")
+            return
+        if args:
+            try:
+                print(f"{YELLOW}{_SafeEval.eval(' '.join(args))}{RESET}")
+            except Exception as e:
+                print(f"{RED}Error: {e}{RESET}")
+            return
         print(f"{CYAN}Simple Calculator. Type ':wq' to quit.{RESET}")
         while True:
             expr = input(f"{BOLD}{GREEN}calc> {RESET}")
             if expr.lower() == ":wq":
                 break
             try:
-                print(f"{YELLOW}{eval(expr, {'__builtins__': {}}, {})}{RESET}")
+                print(f"{YELLOW}{_SafeEval.eval(expr)}{RESET}")
             except Exception as e:
                 print(f"{RED}Error: {e}{RESET}")
+
+    def calc_batch(self, source, out_path=None, append=False):
+        """Stream a file ('-' for stdin) of expressions through calculate_lines, one result per line."""
+        if source == "-":
+            lines = sys.stdin
+        else:
+            try:
+                lines = open(os.path.join(self.current_dir, source), "r", encoding="utf-8")
+            except OSError as e:
+                print(f"{RED}Cannot open '{source}': {e}{RESET}")
+                return
+        if out_path is not None:
+            try:
+                stream = open(os.path.join(self.current_dir, out_path), "a" if append else "w", encoding="utf-8")
+            except OSError as e:
+                print(f"{RED}Cannot open '{out_path}': {e}{RESET}")
+                if lines is not sys.stdin:
+                    lines.close()
+                return
+            output = LumenOutput(stream, buffer_size=1 << 20, flush_interval=1.0, close_stream=True)
+        else:
+            output = LumenOutput()
+        count = errors = 0
+        start = time.perf_counter()
+        write = output.write
+        try:
+            for result in calculate_lines(lines):
+                write(result)
+                count += 1
+                if result.__class__ is str and result.startswith("Error: "):
+                    errors += 1
+        finally:
+            output.close()
+            if lines is not sys.stdin:
+                lines.close()
+        if out_path is not None:
+            elapsed = time.perf_counter() - start
+            rate = f", {count / elapsed:,.0f}/s" if elapsed > 0 else ""
+            print(f"{GREEN}Evaluated {count} expression(s), {errors} error(s) in {elapsed:.2f}s{rate} -> {out_path}{RESET}")
     def setExt(self, ext):
         if not ext.startswith("."):
             ext = "." + ext
         self.DEFAULT_EXT = ext
         print(f"{GREEN}Default file extension set to '{self.DEFAULT_EXT}'{RESET}")
 
-    def lumen_run(self, filename):
+    def lumen_command(self, args):
+        # Options:
+        #   lumen                          -> REPL
+        #   lumen run [--compile] <file> [> out | >> out] -> run file (optionally through the Python backend);
+        #                                     '-' reads stdin, '>'/'>>' send print output to a file;
+        #                                     -O0 / --no-fold / --no-print-fold / --no-hoist turn optimizations off;
+        #                                     --max-depth=N sets the Lumen call-depth limit (default 10000)
+        #   lumen run-all <glob> [-j N] [--prefix] -> run many scripts across N worker processes (default: one
+        #                                     per core); output in order, or as each finishes with --prefix
+        #   lumen conform [pattern]        -> check interpreter and compiled backend agree
+        #   lumen cache clear|stats        -> inspect or invalidate the compiled-program cache
+        #   lumen profile <file> [--json <out>] -> run file and report the hottest lines, functions and cycles
+        if not args:
+            self.lumen_repl()
+        elif args[0] == "run" and len(args) >= 2:
+            rest = list(args[1:])
+            out_path, append = None, False
+            for op in (">>", ">"):
+                if op in rest:
+                    i = rest.index(op)
+                    if i + 1 >= len(rest):
+                        print(f"{YELLOW}Usage: lumen run [--compile] <file> [> out | >> out]{RESET}")
+                        return
+                    out_path, append = rest[i + 1], op == ">>"
+                    del rest[i:i + 2]
+                    break
+            max_depth = None
+            for a in rest:
+                if a.startswith("--max-depth="):
+                    value = a.split("=", 1)[1]
+                    if not value.isdigit() or int(value) < 1:
+                        print(f"{YELLOW}--max-depth needs a positive number of calls{RESET}")
+                        return
+                    max_depth = int(value)
+                    rest.remove(a)
+                    break
+            flags = {a for a in rest if a.startswith("-") and a != "-"}
+            files = [a for a in rest if a not in flags]
+            unknown = flags - {"--compile", "-O0", "--no-fold", "--no-print-fold", "--no-hoist"}
+            if files and not unknown:
+                optimizer = None
+                if "-O0" not in flags:
+                    optimizer = LumenOptimizer(fold_constants="--no-fold" not in flags,
+                                               fold_print="--no-print-fold" not in flags,
+                                               hoist_invariants="--no-hoist" not in flags)
+                self.lumen_run(files[0], compiled="--compile" in flags, out_path=out_path, append=append,
+                               optimizer=optimizer, max_depth=max_depth)
+            else:
+                print(f"{YELLOW}Usage: lumen run [--compile] [-O0 | --no-fold --no-print-fold --no-hoist] "
+                      f"[--max-depth=N] <file> [> out | >> out]{RESET}")
+        elif args[0] == "run-all" and len(args) >= 2:
+            rest = list(args[1:])
+            jobs = None
+            if "-j" in rest:
+                i = rest.index("-j")
+                if i + 1 >= len(rest) or not rest[i + 1].isdigit() or int(rest[i + 1]) < 1:
+                    print(f"{YELLOW}Usage: lumen run-all <glob> [-j N] [--prefix] [--compile] [-O0]{RESET}")
+                    return
+                jobs = int(rest[i + 1])
+                del rest[i:i + 2]
+            flags = {a for a in rest if a.startswith("-")}
+            patterns = [a for a in rest if a not in flags]
+            if patterns and not flags - {"--prefix", "--compile", "-O0"}:
+                self.lumen_run_all(patterns, jobs, prefix="--prefix" in flags, compiled="--compile" in flags,
+                                   optimizer=None if "-O0" in flags else LumenOptimizer())
+            else:
+                print(f"{YELLOW}Usage: lumen run-all <glob> [-j N] [--prefix] [--compile] [-O0]{RESET}")
+        elif args[0] == "conform":
+            self.lumen_conform(args[1] if len(args) > 1 else None)
+        elif args[0] == "cache" and len(args) == 2 and args[1] in ("clear", "stats"):
+            self.lumen_cache_command(args[1])
+        elif args[0] == "profile" and len(args) in (2, 4) and (len(args) == 2 or args[2] == "--json"):
+            self.lumen_profile(args[1], args[3] if len(args) == 4 else None)
+        else:
+            print(f"{YELLOW}Usage: lumen [run [--compile] <file> | run-all <glob> [-j N] | conform [pattern] | cache clear|stats | profile <file> [--json <out>]]{RESET}")
+
+    def lumen_run(self, filename, compiled=False, out_path=None, append=False, optimizer=None, max_depth=None):
+        if filename == "-":
+            # read the program from stdin, e.g. `generate | python app.py` with `lumen run -`
+            path = "-"
+        else:
+            if not filename.endswith(".lum"):
+                filename += ".lum"
+            path = os.path.join(self.current_dir, filename)
+            if not os.path.exists(path):
+                print(f"{RED}File '{filename}' does not exist.{RESET}")
+                return
+        output = None
+        if out_path is not None:
+            try:
+                stream = open(os.path.join(self.current_dir, out_path), "a" if append else "w", encoding="utf-8")
+            except OSError as e:
+                print(f"{RED}Cannot open '{out_path}': {e}{RESET}")
+                return
+            # writing to a file: no terminal to keep responsive, so buffer in bigger chunks
+            output = LumenOutput(stream, buffer_size=1 << 20, flush_interval=1.0, close_stream=True)
+        interpreter = LumenInterpreter(cache=self.lumen_cache, output=output, optimizer=optimizer, max_depth=max_depth)
+        try:
+            interpreter.run_file(path, type_check=True, compiled=compiled)  # <- type_check flag added
+        except Exception as e:
+            print(f"{RED}Lumen Error: {e}{RESET}")
+        finally:
+            interpreter.output.close()
+
+    def lumen_run_all(self, patterns, jobs=None, prefix=False, compiled=False, optimizer=None):
+        """Run every script matching the globs, each in a fresh interpreter in a worker process.
+
+        Output is printed script by script in the order the globs list them,
+        or, with prefix, as each script finishes with every line tagged with
+        its name. Ends with the failures and the wall time.
+        """
+        names = {}
+        paths = []
+        for pattern in patterns:
+            for p in sorted(glob.glob(os.path.join(self.current_dir, pattern), recursive=True)):
+                if os.path.isfile(p) and p not in names:
+                    names[p] = os.path.relpath(p, self.current_dir)
+                    paths.append(p)
+        if not paths:
+            print(f"{YELLOW}No Lumen files match {' '.join(patterns)}.{RESET}")
+            return
+        jobs = min(jobs or os.cpu_count() or 1, len(paths))
+        failures = []
+        total_script_time = 0.0
+
+        def report(path, result):
+            nonlocal total_script_time
+            output, error, seconds = result
+            total_script_time += seconds
+            name = names[path]
+            if prefix:
+                for line in output.splitlines():
+                    print(f"{CYAN}[{name}]{RESET} {line}")
+            elif output:
+                print(output, end="" if output.endswith("\n") else "\n")
+            if error is None:
+                print(f"{GREEN}ok   {name} ({seconds * 1000:.1f} ms){RESET}")
+            else:
+                failures.append((name, error))
+                print(f"{RED}FAIL {name} ({seconds * 1000:.1f} ms): {error}{RESET}")
+
+        start = time.perf_counter()
+        # a pool even for -j 1, so no script can block on the keyboard or take the shell down with it
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=_lumen_worker_init)
+        try:
+            futures = {pool.submit(run_lumen_job, path, compiled, self.lumen_cache, optimizer): path for path in paths}
+            # in glob order by default; as they finish when every line says where it came from
+            order = concurrent.futures.as_completed(futures) if prefix else futures
+            for future in order:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # the worker itself died (out of memory, killed, ...)
+                    result = ("", f"worker failed: {e}", 0.0)
+                report(futures[future], result)
+        except KeyboardInterrupt:
+            print(f"{YELLOW}Interrupted, cancelling the remaining scripts.{RESET}")
+            pool.shutdown(wait=False, cancel_futures=True)
+            return
+        pool.shutdown()
+        elapsed = time.perf_counter() - start
+
+        colour = GREEN if not failures else RED
+        print(f"{colour}{len(paths) - len(failures)}/{len(paths)} scripts passed in {elapsed:.2f} s wall "
+              f"({total_script_time:.2f} s of script time, {jobs} worker{'s' if jobs != 1 else ''}){RESET}")
+        for name, error in failures:
+            print(f"  {RED}{name}{RESET}: {error}")
+
+    def lumen_profile(self, filename, json_out=None):
         if not filename.endswith(".lum"):
             filename += ".lum"
         path = os.path.join(self.current_dir, filename)
         if not os.path.exists(path):
             print(f"{RED}File '{filename}' does not exist.{RESET}")
             return
-        interpreter = LumenInterpreter()
+        interpreter = LumenInterpreter(cache=self.lumen_cache)
+        interpreter.enable_profiling()
+        start = time.perf_counter()
         try:
-            interpreter.run_file(path, type_check=True)  # <- type_check flag added
+            interpreter.run_file(path)
         except Exception as e:
             print(f"{RED}Lumen Error: {e}{RESET}")
+        finally:
+            elapsed = time.perf_counter() - start
+            profiler = interpreter.disable_profiling()
+            with open(path, "r", encoding="utf-8") as f:
+                source_lines = f.read().splitlines()
+            print(f"{CYAN}Profile of {filename} ({elapsed * 1000:.2f} ms wall):{RESET}")
+            print(profiler.report(source_lines))
+            if json_out:
+                data = profiler.to_json()
+                data["file"] = path
+                data["wall"] = elapsed
+                with open(os.path.join(self.current_dir, json_out), "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2)
+                print(f"{GREEN}Wrote profile to {json_out}{RESET}")
+
+    def lumen_cache_command(self, action):
+        if action == "clear":
+            removed = self.lumen_cache.clear()
+            print(f"{GREEN}Removed {removed} cached Lumen program(s) from {self.lumen_cache.directory}{RESET}")
+            return
+        stats = self.lumen_cache.stats()
+        print(f"{CYAN}Lumen cache: {stats['directory']}{RESET}")
+        print(f"  entries:  {stats['entries']} ({stats['bytes']} bytes)")
+        print(f"  compiled: {stats['compiled']}")
+        print(f"  stale:    {stats['stale']}")
+        for path, size, has_code, stale in stats["files"]:
+            flags = ("compiled" if has_code else "parsed") + (", stale" if stale else "")
+            print(f"  {WHITE}{path}{RESET} ({size} bytes, {flags})")
+
+    def lumen_conform(self, pattern=None):
+        """Run scripts through both Lumen backends and report any differences.
+           Defaults to the bundled examples/*.lum."""
+        if pattern is None:
+            pattern = os.path.join(os.path.dirname(os.path.abspath(__file__)), "examples", "*.lum")
+        else:
+            pattern = os.path.join(self.current_dir, pattern)
+        paths = sorted(glob.glob(pattern))
+        if not paths:
+            print(f"{YELLOW}No Lumen files match '{pattern}'.{RESET}")
+            return
+        failures = 0
+        for path in paths:
+            ok, detail = check_conformance(path)
+            if ok:
+                print(f"{GREEN}ok   {os.path.basename(path)}{RESET}")
+            else:
+                failures += 1
+                print(f"{RED}FAIL {os.path.basename(path)}: {detail}{RESET}")
+        colour = GREEN if not failures else RED
+        print(f"{colour}{len(paths) - failures}/{len(paths)} scripts conform{RESET}")
 
     def makeLumen(self, *names):
         for filename in names:
@@ -1115,7 +5261,7 @@ class Shell:
             print(f"{GREEN}Saved {filename}{RESET}")
 
     def lumen_repl(self):
-        interpreter = LumenInterpreter()
+        interpreter = LumenInterpreter(cache=self.lumen_cache)
         lum_files = [f for f in os.listdir(self.current_dir) if f.endswith(".lum")]
         if lum_files:
             print(f"{CYAN}Available Lumen files:{RESET}")
@@ -1130,14 +5276,44 @@ class Shell:
                 except Exception as e:
                     print(f"{RED}Lumen Error: {e}{RESET}")
 
+        # statements are run as soon as they're complete, against the one
+        # interpreter, so variables, functions and compiled expressions
+        # all carry over. buffer keeps what ran, for :save
         buffer = []
+        pending = []
         while True:
-            line = input(f"{BOLD}{BLUE}lumen>{RESET} ").strip()
-            if not line or line in (":wq", ":quit", "exit"):
+            prompt = f"{BOLD}{BLUE}lumen>{RESET} " if not pending else f"{BOLD}{BLUE}  ...>{RESET} "
+            try:
+                line = input(prompt).rstrip()
+            except EOFError:
+                print()
+                break
+            except KeyboardInterrupt:
+                print()
+                pending = []
+                continue
+            stripped = line.strip()
+
+            if pending:
+                source = "\n".join(pending)
+                if lumen_input_state(source) != "if" or stripped.startswith("else"):
+                    pending.append(line)
+                    source = "\n".join(pending)
+                    if lumen_input_state(source) == "":
+                        self.lumen_repl_exec(interpreter, source, buffer)
+                        pending = []
+                    continue
+                # no else coming, run the if and handle this line on its own
+                self.lumen_repl_exec(interpreter, source, buffer)
+                pending = []
+                if not stripped:
+                    continue
+
+            if not stripped or stripped in (":wq", ":quit", "exit"):
                 break
 
-            if line.startswith(":save "):
-                fname = line.split(maxsplit=1)[1].strip()
+            if stripped.startswith(":save "):
+                fname = stripped.split(maxsplit=1)[1].strip()
                 if not fname.endswith(".lum"):
                     fname += ".lum"
                 with open(os.path.join(self.current_dir, fname), "w", encoding="utf-8") as f:
@@ -1145,8 +5321,8 @@ class Shell:
                 print(f"{GREEN}Saved session to {fname}{RESET}")
                 continue
 
-            if line.startswith(":run "):
-                fname = line.split(maxsplit=1)[1].strip()
+            if stripped.startswith(":run "):
+                fname = stripped.split(maxsplit=1)[1].strip()
                 if not fname.endswith(".lum"):
                     fname += ".lum"
                 path = os.path.join(self.current_dir, fname)
@@ -1156,14 +5332,50 @@ class Shell:
                     print(f"{RED}Lumen Error: {e}{RESET}")
                 continue
 
-            # store input in session buffer
-            buffer.append(line)
-            # statements = [stmt.strip() for stmt in line.split(";") if stmt.strip()]
-            # for stmt in statements:
-            #     try:
-            #         interpreter.exec_line(stmt)
-            #     except Exception as e:
-            #         print(f"{RED}Lumen Error: {e}{RESET}") C++ or hell, even Holy C would've been better suited for this
+            if stripped.startswith((":time ", ":timeit ")):
+                self.lumen_repl_time(interpreter, stripped, buffer)
+                continue
+
+            pending = [line]
+            if lumen_input_state(line) == "":
+                self.lumen_repl_exec(interpreter, line, buffer)
+                pending = []
+
+    def lumen_repl_exec(self, interpreter, source, buffer):
+        try:
+            interpreter.exec_line(source)
+        except Exception as e:
+            print(f"{RED}Lumen Error: {e}{RESET}")
+            return
+        buffer.append(source)
+
+    def lumen_repl_time(self, interpreter, line, buffer):
+        """:time <stmt> runs it once; :timeit <stmt> N runs it N times with its output discarded.
+
+        Only a :time run goes into the session buffer.
+        """
+        command, stmt = line.split(maxsplit=1)
+        number = 1
+        if command == ":timeit":
+            number = 1000
+            head, _, count = stmt.rpartition(" ")
+            if head.strip() and count.isdigit():
+                stmt, number = head.strip(), max(1, int(count))
+        try:
+            if command == ":timeit":
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    parse_time, run_time = interpreter.time_source(stmt, number)
+            else:
+                parse_time, run_time = interpreter.time_source(stmt)
+        except Exception as e:
+            print(f"{RED}Lumen Error: {e}{RESET}")
+            return
+        if command == ":time":
+            buffer.append(stmt)
+            print(f"{CYAN}parse {parse_time * 1000:.3f} ms, run {run_time * 1000:.3f} ms{RESET}")
+        else:
+            print(f"{CYAN}{number} loops: {run_time * 1000:.3f} ms total, "
+                  f"{run_time / number * 1e6:.3f} us per loop (parsed once in {parse_time * 1000:.3f} ms){RESET}")
 
     def showHelp(self, cmd_name=None):
         if cmd_name:
@@ -1214,7 +5426,7 @@ class Shell:
                 case "quit":
                     break
                 case "list":
-                    self.listDir()
+                    self.listDir(*parts[1:])
                 case "here":
                     print(f"{CYAN}{self.current_dir}{RESET}")
                 case "goto":
@@ -1235,12 +5447,7 @@ class Shell:
                             print(f"{RED}Usage: make dir/d <name>, make file/f/fi <name>, make lumen/lum <name>{RESET}")
 
                 case "lumen":
-                    if len(parts) == 1:
-                        self.lumen_repl()
-                    elif len(parts) >= 3 and parts[1] == "run":
-                        self.lumen_run(parts[2])
-                    else:
-                        print(f"{YELLOW}Usage: lumen [run <file>]{RESET}")
+                    self.lumen_command(parts[1:])
                 case "open":
                     if len(parts) >= 3 and parts[1] == "file":
                         self.openFile(parts[2])
@@ -1257,7 +5464,7 @@ class Shell:
                         self.fileInfo(parts[1])
                 case "search":
                     if self.check_args(parts, 2):
-                        self.searchFiles(parts[1])
+                        self.searchFiles(*parts[1:])
                 # case "set":
                 #     if self.check_args(parts, 3):
                 #         self.setEnv(parts[1], parts[2])
@@ -1280,17 +5487,17 @@ class Shell:
                     if self.check_args(parts, 2):
                         self.killJob(parts[1])
                 case "calc":
-                    self.calculator()
+                    self.calculator(parts[1:])
                 case "history":
                     for i, h in enumerate(self.command_history, 1):
                         print(f"{WHITE}{i}: {h}{RESET}")
                 case "move":
                     if self.check_args(parts, 4):
-                        self.move(parts[1], parts[2], parts[3])
+                        self.move(*parts[1:])
 
                 case "copy":
-                    if self.check_args(parts, 3):
-                        self.copy(parts[1], parts[2], parts[3])
+                    if self.check_args(parts, 4):
+                        self.copy(*parts[1:])
                 case "delete":
                     if self.check_args(parts, 2):
                         item_type = parts[1]
@@ -1308,16 +5515,6 @@ class Shell:
                         self.showHelp()
                     else:
                         self.showHelp(" ".join(parts[1:]))
-                case "lumen":
-                    # Options:
-                    #   lumen               -> REPL
-                    #   lumen run <file>    -> run file
-                    if len(parts) == 1:
-                        self.lumen_repl()
-                    elif len(parts) >= 3 and parts[1] == "run":
-                        self.lumen_run(parts[2])
-                    else:
-                        print(f"{YELLOW}Usage: lumen [run <file>]{RESET}")
                 case "call":
                     if len(parts) >= 2 and parts[1] == "therapist":
                         therapist = Therapist()
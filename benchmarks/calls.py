@@ -0,0 +1,96 @@
+"""Benchmark: Lumen function-call overhead.
+
+Runs fib-style recursion and a tight loop of calls through the interpreter
+and reports calls per second (best of three runs), plus a loop running
+inside one function body, where every variable lives in a slot frame, and
+recursion deep enough that it runs on the stack machine.
+
+    python benchmarks/calls.py [fib_n] [loop_calls] [body_iterations] [depth]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import LumenInterpreter, parse_lumen  # noqa: E402
+
+# Lumen functions have no return value; this just makes the same calls a
+# recursive fib would
+FIB = """
+func fib(int n) {
+    if (n > 1) {
+        fib(n - 1)
+        fib(n - 2)
+    }
+}
+fib({n})
+"""
+
+LOOP = """
+func touch(int a, int b) {
+    int c = a + b
+}
+int i = 0
+cycle (i < {n}) {
+    touch(i, 1)
+    i++
+}
+"""
+
+BODY = """
+func work(int n) {
+    int i = 0
+    int total = 0
+    cycle (i < n) {
+        total = total + i * 2
+        if (total > 1000000) {
+            total = total - 1000000
+        }
+        i++
+    }
+}
+work({n})
+"""
+
+DEEP = """
+func down(int n) {
+    if (n > 0) {
+        down(n - 1)
+    }
+}
+down({n})
+"""
+
+
+def fib_calls(n):
+    a, b = 1, 1
+    for _ in range(n - 1):
+        a, b = b, a + b + 1
+    return b
+
+
+def bench(label, source, calls, repeat=3, unit="calls"):
+    nodes = parse_lumen(source)
+    elapsed = float("inf")
+    for _ in range(repeat):
+        interp = LumenInterpreter()
+        start = time.perf_counter()
+        interp.execute(nodes)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    print(f"{label:<22}{calls:>10} {unit} {elapsed:>8.2f}s {calls / elapsed:>12,.0f} {unit}/s")
+
+
+def main():
+    fib_n = int(sys.argv[1]) if len(sys.argv) > 1 else 22
+    loop_n = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    body_n = int(sys.argv[3]) if len(sys.argv) > 3 else 500000
+    depth = int(sys.argv[4]) if len(sys.argv) > 4 else 5000
+    bench(f"fib({fib_n}) recursion", FIB.replace("{n}", str(fib_n)), fib_calls(fib_n))
+    bench("call loop", LOOP.replace("{n}", str(loop_n)), loop_n)
+    bench("loop in function", BODY.replace("{n}", str(body_n)), body_n, unit="iters")
+    bench(f"recursion {depth} deep", DEEP.replace("{n}", str(depth)), depth + 1)
+
+
+if __name__ == "__main__":
+    main()
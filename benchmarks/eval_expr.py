@@ -0,0 +1,58 @@
+"""Micro-benchmark: per-call cost of LumenInterpreter.eval_expr.
+
+Compares the old strategy (copy globals, merge locals, add helpers, eval the
+raw string) with the cached code objects evaluated against the live scopes.
+
+    python benchmarks/eval_expr.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import LumenInterpreter  # noqa: E402
+
+
+def legacy_eval_expr(interp, expr):
+    expr = expr.strip()
+    env = dict(interp.globals)
+    if interp.scope_stack:
+        env.update(interp.current_locals())
+    for k, v in (("str", str), ("int", int), ("float", float), ("bool", bool), ("len", len)):
+        if k not in env:
+            env[k] = v
+    return eval(expr, {}, env)
+
+
+def make_interpreter(n_globals):
+    interp = LumenInterpreter()
+    for i in range(n_globals):
+        interp.globals[f"v{i}"] = i
+    interp.globals["i"] = 7
+    interp.globals["limit"] = 100000
+    return interp
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    cases = [
+        ("i < limit", 10),
+        ("i * 2 + 1", 10),
+        ("i < limit", 200),
+    ]
+    print(f"{'expression':<16}{'globals':>8}{'legacy ns':>12}{'cached ns':>12}{'speedup':>9}")
+    for expr, n_globals in cases:
+        for in_func in (False, True):
+            interp = make_interpreter(n_globals)
+            if in_func:
+                interp.push_scope({"i": 3, "x": 1.5})
+            legacy = timeit.timeit(lambda: legacy_eval_expr(interp, expr), number=number)
+            cached = timeit.timeit(lambda: interp.eval_expr(expr), number=number)
+            label = expr + (" (fn)" if in_func else "")
+            print(f"{label:<16}{n_globals:>8}{legacy / number * 1e9:>12.0f}"
+                  f"{cached / number * 1e9:>12.0f}{legacy / cached:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Lumen interpreter benchmark suite.
+
+Runs every workload in benchmarks/workloads/ through LumenInterpreter.run_file
+and reports ops/sec (Lumen statements executed per second, best of --repeat
+runs) and peak memory allocated during a run (tracemalloc). Results are
+compared with a stored baseline; any workload slower or hungrier than the
+baseline by more than --threshold counts as a regression and makes the
+script exit with status 1.
+
+    python benchmarks/run.py                     # compare with baseline.json
+    python benchmarks/run.py --update-baseline   # record new numbers
+    python benchmarks/run.py --compile --baseline baseline_compiled.json
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from app import LumenInterpreter, LumenProfiler  # noqa: E402
+
+
+def count_ops(path):
+    """Number of Lumen statements one run of the workload executes."""
+    interp = LumenInterpreter()
+    profiler = LumenProfiler().attach(interp)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        interp.run_file(path)
+    profiler.detach(interp)
+    return sum(count for count, _, _ in profiler.lines.values())
+
+
+def run_once(path, compiled):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        LumenInterpreter().run_file(path, compiled=compiled)
+        return time.perf_counter() - start
+
+
+def peak_memory(path, compiled):
+    tracemalloc.start()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            LumenInterpreter().run_file(path, compiled=compiled)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def measure(path, repeat, compiled):
+    ops = count_ops(path)
+    best = min(run_once(path, compiled) for _ in range(repeat))
+    return {"ops": ops, "seconds": best, "ops_per_sec": ops / best, "peak_bytes": peak_memory(path, compiled)}
+
+
+def compare(name, result, base, threshold):
+    """Return a list of regression messages for one workload."""
+    problems = []
+    if result["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+        drop = 1 - result["ops_per_sec"] / base["ops_per_sec"]
+        problems.append(f"{name}: ops/sec down {drop:.0%} ({base['ops_per_sec']:,.0f} -> {result['ops_per_sec']:,.0f})")
+    if result["peak_bytes"] > base["peak_bytes"] * (1 + threshold):
+        growth = result["peak_bytes"] / base["peak_bytes"] - 1
+        problems.append(f"{name}: peak memory up {growth:.0%} ({base['peak_bytes']:,} -> {result['peak_bytes']:,} bytes)")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pattern", nargs="?", default="*.lum", help="workload glob inside benchmarks/workloads")
+    parser.add_argument("--baseline", default=os.path.join(HERE, "baseline.json"))
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed regression as a fraction (default 0.15)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--compile", action="store_true", help="run through the compiled Python backend")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(HERE, "workloads", args.pattern)))
+    if not paths:
+        print(f"No workloads match {args.pattern}")
+        return 2
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    problems = []
+    print(f"{'workload':<18}{'ops':>10}{'ops/sec':>14}{'peak KiB':>11}{'vs base':>9}")
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        result = results[name] = measure(path, args.repeat, args.compile)
+        base = baseline.get(name)
+        delta = f"{result['ops_per_sec'] / base['ops_per_sec'] - 1:+.0%}" if base else "new"
+        print(f"{name:<18}{result['ops']:>10,}{result['ops_per_sec']:>14,.0f}"
+              f"{result['peak_bytes'] / 1024:>11,.0f}{delta:>9}")
+        if base and not args.update_baseline:
+            problems.extend(compare(name, result, base, args.threshold))
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if problems:
+        print(f"\n{len(problems)} regression(s) beyond {args.threshold:.0%}:")
+        for p in problems:
+            print(f"  {p}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
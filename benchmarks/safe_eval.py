@@ -0,0 +1,64 @@
+"""Benchmark: throughput of the safe evaluator behind calculator()/eval_condition().
+
+Evaluates a set of repeated expressions (compiled once, then served from
+the compile_safe LRU) and a stream of unique expressions (every one a
+cache miss), and compares both with compiling on every call, which is
+what each evaluation used to cost. Reports expressions per second.
+
+    python benchmarks/safe_eval.py [evaluations]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import _SafeEval, compile_safe  # noqa: E402
+
+REPEATED = [
+    "1 + 2 * 3",
+    "(17 - 4) / 3 + 2 ** 5",
+    "x * 1.0825 + 4.99",
+    "max(x, 10) - min(x, 3) % 7",
+    "x > 10 and x < 100",
+    "x !& 0",
+    "round(x / 3, 2)",
+    "-(x - 1) * (x + 1) >= 0",
+]
+
+
+def unique_expressions(n, seed=1234):
+    rng = random.Random(seed)
+    return [f"{rng.randint(1, 10**6)} * x + {rng.randint(1, 999)} / {rng.randint(1, 99)}" for _ in range(n)]
+
+
+def run(label, exprs, evaluate):
+    names = {"x": 42}
+    start = time.perf_counter()
+    for expr in exprs:
+        evaluate(expr, names)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28}{len(exprs):>10,} {elapsed:>8.3f}s {len(exprs) / elapsed:>14,.0f} expr/s")
+
+
+def uncached(expr, names):
+    return _SafeEval.compile(expr)(names)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repeated = [REPEATED[i % len(REPEATED)] for i in range(n)]
+    unique = unique_expressions(n // 4)
+    print(f"{'case':<28}{'exprs':>10} {'time':>9} {'throughput':>14}")
+    compile_safe.cache_clear()
+    run("repeated (LRU)", repeated, _SafeEval.eval)
+    run("repeated, compiled per call", repeated, uncached)
+    compile_safe.cache_clear()
+    run("unique (all misses)", unique, _SafeEval.eval)
+    run("unique, compiled per call", unique, uncached)
+    print(compile_safe.cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import pytest
+
+from app import LumenArray, LumenInterpreter, lumen_array
+
+
+def run(source, capsys):
+    interp = LumenInterpreter()
+    interp.execute(interp.parse(source))
+    interp.output.flush()
+    return capsys.readouterr().out.split("\n")[:-1]
+
+
+def test_elementwise_operations():
+    a = lumen_array([1, 2, 3])
+    assert (a + 1).tolist() == [2, 3, 4]
+    assert (a * a).tolist() == [1, 4, 9]
+    assert (10 - a).tolist() == [9, 8, 7]
+    assert (a / 2).typecode == "d"
+    with pytest.raises(ValueError, match="array lengths differ"):
+        a + lumen_array([1, 2])
+
+
+def test_declaration_converts_values():
+    assert lumen_array(range(3)).tolist() == [0, 1, 2]
+    assert lumen_array([1.5, 2]).typecode == "d"
+    assert isinstance(lumen_array((1, 2)), LumenArray)
+    with pytest.raises(Exception, match="got a string"):
+        lumen_array("12")
+
+
+def test_print_concatenates_arrays_with_text(capsys):
+    assert run('array a = [1, 2]\nprint "a = " + a\nprint a + " items"\n', capsys) == ["a = [1, 2]", "[1, 2] items"]
+
+
+@pytest.mark.parametrize("source", [
+    "array a = [1, 2]\narray b = [1, 2, 3]\nprint a + b\n",
+    "func f(int n) {\n    array a = [1, 2]\n    array b = [1, 2, 3]\n    print a + b\n}\nf(1)\n",
+])
+def test_print_reports_array_arithmetic_errors(source, capsys):
+    with pytest.raises(Exception, match=r"Error evaluating 'a \+ b': array lengths differ \(2 and 3\)"):
+        run(source, capsys)
+    assert capsys.readouterr().out == ""
+
+
+def test_index_errors(capsys):
+    with pytest.raises(Exception, match="array index out of range"):
+        run("array a = [1, 2]\nprint a[5]\n", capsys)
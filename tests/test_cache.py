@@ -0,0 +1,105 @@
+import os
+import pickle
+
+from app import LumenCache, LumenInterpreter, LumenOptimizer
+
+SOURCE = b"int x = 2\nprint x * 3\n"
+
+
+def cached_file(tmp_path, data=SOURCE):
+    path = tmp_path / "prog.lum"
+    path.write_bytes(data)
+    cache = LumenCache(str(tmp_path / "cache"))
+    interp = LumenInterpreter(cache=cache)
+    interp.load_file(str(path))
+    return cache, str(path)
+
+
+def test_unchanged_file_is_a_hit(tmp_path):
+    cache, path = cached_file(tmp_path)
+    entry = cache.get(path)
+    assert entry is not None
+    assert LumenInterpreter(cache=cache).load_file(path)[0] is not None
+
+
+def test_tag_mismatch_is_a_miss(tmp_path):
+    cache, path = cached_file(tmp_path)
+    # an entry written by another cache version, node layout or Python
+    entry_path = cache.entry_path(path)
+    with open(entry_path, "rb") as f:
+        entry = pickle.load(f)
+    entry["tag"] = (LumenCache.VERSION - 1,) + entry["tag"][1:]
+    with open(entry_path, "wb") as f:
+        pickle.dump(entry, f)
+    assert cache.get(path) is None
+    assert cache.stats()["stale"] == 1
+
+
+def test_layout_is_part_of_the_tag(tmp_path):
+    cache, path = cached_file(tmp_path)
+    other = LumenCache(cache.directory)
+    other.tag = (LumenCache.VERSION, "something else", other.tag[2])
+    assert other.get(path) is None
+
+
+def test_optimizer_options_must_match(tmp_path):
+    path = tmp_path / "prog.lum"
+    path.write_bytes(SOURCE)
+    cache = LumenCache(str(tmp_path / "cache"))
+    LumenInterpreter(cache=cache, optimizer=LumenOptimizer()).load_file(str(path))
+    assert cache.get(str(path), LumenOptimizer().key) is not None
+    assert cache.get(str(path)) is None
+    assert cache.get(str(path), LumenOptimizer(hoist_invariants=False).key) is None
+
+
+def test_touched_but_unchanged_file_is_a_hit(tmp_path):
+    cache, path = cached_file(tmp_path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    entry = cache.get(path)
+    assert entry is not None
+    # the new mtime is recorded, so the next lookup doesn't hash again
+    assert entry["mtime_ns"] == os.stat(path).st_mtime_ns
+    assert cache.read_entry(cache.entry_path(path))["mtime_ns"] == entry["mtime_ns"]
+
+
+def test_changed_content_is_a_miss(tmp_path):
+    cache, path = cached_file(tmp_path)
+    st = os.stat(path)
+    with open(path, "wb") as f:
+        f.write(SOURCE.replace(b"3", b"4"))
+    # same size and mtime would pass the quick check, so only change one
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    assert cache.get(path) is None
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache, path = cached_file(tmp_path)
+    with open(cache.entry_path(path), "wb") as f:
+        f.write(b"not a pickle")
+    assert cache.get(path) is None
+    assert cache.read_entry(cache.entry_path(path)) is None
+
+
+def test_compiled_code_is_added_to_an_existing_entry(tmp_path):
+    cache, path = cached_file(tmp_path)
+    assert cache.get(path)["code"] is None
+    nodes, code = LumenInterpreter(cache=cache).load_file(path, compiled=True)
+    assert code is not None
+    assert cache.get(path)["code"] is not None
+    assert cache.stats()["compiled"] == 1
+
+
+def test_program_that_cannot_compile_is_remembered(tmp_path):
+    path = tmp_path / "prog.lum"
+    path.write_bytes(b"func f(int a) {\n    yield\n}\nspawn f(1)\n")
+    cache = LumenCache(str(tmp_path / "cache"))
+    _, code = LumenInterpreter(cache=cache).load_file(str(path), compiled=True)
+    assert code is None
+    assert cache.get(str(path))["compile_failed"]
+
+
+def test_clear(tmp_path):
+    cache, _ = cached_file(tmp_path)
+    assert cache.clear() == 1
+    assert cache.entries() == []
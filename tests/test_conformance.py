@@ -0,0 +1,89 @@
+"""Every execution path (interpreter, optimized, compiled) must agree on output and errors."""
+import glob
+import os
+
+import pytest
+
+from app import LumenInterpreter, check_conformance
+
+EXAMPLES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "*.lum")))
+
+# name -> (source, the error every path must end with)
+ERROR_CASES = {
+    "div": ("int x = 1 / 0\n", "Lumen Error: Error evaluating '1 / 0': division by zero"),
+    "assign": ("int x = 1\nx = x / 0\n", "Lumen Error: Error evaluating 'x / 0': division by zero"),
+    "type": ('int x = "a" + 1\n', "Lumen Error: Error evaluating '\"a\" + 1': can only concatenate str (not \"int\") to str"),
+    "name": ("int x = y + 1\n", "name 'y' is not defined"),
+    "if": ("if (1 / 0) {\n    print 1\n}\n", "Lumen Error: Error evaluating '1 / 0': division by zero"),
+    "cycle": ("int i = 0\ncycle (i < 10) {\n    i++\n    int z = 10 / (i - 5)\n}\n",
+              "Lumen Error: Error evaluating '10 / (i - 5)': division by zero"),
+    "incdec": ("int i = 0\ni ++ 1 / 0\n", "Lumen Error: Error evaluating '1 / 0': division by zero"),
+    "incdec_undefined": ("x++\n", "Lumen Error: Variable 'x' not defined"),
+    "print": ("print 1 / 0\n", "Lumen Error: Error evaluating '1 / 0': division by zero"),
+    "print_part": ('print "a" + 1 / 0\n',
+                   "Lumen Error: Cannot evaluate '1 / 0' in print: Lumen Error: Error evaluating '1 / 0': division by zero"),
+    "print_part_name": ('print("a" + zz + "b")\n', "Lumen Error: Variable 'zz' not defined"),
+    "index": ("array a = [1, 2]\nprint a[5]\n", "Lumen Error: Error evaluating 'a[5]': array index out of range"),
+    "setitem": ("array a = [1, 2]\na[5] = 3\n", "Lumen Error: Cannot assign to 'a[5]': array assignment index out of range"),
+    "setitem_undefined": ("b[0] = 1\n", "Lumen Error: Variable 'b' not defined"),
+    "no_function": ("g(1)\n", "Lumen Error: Function 'g' not defined"),
+    "call_arg": ("func f(int a) {\n    print a\n}\nf(1 / 0)\n", "Lumen Error: Error evaluating '1 / 0': division by zero"),
+    "call_arg_name": ("func f(int a) {\n    print(a)\n}\nf(qq)\n", "Lumen Error: Cannot resolve function argument 'qq'"),
+    "in_function": ("func f(int n) {\n    if (n / 0) {\n        print n\n    }\n}\nf(1)\n",
+                    "Lumen Error: Error evaluating 'n / 0': division by zero"),
+    "setitem_in_function": ("func f(int a) {\n    array b = [1]\n    b[a] = 2\n}\nf(3)\n",
+                            "Lumen Error: Cannot assign to 'b[a]': array assignment index out of range"),
+    "recursion": ("func r(int n) {\n    r(n + 1)\n}\nr(0)\n",
+                  "Lumen Error: Stack overflow: call to 'r' on line 2 would exceed the call depth limit of 10000 "
+                  "(innermost calls: r <- r <- r <- r <- ...)"),
+}
+
+# programs that must run the same on every path without failing
+CLEAN_CASES = {
+    "deep_recursion": "func d(int n) {\n    if (n < 9999) {\n        d(n + 1)\n    }\n}\nd(1)\nprint \"done\"\n",
+    "float_cycle": "float i = 0\ncycle (i < 2.5) {\n    i = i + 0.5\n}\nprint i\n",
+    "globals_in_function": "int g = 5\nfunc f(int a) {\n    int b = g + a\n    print b\n}\nf(1)\nprint g\n",
+}
+
+
+def write(tmp_path, name, source):
+    path = tmp_path / f"{name}.lum"
+    path.write_text(source)
+    return str(path)
+
+
+@pytest.mark.parametrize("path", EXAMPLES, ids=os.path.basename)
+def test_examples_conform(path):
+    ok, detail = check_conformance(path)
+    assert ok, detail
+
+
+@pytest.mark.parametrize("name", sorted(CLEAN_CASES))
+def test_clean_cases_conform(tmp_path, name):
+    ok, detail = check_conformance(write(tmp_path, name, CLEAN_CASES[name]))
+    assert ok, detail
+
+
+@pytest.mark.parametrize("name", sorted(ERROR_CASES))
+def test_error_cases_conform(tmp_path, name, capsys):
+    source, expected = ERROR_CASES[name]
+    path = write(tmp_path, name, source)
+    ok, detail = check_conformance(path)
+    assert ok, detail
+    # and the error they agree on is the interpreter's
+    with pytest.raises(Exception) as info:
+        LumenInterpreter().run_file(path, compiled=True)
+    assert str(info.value) == expected
+
+
+def test_max_depth_bounds_compiled_recursion(tmp_path, capsys):
+    path = write(tmp_path, "depth", "func d(int n) {\n    print n\n    d(n + 1)\n}\nd(1)\n")
+    results = []
+    for compiled in (False, True):
+        interp = LumenInterpreter(max_depth=50)
+        with pytest.raises(Exception) as info:
+            interp.run_file(path, compiled=compiled)
+        interp.output.flush()
+        results.append((capsys.readouterr().out, str(info.value)))
+    assert results[0] == results[1]
+    assert results[0][0].split() == [str(n) for n in range(1, 51)]
@@ -0,0 +1,82 @@
+import os
+
+from app import CopyEngine, Shell
+
+
+def shell_in(path):
+    shell = Shell()
+    shell.current_dir = str(path)
+    return shell
+
+
+def test_copy_onto_itself_is_refused(tmp_path, capsys):
+    (tmp_path / "a.txt").write_text("seventeen bytes!\n")
+    shell_in(tmp_path).copy("file", "a.txt", ".")
+    assert (tmp_path / "a.txt").read_text() == "seventeen bytes!\n"
+    assert "same" in capsys.readouterr().out
+
+
+def test_engine_refuses_a_hard_link_to_the_source(tmp_path):
+    src = tmp_path / "a.txt"
+    src.write_text("data")
+    os.link(src, tmp_path / "b.txt")
+    engine = CopyEngine()
+    engine.run(str(src), str(tmp_path / "b.txt"))
+    assert src.read_text() == "data"
+    assert len(engine.errors) == 1 and "same file" in engine.errors[0]
+
+
+def test_failed_copy_is_not_reported_as_copied(tmp_path, capsys, monkeypatch):
+    (tmp_path / "a.txt").write_text("data")
+    (tmp_path / "d").mkdir()
+
+    def short(self, fin, fout, size):
+        return 0
+    monkeypatch.setattr(CopyEngine, "transfer", short)
+    shell_in(tmp_path).copy("file", "a.txt", "d")
+    out = capsys.readouterr().out
+    assert "failed" in out and "Copied" not in out
+    assert "copied 0 of 4 bytes" in out
+
+
+def test_copy_tree(tmp_path):
+    src = tmp_path / "src"
+    (src / "sub").mkdir(parents=True)
+    (src / "one.txt").write_text("1")
+    (src / "sub" / "two.txt").write_text("22")
+    os.symlink("one.txt", src / "link")
+    engine = CopyEngine(workers=2)
+    engine.run(str(src), str(tmp_path / "dst"))
+    assert engine.errors == []
+    assert (tmp_path / "dst" / "sub" / "two.txt").read_text() == "22"
+    assert os.readlink(tmp_path / "dst" / "link") == "one.txt"
+    assert (engine.files_done, engine.bytes_done) == (2, 3)
+
+
+def test_resume_skips_finished_files(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "done.txt").write_text("finished")
+    (src / "half.txt").write_text("x" * 100)
+    CopyEngine().run(str(src), str(tmp_path / "dst"))
+    # an interrupted copy: written, but the mtime never got copied over
+    (tmp_path / "dst" / "half.txt").write_text("x" * 10)
+
+    engine = CopyEngine(resume=True)
+    engine.run(str(src), str(tmp_path / "dst"))
+    assert (engine.files_skipped, engine.files_done) == (1, 1)
+    assert (tmp_path / "dst" / "half.txt").read_text() == "x" * 100
+
+
+def test_verify_detects_a_bad_read_back(tmp_path, monkeypatch):
+    (tmp_path / "a.txt").write_text("data")
+    real_check = CopyEngine.check
+
+    def corrupt(self, dst, size, digest):
+        with open(dst, "r+b") as f:
+            f.write(b"X")
+        real_check(self, dst, size, digest)
+    monkeypatch.setattr(CopyEngine, "check", corrupt)
+    engine = CopyEngine(verify=True)
+    engine.run(str(tmp_path / "a.txt"), str(tmp_path / "b.txt"))
+    assert engine.errors and "checksum mismatch" in engine.errors[0]
@@ -0,0 +1,85 @@
+import pytest
+
+from app import LumenInterpreter, compile_expr
+
+
+def run(source, capsys, **kwargs):
+    interp = LumenInterpreter(**kwargs)
+    interp.execute(interp.parse(source))
+    interp.output.flush()
+    return interp, capsys.readouterr().out.split("\n")[:-1]
+
+
+def test_function_runs_in_slot_form(capsys):
+    src = "func add(int a, int b) {\n    int c = a + b\n    print c\n}\nadd(2, 3)\nadd(4, 5)\n"
+    interp, out = run(src, capsys)
+    assert out == ["5", "9"]
+    assert interp.functions["add"].slot_body is not None
+    assert interp.scope_stack == []
+
+
+def test_globals_are_read_but_not_written(capsys):
+    src = "int g = 10\nfunc f(int a) {\n    g = g + a\n    print g\n}\nf(1)\nf(2)\nprint g\n"
+    _, out = run(src, capsys)
+    assert out == ["11", "12", "10"]
+
+
+def test_global_defined_after_the_function(capsys):
+    src = "func f(int a) {\n    print a + late\n}\nint late = 7\nf(1)\n"
+    _, out = run(src, capsys)
+    assert out == ["8"]
+
+
+def test_missing_name_falls_back_to_a_dict_frame(capsys):
+    interp = LumenInterpreter()
+    interp.execute(interp.parse("func f(int a) {\n    int b = a + nowhere\n}\n"))
+    with pytest.raises(NameError, match="nowhere"):
+        interp.execute(interp.parse("f(1)\n"))
+    assert interp.scope_stack == []
+
+
+def test_argument_errors_name_the_argument(capsys):
+    interp = LumenInterpreter()
+    interp.execute(interp.parse("func f(int a) {\n    g(a)\n}\nfunc g(int b) {\n    print b\n}\n"))
+    with pytest.raises(Exception, match="Cannot resolve function argument 'qq'"):
+        interp.execute(interp.parse("f(qq)\n"))
+    with pytest.raises(Exception, match="Error evaluating '1 / 0'"):
+        interp.execute(interp.parse("f(1 / 0)\n"))
+    assert interp.scope_stack == []
+
+
+def test_recursion_past_the_machine_depth(capsys):
+    src = "func d(int n) {\n    if (n > 0) {\n        d(n - 1)\n    }\n    if (n == 0) {\n        print \"bottom\"\n    }\n}\nd(3000)\n"
+    interp, out = run(src, capsys)
+    assert out == ["bottom"]
+    with pytest.raises(Exception, match="call depth limit of 100"):
+        run(src, capsys, max_depth=100)
+
+
+def test_expressions_compile_once(capsys):
+    compile_expr.cache_clear()
+    _, out = run("int i = 0\nint t = 0\ncycle (i < 50) {\n    t = t + i * 2\n    i++\n}\nprint t\n", capsys)
+    assert out == ["2450"]
+    info = compile_expr.cache_info()
+    assert info.hits > 40 and info.misses < 10
+
+
+def test_eval_sees_the_live_scopes():
+    interp = LumenInterpreter()
+    interp.globals["g"] = 1
+    interp.push_scope({"a": 2})
+    assert interp.eval_expr("a + g") == 3
+    # nothing was copied: changes show up on the next evaluation
+    interp.globals["g"] = 10
+    interp.current_locals()["a"] = 5
+    assert interp.eval_expr("a + g") == 15
+    interp.pop_scope()
+    with pytest.raises(NameError):
+        interp.eval_expr("a")
+
+
+def test_eval_errors_name_the_expression():
+    with pytest.raises(Exception, match=r"Lumen Error: Error evaluating '1 / 0': division by zero"):
+        LumenInterpreter().eval_expr(" 1 / 0 ")
+    with pytest.raises(Exception, match="invalid syntax in expression"):
+        LumenInterpreter().eval_expr("1 +")
@@ -0,0 +1,107 @@
+import errno
+import os
+
+from app import CopyEngine, Shell
+
+real_replace = os.replace
+
+
+def shell_in(path):
+    shell = Shell()
+    shell.current_dir = str(path)
+    return shell
+
+
+def cross_device(monkeypatch, src):
+    """Make renaming src fail the way it does across filesystems."""
+    def replace(a, b, *args, **kwargs):
+        if os.fspath(a) == os.fspath(src):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        return real_replace(a, b, *args, **kwargs)
+    monkeypatch.setattr(os, "replace", replace)
+
+
+def corrupt_check(monkeypatch):
+    real_check = CopyEngine.check
+
+    def check(self, dst, size, digest):
+        with open(dst, "r+b") as f:
+            f.write(b"X")
+        real_check(self, dst, size, digest)
+    monkeypatch.setattr(CopyEngine, "check", check)
+
+
+def test_same_filesystem_move_renames(tmp_path, capsys):
+    (tmp_path / "a.txt").write_text("data")
+    (tmp_path / "d").mkdir()
+    shell_in(tmp_path).move("file", "a.txt", "d")
+    assert not (tmp_path / "a.txt").exists()
+    assert (tmp_path / "d" / "a.txt").read_text() == "data"
+    assert "Moved file 'a.txt'" in capsys.readouterr().out
+
+
+def test_cross_device_move_copies_then_removes(tmp_path, capsys, monkeypatch):
+    src = tmp_path / "a.txt"
+    src.write_text("data")
+    (tmp_path / "d").mkdir()
+    cross_device(monkeypatch, src)
+    shell_in(tmp_path).move("file", "a.txt", "d")
+    assert not src.exists()
+    assert (tmp_path / "d" / "a.txt").read_text() == "data"
+    assert os.listdir(tmp_path / "d") == ["a.txt"]
+    assert "Moved file 'a.txt'" in capsys.readouterr().out
+
+
+def test_cross_device_move_of_a_tree(tmp_path, monkeypatch):
+    src = tmp_path / "tree"
+    (src / "sub").mkdir(parents=True)
+    (src / "sub" / "x.txt").write_text("x")
+    os.symlink("sub/x.txt", src / "link")
+    (tmp_path / "d").mkdir()
+    cross_device(monkeypatch, src)
+    shell_in(tmp_path).move("dir", "tree", "d")
+    assert not src.exists()
+    assert (tmp_path / "d" / "tree" / "sub" / "x.txt").read_text() == "x"
+    assert os.readlink(tmp_path / "d" / "tree" / "link") == "sub/x.txt"
+
+
+def test_verify_failure_keeps_source_and_destination(tmp_path, capsys, monkeypatch):
+    src = tmp_path / "a.txt"
+    src.write_text("new data")
+    (tmp_path / "d").mkdir()
+    (tmp_path / "d" / "a.txt").write_text("old data")
+    cross_device(monkeypatch, src)
+    corrupt_check(monkeypatch)
+    shell_in(tmp_path).move("file", "a.txt", "d")
+    assert src.read_text() == "new data"
+    assert (tmp_path / "d" / "a.txt").read_text() == "old data"
+    # the temporary copy next to the destination is gone too
+    assert os.listdir(tmp_path / "d") == ["a.txt"]
+    out = capsys.readouterr().out
+    assert "Move failed" in out and "checksum mismatch" in out
+
+
+def test_cancelled_move_cleans_up(tmp_path, monkeypatch):
+    src = tmp_path / "a.txt"
+    src.write_text("data")
+    (tmp_path / "d").mkdir()
+
+    def interrupted(self, src, dst, report=None):
+        with open(dst, "w") as f:
+            f.write("da")
+        raise KeyboardInterrupt
+    monkeypatch.setattr(CopyEngine, "run", interrupted)
+    shell = shell_in(tmp_path)
+    engine = CopyEngine(verify=True)
+    assert not shell.moveAcross(str(src), str(tmp_path / "d" / "a.txt"), engine, "moved")
+    assert engine.cancelled.is_set()
+    assert src.read_text() == "data"
+    assert os.listdir(tmp_path / "d") == []
+
+
+def test_move_refuses_to_replace_a_directory(tmp_path, capsys):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "d" / "a").mkdir(parents=True)
+    shell_in(tmp_path).move("dir", "a", "d")
+    assert (tmp_path / "a").is_dir()
+    assert "already exists" in capsys.readouterr().out
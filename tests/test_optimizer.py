@@ -0,0 +1,130 @@
+import pytest
+
+from app import LumenCycle, LumenInterpreter, LumenOptimizer, counted_loop, counted_range, parse_lumen
+
+
+def outputs(source, capsys):
+    """Output of source run plainly, optimized, and optimized through the compiled backend."""
+    results = []
+    for optimizer, compiled in ((None, False), (LumenOptimizer(), False), (LumenOptimizer(), True)):
+        interp = LumenInterpreter(optimizer=optimizer)
+        nodes = interp.parse(source)
+        if compiled:
+            interp.run_compiled(nodes)
+        else:
+            interp.execute(nodes)
+        interp.output.flush()
+        results.append(capsys.readouterr().out)
+    return results
+
+
+def first_cycle(nodes):
+    return next(n for n in nodes if isinstance(n, LumenCycle))
+
+
+def test_constants_are_folded():
+    opt = LumenOptimizer()
+    assert opt.fold_expr("10 * 1000 + x") == "10000 + x"
+    assert opt.fold_expr("x + 1") == "x + 1"
+    assert LumenOptimizer(fold_constants=False).fold("2 * 3") == "2 * 3"
+
+
+def test_print_literals_are_merged():
+    node = LumenOptimizer().optimize(parse_lumen('print "a" + "b" + x + "c"\n'))[0]
+    assert node.parts == ["'ab'", "x", '"c"']
+
+
+def test_parsed_tree_is_left_alone():
+    nodes = parse_lumen("int i = 0\ncycle (i < 3) {\n    print i * (2 + 3)\n    i++\n}\n")
+    LumenOptimizer().optimize(nodes)
+    assert first_cycle(nodes).body[0].expr.strip() == "i * (2 + 3)"
+    assert first_cycle(nodes).hoisted is None
+
+
+def test_invariant_is_hoisted():
+    src = "int n = 4\nint i = 0\ncycle (i < n * 3) {\n    int d = i - n * 2\n    i++\n}\n"
+    cycle = first_cycle(LumenOptimizer().optimize(parse_lumen(src)))
+    assert [expr for _, expr, _ in cycle.hoisted] == ["n * 3", "n * 2"]
+    assert cycle.fallback is not None
+
+
+def test_assigned_names_are_not_hoisted():
+    src = "int n = 4\nint i = 0\ncycle (i < 3) {\n    print n * 2\n    n++\n    i++\n}\n"
+    assert first_cycle(LumenOptimizer().optimize(parse_lumen(src))).hoisted is None
+
+
+def test_non_scalar_input_takes_the_fallback(capsys):
+    # b aliases a, so a * 2 changes every pass and must not be computed once
+    src = ("array a = [1, 2]\narray b = a\nint i = 0\nint t = 0\n"
+           "cycle (i < 3) {\n    t ++ (a * 2)[0]\n    b[0] = b[0] + 1\n    i++\n}\nprint t\n")
+    interp = LumenInterpreter(optimizer=LumenOptimizer())
+    nodes = interp.parse(src)
+    cycle = first_cycle(nodes)
+    assert cycle.hoisted and cycle.hoisted[0][2] == ("a",)
+    interp.execute(nodes[:4])
+    assert not interp.bind_invariants(cycle.hoisted)
+    assert outputs(src, capsys) == ["12\n"] * 3
+
+
+def test_hoisted_value_that_fails_takes_the_fallback(capsys):
+    # n / zero is only ever evaluated behind the guard
+    src = ("int zero = 0\nint n = 4\nint i = 0\ncycle (i < 2) {\n"
+           "    if (zero != 0 and n / zero > 1) { print \"never\" }\n    print i\n    i++\n}\n")
+    assert first_cycle(LumenOptimizer().optimize(parse_lumen(src))).hoisted
+    assert outputs(src, capsys) == ["0\n1\n"] * 3
+
+
+def test_string_input_is_hoisted(capsys):
+    src = 'str s = "ab"\nint i = 0\ncycle (i < 2) {\n    print s * 2 + str(i)\n    i++\n}\n'
+    assert outputs(src, capsys) == ["abab0\nabab1\n"] * 3
+
+
+@pytest.mark.parametrize("src, shape", [
+    ("cycle (i < n) {\n    print i\n    i++\n}\n", ("i", "<", "n", 1)),
+    ("cycle (i >= 0) {\n    print i\n    i -- 2\n}\n", ("i", ">=", "0", -2)),
+    ("cycle (i < n + 1) {\n    i ++ 3\n}\n", ("i", "<", "n + 1", 3)),
+])
+def test_counted_shapes(src, shape):
+    assert counted_loop(parse_lumen(src)[0]) == shape
+
+
+@pytest.mark.parametrize("src", [
+    # the body moves the counter itself
+    "cycle (i < n) {\n    i = i + 1\n    i++\n}\n",
+    # the bound changes inside the loop
+    "cycle (i < n) {\n    n--\n    i++\n}\n",
+    # stepping away from the bound
+    "cycle (i < n) {\n    i--\n}\n",
+    # a step that isn't an int literal
+    "cycle (i < n) {\n    i ++ 0.5\n}\n",
+    # something in the body could rebind the counter
+    "cycle (i < n) {\n    print exec(\"i = 0\")\n    i++\n}\n",
+    # the last statement doesn't step the counter
+    "cycle (i < n) {\n    i++\n    print i\n}\n",
+])
+def test_not_counted(src):
+    assert counted_loop(parse_lumen(src)[0]) is None
+
+
+def test_counted_range():
+    assert counted_range(0, "<", 3, 1) == range(0, 3)
+    assert counted_range(0, "<=", 3, 1) == range(0, 4)
+    assert counted_range(5, ">=", 1, -2) == range(5, 0, -2)
+    assert counted_range(0.0, "<", 3, 1) is None
+    assert counted_range(0, "<", 2.5, 1) is None
+
+
+@pytest.mark.parametrize("src, expected", [
+    # a float bound runs the general loop
+    ("int i = 0\ncycle (i < 2.5) {\n    print i\n    i++\n}\nprint i\n", "0\n1\n2\n3\n"),
+    # so does a float counter
+    ("float i = 0.5\ncycle (i < 2) {\n    print i\n    i++\n}\nprint i\n", "0.5\n1.5\n2.5\n"),
+    # a body that modifies the counter
+    ("int i = 0\ncycle (i < 6) {\n    i = i + 1\n    print i\n    i++\n}\n", "1\n3\n5\n"),
+    # the counter ends one step past the bound, like the general loop
+    ("int i = 0\ncycle (i <= 6) {\n    i ++ 4\n}\nprint i\n", "8\n"),
+    # a loop that never runs leaves the counter alone
+    ("int i = 9\ncycle (i < 3) {\n    print i\n    i++\n}\nprint i\n", "9\n"),
+])
+def test_counted_loops_match_the_general_loop(src, expected, capsys):
+    assert outputs(src, capsys) == [expected] * 3
@@ -0,0 +1,112 @@
+import re
+
+import pytest
+
+from app import (LumenAssign, LumenCall, LumenCycle, LumenDecl, LumenFuncDef, LumenIf, LumenIncDec,
+                 LumenInterpreter, LumenPrint, LumenSetItem, LumenSleep, LumenSpawn, LumenYield,
+                 expand_lumen_ops, parse_lumen, tokenize_lumen)
+
+
+def run(source, capsys):
+    interp = LumenInterpreter()
+    interp.execute(interp.parse(source))
+    interp.output.flush()
+    return capsys.readouterr().out.split("\n")[:-1]
+
+
+def test_statement_kinds():
+    nodes = parse_lumen(
+        "int x = 1\nx++\nx -- 2\nx = x * 3\narray a = [1]\na[0] = x\nprint x\nf(x, 2)\n"
+        "spawn f(1)\nyield\nsleep(0.1)\nstr s\n"
+    )
+    assert [n.__class__ for n in nodes] == [LumenDecl, LumenIncDec, LumenIncDec, LumenAssign, LumenDecl,
+                                            LumenSetItem, LumenPrint, LumenCall, LumenSpawn, LumenYield,
+                                            LumenSleep, LumenDecl]
+    assert (nodes[2].op, nodes[2].amount) == ("--", "2")
+    assert nodes[7].args == ["x", "2"]
+    assert nodes[11].expr is None
+
+
+def test_blocks_nest_and_keep_line_numbers():
+    nodes = parse_lumen("func f(int a, str b) {\n    cycle (a > 0) {\n        a--\n    }\n}\nf(1, \"x\")\n")
+    func = nodes[0]
+    assert isinstance(func, LumenFuncDef) and func.params == [("int", "a"), ("str", "b")]
+    cycle = func.body[0]
+    assert isinstance(cycle, LumenCycle) and cycle.line == 2 and cycle.body[0].line == 3
+    assert nodes[1].line == 6
+
+
+def test_else_if_chain():
+    node = parse_lumen("if (x == 1) {\n    print 1\n} else if (x == 2) {\n    print 2\n} else {\n    print 3\n}\n")[0]
+    inner = node.orelse[0]
+    assert isinstance(inner, LumenIf) and inner.cond == "x == 2"
+    assert isinstance(inner.orelse[0], LumenPrint)
+
+
+def test_single_line_blocks_and_semicolons(capsys):
+    src = "int i = 0; cycle (i < 3) { print i; i++ }\nif (i == 3) { print \"done\" } else { print \"no\" }\n"
+    assert run(src, capsys) == ["0", "1", "2", "done"]
+
+
+def test_braces_and_separators_in_strings_and_literals(capsys):
+    src = 'str s = "a { b } ; c"\nprint s\nint n = len({1: 2, 3: 4})\nprint n\nprint "x}" + "{y"\n'
+    assert run(src, capsys) == ["a { b } ; c", "2", "x}{y"]
+
+
+def test_statement_spanning_lines(capsys):
+    assert run("int x = (1 +\n    2)\narray a = [1,\n    2]\nprint x + len(a)\n", capsys) == ["5"]
+
+
+def test_escaped_quote_in_string():
+    tokens = list(tokenize_lumen(['print "say \\"hi\\"; ok"\n']))
+    assert tokens == [("stmt", 'print "say \\"hi\\"; ok"', 1)]
+
+
+def test_print_parts_split_at_top_level():
+    node = parse_lumen('print "a+b" + f(1 + 2) + x\n')[0]
+    assert node.parts == ['"a+b"', "f(1 + 2)", "x"]
+
+
+@pytest.mark.parametrize("src, message", [
+    ('print "open\n', "Unterminated string starting on line 1"),
+    ("if (x) {\n    print 1\n", "Unclosed block starting on line 1"),
+    ("if (x)\nprint 1\n", "Expected '{' on line 1"),
+    ("else {\n}\n", "'else' without 'if' on line 1"),
+    ("}\n", "Unexpected '}' on line 1"),
+    ("func f(int) {\n}\n", "Invalid parameter 'int'"),
+    ("1 + 2\n", "Unknown statement '1 + 2'"),
+])
+def test_parse_errors(src, message):
+    with pytest.raises(Exception, match=re.escape(message)):
+        parse_lumen(src)
+
+
+def test_lumen_operators_are_expanded_at_parse_time():
+    node = parse_lumen("print a !| b\n")[0]
+    assert node.expr == "not (a or b)"
+    # inside a string they are just text
+    assert expand_lumen_ops('"a !| b"') == '"a !| b"'
+
+
+@pytest.mark.parametrize("a", [True, False])
+@pytest.mark.parametrize("b", [True, False])
+def test_lumen_operator_truth_tables(a, b, capsys):
+    src = f"bool a = {a}\nbool b = {b}\nprint a !| b\nprint a !& b\nprint a >|< b\nprint a <&> b\n"
+    assert run(src, capsys) == [str(x) for x in (not (a or b), not (a and b), a != b, a == b)]
+
+
+def test_xor_binds_tighter_than_or(capsys):
+    # True or (False >|< False), not (True or False) >|< False
+    assert run("print True or False >|< False\nprint False >|< True !| True\n", capsys) == ["True", "False"]
+
+
+def test_each_side_is_evaluated_once(capsys):
+    src = "array calls = []\nbool r = calls.append(1) >|< calls.append(2)\nprint r\nprint calls[0] + calls[1]\nprint len(calls)\n"
+    assert run(src, capsys) == ["False", "3", "2"]
+
+
+def test_malformed_operator_fails_at_runtime():
+    assert parse_lumen("print a !|\n")[0].expr == "a !|"
+    interp = LumenInterpreter()
+    with pytest.raises(Exception):
+        interp.execute(interp.parse("bool a = True\nbool b = a !|\n"))
@@ -0,0 +1,34 @@
+import time
+
+from app import LumenInterpreter, LumenProfiler
+
+
+def profile(tmp_path, source):
+    path = tmp_path / "prog.lum"
+    path.write_text(source)
+    interp = LumenInterpreter()
+    profiler = LumenProfiler().attach(interp)
+    start = time.perf_counter()
+    interp.run_file(str(path))
+    wall = time.perf_counter() - start
+    profiler.detach(interp)
+    return profiler, wall
+
+
+def test_recursion_counts_every_call_but_its_time_once(tmp_path):
+    # deep enough to run past MACHINE_DEPTH on the stack machine
+    profiler, wall = profile(tmp_path, "func down(int n) {\n    if (n > 0) {\n        down(n - 1)\n    }\n}\ndown(500)\n")
+    count, total, own = profiler.functions["down"]
+    assert count == 501
+    assert own <= total <= wall
+    for count, total, own in profiler.lines.values():
+        assert total <= wall
+    assert profiler.lines[3][0] == 500
+
+
+def test_loop_lines_add_up(tmp_path):
+    profiler, wall = profile(tmp_path, "int i = 0\ncycle (i < 100) {\n    i++\n}\n")
+    assert profiler.lines[3][0] == 100
+    assert profiler.cycles[2][0] == 1
+    assert profiler.lines[3][1] <= profiler.lines[2][1] <= wall
+    assert not any(profiler._active.values())
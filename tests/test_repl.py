@@ -0,0 +1,105 @@
+import os
+
+import pytest
+
+from app import LumenCache, Shell, lumen_input_state, run_lumen_job
+
+
+@pytest.fixture
+def shell(tmp_path):
+    shell = Shell()
+    shell.current_dir = str(tmp_path)
+    shell.lumen_cache = LumenCache(str(tmp_path / ".cache"))
+    return shell
+
+
+def repl(shell, monkeypatch, capsys, lines):
+    lines = iter(lines)
+
+    def fake_input(prompt=""):
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError
+    monkeypatch.setattr("builtins.input", fake_input)
+    shell.lumen_repl()
+    return [line for line in capsys.readouterr().out.split("\n") if line.strip()]
+
+
+@pytest.mark.parametrize("source, state", [
+    ("int x = 1", ""),
+    ("func f() {", "open"),
+    ('print "a', "open"),
+    ("if (x) {\n    print 1\n}", "if"),
+    ("if (x) {\n    print 1\n} else {\n    print 2\n}", ""),
+    ("cycle (x) {\n    x--\n}", ""),
+])
+def test_input_state(source, state):
+    assert lumen_input_state(source) == state
+
+
+def test_state_carries_over_between_lines(shell, monkeypatch, capsys):
+    out = repl(shell, monkeypatch, capsys, [
+        "int x = 2",
+        "func double(int n) {",
+        "    print n * 2",
+        "}",
+        "double(x)",
+        "x++",
+        "double(x)",
+    ])
+    assert out == ["4", "6"]
+
+
+def test_if_waits_for_an_else(shell, monkeypatch, capsys):
+    out = repl(shell, monkeypatch, capsys, [
+        "if (False) {", "    print 1", "}", "else {", "    print 2", "}",
+        "if (True) {", "    print 3", "}", "print 4",
+    ])
+    assert out == ["2", "3", "4"]
+
+
+def test_error_keeps_the_session_going(shell, monkeypatch, capsys):
+    out = repl(shell, monkeypatch, capsys, ["int x = 1 / 0", "print 7", ":save s"])
+    assert "division by zero" in out[0] and out[1] == "7"
+    # only what ran goes into the saved session
+    assert open(os.path.join(shell.current_dir, "s.lum")).read() == "print 7"
+
+
+def test_time_and_timeit(shell, monkeypatch, capsys):
+    out = repl(shell, monkeypatch, capsys, ["int n = 0", ":time n++", ":timeit n++ 10", "print n"])
+    assert "parse" in out[0] and "run" in out[0]
+    assert "10 loops" in out[1]
+    assert out[2] == "11"
+
+
+def test_run_job_captures_output_and_errors(tmp_path):
+    (tmp_path / "ok.lum").write_text("print 1\nprint 2\n")
+    (tmp_path / "bad.lum").write_text("print 1\nint x = y\n")
+    out, error, secs = run_lumen_job(str(tmp_path / "ok.lum"))
+    assert (out, error) == ("1\n2\n", None) and secs >= 0
+    out, error, _ = run_lumen_job(str(tmp_path / "bad.lum"), compiled=True)
+    assert out == "1\n" and "'y' is not defined" in error
+
+
+def test_run_all(shell, tmp_path, capsys):
+    (tmp_path / "a.lum").write_text('print "from a"\n')
+    (tmp_path / "b.lum").write_text("int x = 1 / 0\n")
+    (tmp_path / "c.lum").write_text('print "from c"\n')
+    shell.lumen_run_all(["*.lum"], jobs=2)
+    out = capsys.readouterr().out
+    assert out.index("from a") < out.index("FAIL b.lum") < out.index("from c")
+    assert "2/3 scripts passed" in out
+
+
+def test_run_all_prefixes_lines(shell, tmp_path, capsys):
+    (tmp_path / "a.lum").write_text("print 1\nprint 2\n")
+    shell.lumen_run_all(["a.lum", "*.lum"], prefix=True)
+    out = capsys.readouterr().out
+    assert out.count("[a.lum]") == 2
+    assert "1/1 scripts passed" in out
+
+
+def test_run_all_with_no_matches(shell, capsys):
+    shell.lumen_run_all(["*.lum"])
+    assert "No Lumen files match" in capsys.readouterr().out
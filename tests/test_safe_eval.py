@@ -0,0 +1,68 @@
+import ast
+import time
+
+import pytest
+
+from app import Shell, _SafeEval, calculate_lines, calculator, compile_calc_shape, compile_safe
+
+
+def test_huge_constants_are_not_folded():
+    start = time.perf_counter()
+    _SafeEval.compile("9**9**9")
+    _SafeEval.compile("1 << 10**9")
+    big = _SafeEval.compile('"ab" * 100000')
+    assert time.perf_counter() - start < 1
+    assert len(big(None)) == 200000
+
+
+def test_small_constants_fold():
+    fn, const = _SafeEval.closure(ast.parse("2**10 + 1", mode="eval").body)
+    assert const and fn(None) == 1025
+    _, const = _SafeEval.closure(ast.parse("9**99", mode="eval").body)
+    assert not const
+
+
+@pytest.mark.parametrize("expr, expected", [
+    ("2**10", 1024),
+    ("3 * 'ab'", "ababab"),
+    ("'ab' * 3", "ababab"),
+    ("1 < 2 < 3", True),
+    ("max(1, 5) - abs(-2)", 3),
+    ("1 / 0", "Error: division by zero"),
+    ("__import__('os')", "Error: Unsupported function call: __import__"),
+])
+def test_calculator(expr, expected):
+    assert calculator(expr) == expected
+
+
+def test_names_are_read_at_evaluation():
+    fn = compile_safe("x * 2 + 1")
+    assert fn({"x": 3}) == 7
+    assert fn({"x": 10}) == 21
+    with pytest.raises(ValueError, match="Unknown name: x"):
+        fn(None)
+
+
+def test_calculate_lines():
+    lines = ["1 + 2\n", "\n", "# comment\n", "1.5 * 2\n", "2e3 + 1\n", "10 / 0\n", "'a1' * 2\n", "1 +\n"]
+    results = list(calculate_lines(lines))
+    assert results[:5] == [3, 3.0, 2001.0, "Error: division by zero", "a1a1"]
+    assert results[5].startswith("Error: ")
+    assert len(results) == 6
+
+
+def test_lines_with_the_same_shape_share_a_compiled_form():
+    compile_calc_shape.cache_clear()
+    assert list(calculate_lines(["1 + 2 * 3", "4 + 5 * 6", "0.5 + 1 * 2"])) == [7, 34, 2.5]
+    assert compile_calc_shape.cache_info().misses == 1
+
+
+def test_calc_batch_writes_one_result_per_line(tmp_path, capsys):
+    (tmp_path / "in.txt").write_text("1 + 1\nfoo\n2 ** 3\n")
+    shell = Shell()
+    shell.current_dir = str(tmp_path)
+    shell.calc_batch("in.txt", "out.txt")
+    assert (tmp_path / "out.txt").read_text() == "2\nError: Unknown name: foo\n8\n"
+    assert "3 expression(s), 1 error(s)" in capsys.readouterr().out
+    shell.calc_batch("in.txt", "out.txt", append=True)
+    assert (tmp_path / "out.txt").read_text().count("\n") == 6
@@ -0,0 +1,149 @@
+import os
+import time
+
+from app import FileIndex, ListingCache, TreeSearch
+
+OLD = time.time_ns() - 3600 * 10**9
+
+
+def make_tree(root):
+    (root / "src" / "deep").mkdir(parents=True)
+    (root / "docs").mkdir()
+    (root / "readme.txt").write_text("")
+    (root / "src" / "main.py").write_text("")
+    (root / "src" / "deep" / "notes.txt").write_text("")
+    (root / "docs" / "guide.txt").write_text("")
+    age(root)
+
+
+def age(root):
+    # old enough that the racy-mtime rule lets every listing be kept
+    for d in (root, root / "src", root / "src" / "deep", root / "docs"):
+        if d.exists():
+            os.utime(d, ns=(OLD, OLD))
+
+
+def names(paths, root):
+    return sorted(os.path.relpath(p, root) for p in paths)
+
+
+def test_index_lists_only_changed_dirs(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    make_tree(root)
+    index = FileIndex(str(root), str(tmp_path / "idx"))
+    assert index.refresh() == 4
+    assert index.refresh() == 0
+    (root / "src" / "new.txt").write_text("")
+    age(root)
+    os.utime(root / "src", ns=(OLD + 10**9, OLD + 10**9))
+    assert index.refresh() == 1
+    assert names(index.search("new"), root) == ["src/new.txt"]
+
+
+def test_index_drops_removed_dirs(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    make_tree(root)
+    index = FileIndex(str(root), str(tmp_path / "idx"))
+    index.refresh()
+    os.remove(root / "docs" / "guide.txt")
+    os.rmdir(root / "docs")
+    os.utime(root, ns=(OLD + 10**9, OLD + 10**9))
+    index.refresh()
+    assert "docs" not in index.dirs
+    assert index.search("guide") == []
+
+
+def test_recent_dir_is_listed_again(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    (root / "a.txt").write_text("")
+    index = FileIndex(str(root), str(tmp_path / "idx"))
+    index.refresh()
+    # its mtime could still move within the same tick, so it isn't trusted yet
+    assert index.refresh() == 1
+
+
+def test_index_filters(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    make_tree(root)
+    index = FileIndex(str(root), str(tmp_path / "idx"))
+    index.refresh()
+    assert names(index.search("t"), root) == ["docs/guide.txt", "readme.txt", "src/deep/notes.txt"]
+    assert names(index.search("e", want="dir"), root) == ["src/deep"]
+    assert names(index.search(".txt", max_depth=1), root) == ["readme.txt"]
+    assert names(index.search(None, match=lambda n: n.endswith(".py")), root) == ["src/main.py"]
+    assert index.search("\0") == []
+
+
+def test_index_is_saved_and_loaded(tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    make_tree(root)
+    index = FileIndex(str(root), str(tmp_path / "idx"))
+    index.refresh()
+    index.save()
+    again = FileIndex(str(root), str(tmp_path / "idx"))
+    assert again.dirs == index.dirs
+    assert again.refresh() == 0
+    # an index for another root doesn't load
+    other = FileIndex(str(root / "src"), str(tmp_path / "idx"))
+    assert other.dirs == {}
+
+
+def test_tree_search(tmp_path):
+    make_tree(tmp_path)
+    txt = lambda n: n.endswith(".txt")
+    assert names(TreeSearch(str(tmp_path), txt, workers=3), tmp_path) == \
+        ["docs/guide.txt", "readme.txt", "src/deep/notes.txt"]
+    assert names(TreeSearch(str(tmp_path), txt, max_depth=2), tmp_path) == ["docs/guide.txt", "readme.txt"]
+    assert names(TreeSearch(str(tmp_path), lambda n: True, want="dir"), tmp_path) == ["docs", "src", "src/deep"]
+
+
+def test_tree_search_does_not_follow_symlinked_dirs(tmp_path):
+    make_tree(tmp_path)
+    os.symlink(tmp_path, tmp_path / "src" / "loop")
+    found = names(TreeSearch(str(tmp_path), lambda n: n == "notes.txt"), tmp_path)
+    assert found == ["src/deep/notes.txt"]
+
+
+def test_tree_search_can_stop_early(tmp_path):
+    for i in range(50):
+        (tmp_path / f"d{i}").mkdir()
+        (tmp_path / f"d{i}" / "x").write_text("")
+    it = iter(TreeSearch(str(tmp_path), lambda n: n == "x", workers=4))
+    first = next(it)
+    it.close()
+    assert first.endswith("x")
+
+
+def test_listing_cache(tmp_path):
+    (tmp_path / "B.txt").write_text("")
+    (tmp_path / "a").mkdir()
+    os.utime(tmp_path, ns=(OLD, OLD))
+    cache = ListingCache()
+    listing = cache.get(str(tmp_path))
+    assert listing == [("a", True), ("B.txt", False)]
+    assert cache.get(str(tmp_path)) is listing
+    (tmp_path / "c.txt").write_text("")
+    os.utime(tmp_path, ns=(OLD + 10**9, OLD + 10**9))
+    assert [name for name, _ in cache.get(str(tmp_path))] == ["a", "B.txt", "c.txt"]
+
+
+def test_listing_cache_skips_recent_dirs(tmp_path):
+    cache = ListingCache()
+    cache.get(str(tmp_path))
+    assert cache.listings == {}
+
+
+def test_listing_cache_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(ListingCache, "MAX_DIRS", 2)
+    cache = ListingCache()
+    for i in range(3):
+        d = tmp_path / str(i)
+        d.mkdir()
+        os.utime(d, ns=(OLD, OLD))
+        cache.get(str(d))
+    assert list(cache.listings) == [str(tmp_path / "1"), str(tmp_path / "2")]
@@ -0,0 +1,130 @@
+import io
+import sys
+
+import pytest
+
+from app import LumenCache, LumenInterpreter, LumenOutput
+
+
+class Recorder(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def test_output_is_written_in_one_call():
+    stream = Recorder()
+    out = LumenOutput(stream, flush_interval=60)
+    for i in range(100):
+        out.write(i)
+    assert stream.writes == 0
+    out.flush()
+    assert stream.writes == 1
+    assert stream.getvalue() == "".join(f"{i}\n" for i in range(100))
+    out.flush()
+    assert stream.writes == 1
+
+
+def test_output_flushes_at_the_buffer_size():
+    stream = Recorder()
+    out = LumenOutput(stream, buffer_size=10, flush_interval=60)
+    out.write("12345")
+    assert stream.writes == 0
+    out.write("6789")
+    assert stream.getvalue() == "12345\n6789\n"
+
+
+def test_output_flushes_after_the_interval():
+    stream = Recorder()
+    out = LumenOutput(stream, flush_interval=0)
+    out.write("a")
+    assert stream.getvalue() == "a\n"
+
+
+def test_output_follows_sys_stdout(capsys, monkeypatch):
+    out = LumenOutput()
+    out.write("one")
+    replaced = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", replaced)
+    out.flush()
+    assert replaced.getvalue() == "one\n"
+
+
+def test_close_closes_only_owned_streams():
+    shared = io.StringIO()
+    LumenOutput(shared).close()
+    assert not shared.closed
+    owned = io.StringIO()
+    LumenOutput(owned, close_stream=True).close()
+    assert owned.closed
+
+
+def test_stream_runs_each_statement_as_it_arrives():
+    ran = []
+    interp = LumenInterpreter(output=LumenOutput(io.StringIO()))
+
+    def lines():
+        yield "int x = 1\n"
+        yield "x++\n"
+        # both statements have run before the next line is even read
+        ran.append(interp.globals.get("x"))
+        yield "cycle (x < 5) {\n"
+        yield "    x++\n"
+        yield "}\n"
+        ran.append(interp.globals.get("x"))
+        yield "print x\n"
+    interp.run_stream(lines())
+    interp.output.flush()
+    assert ran == [2, 5]
+    assert interp.output.stream.getvalue() == "5\n"
+
+
+def test_stream_waits_for_a_possible_else(capsys):
+    interp = LumenInterpreter()
+    interp.run_stream(iter(["if (False) {\n", "    print 1\n", "}\n", "else {\n", "    print 2\n", "}\n"]))
+    interp.output.flush()
+    assert capsys.readouterr().out == "2\n"
+
+
+def test_stream_error_stops_at_the_failing_statement(capsys):
+    interp = LumenInterpreter()
+    with pytest.raises(Exception, match="division by zero"):
+        interp.run_stream(iter(["print 1\n", "int z = 1 / 0\n", "print 2\n"]))
+    interp.output.flush()
+    assert capsys.readouterr().out == "1\n"
+
+
+def test_run_file_reads_stdin(monkeypatch, capsys):
+    monkeypatch.setattr(sys, "stdin", io.StringIO("int x = 6\nprint x * 7\n"))
+    LumenInterpreter().run_file("-")
+    assert capsys.readouterr().out == "42\n"
+
+
+def test_big_files_bypass_the_cache(tmp_path, capsys, monkeypatch):
+    path = tmp_path / "big.lum"
+    path.write_text("print 1\n" + "int x = 1\n" * 100)
+    cache = LumenCache(str(tmp_path / "cache"))
+    monkeypatch.setattr(LumenInterpreter, "STREAM_THRESHOLD", 100)
+    LumenInterpreter(cache=cache).run_file(str(path))
+    assert cache.entries() == []
+    monkeypatch.setattr(LumenInterpreter, "STREAM_THRESHOLD", 1 << 20)
+    LumenInterpreter(cache=cache).run_file(str(path))
+    assert len(cache.entries()) == 1
+    assert capsys.readouterr().out == "1\n1\n"
+
+
+def test_output_is_flushed_before_scan(monkeypatch, capsys):
+    prompts = []
+
+    def fake_input(prompt=""):
+        prompts.append(capsys.readouterr().out)
+        return "3"
+    monkeypatch.setattr("builtins.input", fake_input)
+    interp = LumenInterpreter()
+    interp.exec_line('print "before"\nint n = scan("n? ")\nprint n * 2\n')
+    assert prompts == ["before\n"]
+    assert capsys.readouterr().out == "6\n"
@@ -0,0 +1,69 @@
+import os
+import time
+
+import pytest
+
+from app import LumenInterpreter
+
+EXAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples", "tasks.lum")
+
+
+def run(source, capsys):
+    interp = LumenInterpreter()
+    interp.exec_line(source)
+    return interp, capsys.readouterr().out.split("\n")[:-1]
+
+
+def test_tasks_interleave_and_finish_before_the_program_ends(capsys):
+    LumenInterpreter().run_file(EXAMPLE)
+    out = capsys.readouterr().out.split("\n")[:-1]
+    assert out[0] == "main runs first"
+    assert out[-1] == "main done, tasks finish before the program ends"
+    assert [line for line in out if line.startswith("a ")] == ["a step 0", "a step 1", "a step 2", "a finished"]
+    assert [line for line in out if line.startswith("b ")] == ["b step 0", "b step 1", "b finished"]
+    # they take turns at each yield
+    assert out.index("b step 0") < out.index("a step 1")
+
+
+def test_tasks_keep_their_own_locals(capsys):
+    src = ("func count(str name, int n) {\n    int i = 0\n    cycle (i < n) {\n        yield\n        i++\n    }\n"
+           "    print name + \" \" + i\n}\nspawn count(\"x\", 3)\nspawn count(\"y\", 1)\n")
+    interp, out = run(src, capsys)
+    assert out == ["y 1", "x 3"]
+    assert interp.scope_stack == []
+
+
+def test_sleeping_tasks_overlap(capsys):
+    src = "func nap(int n) {\n    sleep(0.05)\n    print n\n}\nspawn nap(1)\nspawn nap(2)\nspawn nap(3)\n"
+    start = time.perf_counter()
+    _, out = run(src, capsys)
+    assert sorted(out) == ["1", "2", "3"]
+    assert time.perf_counter() - start < 0.14
+
+
+def test_failing_task_cancels_the_others(capsys):
+    src = ("func bad(int n) {\n    yield\n    int z = 1 / n\n}\nfunc slow() {\n    cycle (True) {\n        yield\n    }\n}\n"
+           "spawn slow()\nspawn bad(0)\nprint \"main\"\n")
+    interp = LumenInterpreter()
+    with pytest.raises(Exception, match="division by zero"):
+        interp.exec_line(src)
+    assert interp._tasks == [] and interp.scope_stack == []
+    # the interpreter carries on afterwards
+    interp.exec_line("print 5\n")
+    assert capsys.readouterr().out == "main\n5\n"
+
+
+@pytest.mark.parametrize("expr", ["-1", '"1"'])
+def test_sleep_needs_seconds(expr):
+    with pytest.raises(Exception, match="sleep needs a number of seconds"):
+        LumenInterpreter().exec_line(f"sleep({expr})\n")
+
+
+def test_spawn_of_an_unknown_function():
+    with pytest.raises(Exception, match="Function 'nope' not defined"):
+        LumenInterpreter().exec_line("spawn nope()\n")
+
+
+def test_yield_without_tasks_is_a_no_op(capsys):
+    _, out = run("yield\nprint 1\n", capsys)
+    assert out == ["1"]